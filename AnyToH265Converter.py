@@ -1,52 +1,86 @@
 import os
-import subprocess
-import re
 import sys
-from pymediainfo import MediaInfo
-from download_ffmpeg import download_and_extract_ffmpeg
-from download_MediaInfo import download_and_extract_mediainfo
-
-# --- správná základní složka ---
-def _base_dir() -> str:
-    return os.path.dirname(sys.executable) if getattr(sys, "frozen", False) \
-           else os.path.dirname(os.path.abspath(__file__))
-
-def _find_tool(name: str) -> str | None:
-    """Najdi nástroj vedle EXE/skriptu, v _internal, a nově i v _MEIPASS (onefile)."""
-    b = _base_dir()
-    meipass = getattr(sys, "_MEIPASS", None)
-    for p in (
-        os.path.join(b, name),
-        os.path.join(b, "_internal", name),
-        os.path.join(meipass, name) if meipass else "",
-        os.path.join(meipass, "_internal", name) if meipass else "",
-    ):
-        if p and os.path.isfile(p):
-            return p
-    from shutil import which
-    return which(name)
-
-def _mediainfo_dll() -> str | None:
-    """Najdi MediaInfo.dll vedle EXE/skriptu, v _internal, a nově i v _MEIPASS (onefile)."""
-    b = _base_dir()
-    meipass = getattr(sys, "_MEIPASS", None)
-    for p in (
-        os.path.join(b, "MediaInfo.dll"),
-        os.path.join(b, "_internal", "MediaInfo.dll"),
-        os.path.join(meipass, "MediaInfo.dll") if meipass else "",
-        os.path.join(meipass, "_internal", "MediaInfo.dll") if meipass else "",
-    ):
-        if p and os.path.isfile(p):
-            return p
-    return None
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from media_probe import MediaProbe, probe_media, probe_stream
+from stream_plan import StreamPlan, plan_streams
+from scheduler import ThreadBudget, split_budget
+from keyframes import keyframe_times, pick_split_points
+from ffmpeg_progress import ProgressRecord, run_ffmpeg, run_ffmpeg_stream
+from job_journal import part_path, discard_output, finalize_output
+from job_metrics import ChildUsage
+from progress_board import ProgressSlot, STATE_RUNNING, STATE_DONE, STATE_ERROR
+from tools import _base_dir, find_tool as _find_tool, mediainfo_dll as _mediainfo_dll
+
+# výchozí nastavení enkódu (vstupuje i do hashe nastavení v žurnálu)
+X265_PRESET = "slow"
+X265_CRF = 28
+AUDIO_CODEC = "aac"
+AUDIO_BITRATE = "128k"
+
+# streamovaný výstup (stdout / callback): fragmentovaný MP4 nebo MKV – odběratel může začít hned
+STREAM_FORMATS = {
+    "mp4": ["-f", "mp4", "-movflags", "+frag_keyframe+empty_moov+default_base_moof"],
+    "mkv": ["-f", "matroska"],
+}
+STREAM_PROBE_BYTES = 4 << 20   # kolik ze začátku streamu dostane MediaInfo (zbytek jde rovnou do ffmpeg)
+STREAM_READ = 1 << 20
+
+def encode_settings(preset: str | None = None, crf: int | None = None) -> dict:
+    """Nastavení, která ovlivní výsledný soubor – klíč pro žurnál hotových jobů."""
+    return {"video": ["libx265", preset or X265_PRESET, X265_CRF if crf is None else crf],
+            "audio": [AUDIO_CODEC, AUDIO_BITRATE], "container": "mp4"}
+
+def audio_encode_args() -> list[str]:
+    return ["-c:a", AUDIO_CODEC, "-b:a", AUDIO_BITRATE]
+
+def video_encode_args(preset: str | None = None, crf: int | None = None, tb: ThreadBudget | None = None) -> list[str]:
+    return [
+        "-c:v", "libx265",
+        "-preset", preset or X265_PRESET,
+        "-crf", str(X265_CRF if crf is None else crf),
+        *(["-x265-params", tb.x265_params()] if tb else []),
+    ]
+
+def default_output_path(input_path: str, suffix: str = "") -> str:
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    output_dir = os.path.join(_base_dir(), "output")
+    os.makedirs(output_dir, exist_ok=True)
+    return os.path.join(output_dir, f"{base_name}{suffix}.mp4")
+
+@dataclass(frozen=True)
+class Rendition:
+    """Jeden výstup žebříčku (2160p/1080p/720p …) – všechny vznikají z jednoho dekódu vstupu."""
+    height: int                                  # šířka podle poměru stran; zdroj se nezvětšuje
+    output_path: str
+    crf: int | None = None                       # None = CRF konvertoru
+    bitrate: str | None = None                   # "6M" → ABR místo CRF
+    preset: str | None = None
+    audio_codec: str = AUDIO_CODEC
+    audio_bitrate: str = AUDIO_BITRATE
+    thread_budget: ThreadBudget | None = None    # None = díl rozpočtu jobu podle počtu pixelů
+
+def ladder(input_path: str, heights: list[int], **opts) -> list[Rendition]:
+    """Výchozí žebříček: output/<jméno>_<výška>p.mp4 pro každou výšku."""
+    return [Rendition(h, default_output_path(input_path, f"_{h}p"), **opts) for h in heights]
 
 class AnyToH265Converter:
-    def __init__(self, input_path, output_path=None, overwrite=True, print_lock=None, progress_dict=None, show_progress=False):
+    def __init__(self, input_path, output_path=None, overwrite=True, print_lock=None, progress: ProgressSlot | None = None,
+                 show_progress=False,
+                 probe: MediaProbe | None = None, thread_budget: ThreadBudget | None = None,
+                 segment_threshold: float | None = None, segment_count: int = 4,
+                 plan: StreamPlan | None = None, preset: str | None = None, crf: int | None = None,
+                 renditions: list[Rendition] | None = None, verify: bool = True):
         self.input_path = input_path
         if not os.path.exists(self.input_path):
             raise FileNotFoundError(f"Soubor neexistuje: {self.input_path}")
 
-        self.output_path = output_path or self._build_output_path()
+        # víc výstupů z jednoho dekódu (split/scale); output_path pak = první z nich
+        self.renditions = list(renditions or [])
+        self.output_path = output_path or (self.renditions[0].output_path if self.renditions
+                                           else self._build_output_path())
         self.overwrite = overwrite
 
         self.ffmpeg_path = _find_tool("ffmpeg.exe")
@@ -55,32 +89,31 @@ class AnyToH265Converter:
 
         self._mi_dll = _mediainfo_dll()
 
-        self.duration = self._get_duration()
+        # probe předaný z workeru → soubor se v rámci jobu parsuje jen jednou
+        self.probe = probe or probe_media(self.input_path, self._mi_dll)
+        self.duration = self.probe.duration
+        # copy/encode/drop po streamech (HEVC video a AAC/Opus audio se jen kopírují)
+        self.plan = plan or plan_streams(self.probe, self.output_path, audio_codec=AUDIO_CODEC)
+        self.thread_budget = thread_budget
+        # preset/CRF z ladění vzorky (preset_tuner), jinak výchozí
+        self.preset = preset or X265_PRESET
+        self.crf = X265_CRF if crf is None else crf
+        # delší soubory (s) se dělí na keyframech a segmenty se enkódují paralelně
+        self.segment_threshold = segment_threshold
+        self.segment_count = max(2, int(segment_count))
+        # po enkódu ověřit výstup (streamy + vzorky dekódu), ne jen návratový kód ffmpeg
+        self.verify = verify
         self.print_lock = print_lock
-        self.progress_dict = progress_dict
+        self.progress = progress
         self.show_progress = show_progress
         self._last_percent_shown = -1.0
-        self._progress_key = os.path.basename(self.input_path)
         self.last_error = ""   # sem ukládáme text poslední chyby z ffmpeg
+        self.rendition_errors: list[str | None] = []   # po convert() žebříčku: chyba každého výstupu
+        self.rendition_progress: list[ProgressSlot] | None = None   # volitelně slot na výstup
+        self.usage = ChildUsage()   # CPU/RSS/IO všech ffmpeg potomků jobu (pro run log)
 
     def _build_output_path(self):
-        base_name = os.path.splitext(os.path.basename(self.input_path))[0]
-        output_dir = os.path.join(_base_dir(), "output")
-        os.makedirs(output_dir, exist_ok=True)
-        return os.path.join(output_dir, f"{base_name}.mp4")
-
-    def _get_duration(self):
-        try:
-            if self._mi_dll:
-                media_info = MediaInfo.parse(self.input_path, library_file=self._mi_dll)
-            else:
-                media_info = MediaInfo.parse(self.input_path)
-            for track in media_info.tracks:
-                if track.track_type == "Video" and track.duration:
-                    return float(track.duration) / 1000.0
-        except Exception:
-            pass
-        return None
+        return default_output_path(self.input_path)
 
     def _print(self, msg: str):
         if not self.show_progress:
@@ -91,69 +124,372 @@ class AnyToH265Converter:
         else:
             sys.stdout.write(msg); sys.stdout.flush()
 
-    def convert(self):
-        if os.path.exists(self.output_path) and not self.overwrite:
-            self._print(f"⚠️  Přeskočeno: {os.path.basename(self.output_path)}\n")
-            return False
+    def _verifier(self, plan: StreamPlan):
+        """verify callback pro finalize_output, nebo None (ověření vypnuté)."""
+        if not self.verify:
+            return None
+        from verify_output import verify_output
+        return lambda path: verify_output(path, self.probe, plan)
 
-        if self.progress_dict is not None:
-            self.progress_dict[self._progress_key] = "⏳ 0.0%"
+    def _video_args(self, tb: ThreadBudget | None) -> list[str]:
+        return video_encode_args(self.preset, self.crf, tb)
 
-        cmd = [
+    def _audio_args(self) -> list[str]:
+        return audio_encode_args()
+
+    def build_command(self, output_path: str | None = None) -> list[str]:
+        tb = self.thread_budget
+        return [
             self.ffmpeg_path,
             "-y",
+            *(tb.ffmpeg_input_args() if tb else []),
             "-i", self.input_path,
-            "-c:v", "libx265",
-            "-preset", "slow",
-            "-crf", "28",
-            "-c:a", "aac",
-            "-b:a", "128k",
-            self.output_path
+            *self.plan.ffmpeg_args(self._video_args(tb), self._audio_args()),
+            output_path or self.output_path
         ]
 
-        process = subprocess.Popen(
-            cmd,
-            stderr=subprocess.PIPE,
-            universal_newlines=True,
-            cwd=_base_dir()
+    def _report(self, rec: ProgressRecord):
+        """Přepočti out_time z ffmpeg na procenta a zapiš do progress slotu / konzole."""
+        if not self.duration:
+            return
+        percent = max(0.0, min(100.0, (rec.out_time / self.duration) * 100.0))
+
+        if self.progress is not None:
+            self.progress.update(STATE_RUNNING, percent, rec.fps, rec.speed, rec.total_size)
+
+        if percent - self._last_percent_shown >= 0.5:
+            self._print(f"\r⏳ {percent:.1f}%")
+            self._last_percent_shown = percent
+
+    def _run_ffmpeg(self, cmd, on_progress=None, thread_budget: ThreadBudget | None = None) -> tuple[bool, str]:
+        """Spusť ffmpeg (-progress pipe), záznamy posílej do on_progress. Vrací (ok, poslední chybová hláška)."""
+        rc, errors = run_ffmpeg(
+            cmd, on_progress,
+            cwd=_base_dir(),
+            preexec_fn=thread_budget.preexec() if thread_budget else None,
+            usage=self.usage,
         )
-        time_pattern = re.compile(r"time=(\d+):(\d+):(\d+\.\d+)")
-        last_stderr = ""  # budeme si pamatovat poslední „neprogresový“ řádek z ffmpeg
-
-        if process.stderr:
-            for line in process.stderr:
-                line_stripped = line.strip()
-                match = time_pattern.search(line)
-                if match and self.duration:
-                    h, m, s = match.groups()
-                    current_time = int(h) * 3600 + int(m) * 60 + float(s)
-                    percent = max(0.0, min(100.0, (current_time / self.duration) * 100.0))
-
-                    if self.progress_dict is not None:
-                        self.progress_dict[self._progress_key] = f"⏳ {percent:.1f}%"
-
-                    if percent - self._last_percent_shown >= 0.5:
-                        self._print(f"\r⏳ {percent:.1f}%")
-                        self._last_percent_shown = percent
-                else:
-                    # ulož poslední relevantní hlášku (využijeme, když ffmpeg skončí chybou)
-                    if line_stripped:
-                        last_stderr = line_stripped
-
-        process.wait()
-        ok = (process.returncode == 0)
+        return rc == 0, (errors[-1] if errors else "")
+
+    def _use_segments(self) -> bool:
+        # kopírované video nemá smysl dělit – segmentuje se jen enkód
+        return bool(self.segment_threshold and self.duration and self.duration > self.segment_threshold
+                    and not self.plan.video_copy)
+
+    def _convert_segmented(self, output_path: str) -> tuple[bool, str]:
+        """Split na keyframech → paralelní enkód segmentů → bezztrátový concat + audio v jednom průchodu."""
+        ff = self.ffmpeg_path
+        times = keyframe_times(ff, self.input_path)
+        points = pick_split_points(times, self.duration, self.segment_count)
+        if not points:
+            # není kde řezat (jeden GOP) → obyčejná konverze
+            return self._run_ffmpeg(self.build_command(output_path), self._report, self.thread_budget)
+
+        out_dir = os.path.dirname(os.path.abspath(self.output_path))
+        with tempfile.TemporaryDirectory(prefix=".seg_", dir=out_dir) as tmp:
+            # 1) jen video, -c copy; řez těsně před keyframem → segment začíná právě na něm
+            video = next(a.stream.index for a in self.plan.actions if a.stream.kind == "v")
+            ok, err = self._run_ffmpeg([
+                ff, "-hide_banner", "-v", "error", "-nostdin", "-y",
+                "-i", self.input_path,
+                "-map", f"0:v:{video}", "-c", "copy",
+                "-f", "segment",
+                "-segment_times", ",".join(f"{max(0.0, t - 0.001):.3f}" for t in points),
+                "-segment_format", "matroska",
+                "-reset_timestamps", "1",
+                os.path.join(tmp, "src%03d.mkv"),
+            ])
+            if not ok:
+                return False, err or "segment split failed"
+            sources = sorted(f for f in os.listdir(tmp) if f.startswith("src"))
+
+            # 2) segmenty paralelně, každý se svým dílem vláknového rozpočtu
+            budgets = split_budget(self.thread_budget, len(sources))
+            seg_recs = [ProgressRecord() for _ in sources]
+            lock = threading.Lock()
+
+            def encode(i: int) -> tuple[bool, str]:
+                def on_progress(rec, i=i):
+                    with lock:
+                        seg_recs[i] = rec
+                        # čas, fps, speed i bajty segmentů se sčítají – celkový výkon jobu
+                        self._report(ProgressRecord(
+                            out_time_us=sum(r.out_time_us for r in seg_recs),
+                            fps=sum(r.fps for r in seg_recs),
+                            speed=sum(r.speed for r in seg_recs),
+                            total_size=sum(r.total_size for r in seg_recs),
+                        ))
+                tb = budgets[i]
+                return self._run_ffmpeg([
+                    ff, "-y",
+                    *tb.ffmpeg_input_args(),
+                    "-i", os.path.join(tmp, sources[i]),
+                    "-map", "0:v:0",
+                    *self._video_args(tb),
+                    os.path.join(tmp, f"enc{i:03d}.mkv"),
+                ], on_progress, tb)
+
+            with ThreadPoolExecutor(max_workers=len(sources)) as ex:
+                results = list(ex.map(encode, range(len(sources))))
+            failed = [err for ok, err in results if not ok]
+            if failed:
+                return False, failed[0] or "segment encode failed"
+
+            # 3) concat demuxer (copy) + audio/titulky z originálu podle plánu jedním průchodem
+            list_path = os.path.join(tmp, "concat.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                for i in range(len(sources)):
+                    f.write(f"file 'enc{i:03d}.mkv'\n")
+            return self._run_ffmpeg([
+                ff, "-hide_banner", "-v", "error", "-nostdin", "-y",
+                "-f", "concat", "-safe", "0", "-i", list_path,
+                "-i", self.input_path,
+                "-map", "0:v:0", "-c:v", "copy",
+                *self.plan.ffmpeg_args([], self._audio_args(), kinds="as", input_index=1),
+                output_path,
+            ])
+
+    def _ladder_budgets(self) -> list[ThreadBudget]:
+        """Explicitní rozpočet výstupu, jinak díl rozpočtu jobu úměrný počtu pixelů (2160p ≈ 4× 1080p)."""
+        rs = self.renditions
+        shares = split_budget(self.thread_budget, len(rs), [r.height ** 2 for r in rs])
+        return [r.thread_budget or b for r, b in zip(rs, shares)]
+
+    def _rendition_video_args(self, r: Rendition, tb: ThreadBudget) -> list[str]:
+        args = video_encode_args(r.preset or self.preset, self.crf if r.crf is None else r.crf, tb)
+        if r.bitrate:
+            i = args.index("-crf")
+            args[i:i + 2] = ["-b:v", r.bitrate]
+        return args
+
+    def build_ladder_command(self, outputs: list[str]) -> list[str]:
+        """Jeden ffmpeg: dekód → split → scale pro každý výstup; audio/titulky podle plánu výstupu.
+        Volby před každým výstupem (kodek, CRF, x265 pools) platí jen pro něj."""
+        rs = self.renditions
+        video = next((a.stream.index for a in self.plan.actions if a.stream.kind == "v"), 0)
+        graph = f"[0:v:{video}]split={len(rs)}" + "".join(f"[s{i}]" for i in range(len(rs)))
+        for i, r in enumerate(rs):
+            graph += f";[s{i}]scale=w=-2:h='min(ih,{r.height})':flags=lanczos[v{i}]"
+        tb = self.thread_budget
+        cmd = [
+            self.ffmpeg_path, "-y",
+            *(tb.ffmpeg_input_args() if tb else []),
+            "-i", self.input_path,
+            "-filter_complex", graph,
+        ]
+        for i, (r, budget, out) in enumerate(zip(rs, self._ladder_budgets(), outputs)):
+            plan = plan_streams(self.probe, r.output_path, audio_codec=r.audio_codec)
+            cmd += ["-map", f"[v{i}]", *self._rendition_video_args(r, budget),
+                    *plan.ffmpeg_args([], ["-c:a", r.audio_codec, "-b:a", r.audio_bitrate], kinds="as"),
+                    out]
+        return cmd
+
+    def _convert_ladder(self) -> tuple[bool, str]:
+        """Všechny výstupy žebříčku jedním průchodem; každý se ověří a přejmenuje zvlášť."""
+        parts = [part_path(r.output_path) for r in self.renditions]
+        for r in self.renditions:
+            os.makedirs(os.path.dirname(os.path.abspath(r.output_path)), exist_ok=True)
+
+        def on_progress(rec: ProgressRecord):
+            shown = self._last_percent_shown
+            self._report(rec)
+            # jeden dekód → výstupy postupují stejně rychle; liší se velikostí
+            sizes = []
+            for i, part in enumerate(parts):
+                try:
+                    sizes.append(os.path.getsize(part))
+                except OSError:
+                    sizes.append(0)
+                if self.rendition_progress is not None and self.duration:
+                    percent = max(0.0, min(100.0, rec.out_time / self.duration * 100.0))
+                    self.rendition_progress[i].update(STATE_RUNNING, percent, rec.fps, rec.speed, sizes[i])
+            if self._last_percent_shown != shown:   # za "⏳ x %" z _report
+                self._print("  " + " · ".join(f"{r.height}p {n / 1048576:.1f} MB"
+                                              for r, n in zip(self.renditions, sizes)))
+
+        try:
+            ok, err = self._run_ffmpeg(self.build_ladder_command(parts), on_progress, self.thread_budget)
+        except BaseException:
+            for part in parts:
+                discard_output(part)
+            raise
+        self.rendition_errors = []
+        for r, part in zip(self.renditions, parts):
+            if not ok:
+                discard_output(part)
+                self.rendition_errors.append(err or "ffmpeg failed")
+                continue
+            plan = plan_streams(self.probe, r.output_path, audio_codec=r.audio_codec)
+            self.rendition_errors.append(finalize_output(part, r.output_path, self.duration, self._mi_dll,
+                                                         self._verifier(plan)))
+        failed = [e for e in self.rendition_errors if e]
+        if self.rendition_progress is not None:
+            for slot, e in zip(self.rendition_progress, self.rendition_errors):
+                slot.update(STATE_ERROR if e else STATE_DONE, 0.0 if e else 100.0)
+        return not failed, (failed[0] if failed else "")
+
+    def convert(self):
+        if os.path.exists(self.output_path) and not self.overwrite:
+            self._print(f"⚠️  Přeskočeno: {os.path.basename(self.output_path)}\n")
+            return False
+
+        if self.progress is not None:
+            self.progress.update(STATE_RUNNING)
+
+        if self.renditions:
+            ok, last_stderr = self._convert_ladder()
+            if not ok:
+                self.last_error = last_stderr or "ffmpeg failed"
+            if self.progress is not None:
+                self.progress.update(STATE_DONE if ok else STATE_ERROR, 100.0 if ok else 0.0)
+            self._print("\n✅ Hotovo\n" if ok else f"\n❌ Chyba: {self.last_error}\n")
+            return ok
+
+        # píšeme do dočasného souboru; cílové jméno dostane až ověřený výstup
+        tmp = part_path(self.output_path)
+        try:
+            if self._use_segments():
+                ok, last_stderr = self._convert_segmented(tmp)
+            else:
+                ok, last_stderr = self._run_ffmpeg(self.build_command(tmp), self._report, self.thread_budget)
+        except BaseException:
+            discard_output(tmp)
+            raise
+        if ok:
+            verify_err = finalize_output(tmp, self.output_path, self.duration, self._mi_dll,
+                                         self._verifier(self.plan))
+            if verify_err:
+                ok, last_stderr = False, verify_err
+        else:
+            discard_output(tmp)
 
         if not ok:
             self.last_error = last_stderr or "ffmpeg failed"
 
-        if self.progress_dict is not None:
-            self.progress_dict[self._progress_key] = "✅ Done" if ok else f"❌ Error: {self.last_error}"
+        if self.progress is not None:
+            self.progress.update(STATE_DONE if ok else STATE_ERROR, 100.0 if ok else 0.0)
 
         self._print("\n✅ Hotovo\n" if ok else f"\n❌ Chyba: {self.last_error}\n")
         return ok
 
+def _chunks(source, head: bytes):
+    """Hlavička (už přečtená kvůli probe) a pak zbytek zdroje po kusech."""
+    if head:
+        yield head
+    if isinstance(source, (bytes, bytearray)):
+        return
+    if hasattr(source, "read"):
+        while chunk := source.read(STREAM_READ):
+            yield chunk
+    else:
+        yield from source
+
+def _read_head(source, size: int) -> tuple[bytes, object]:
+    """Prvních size bajtů zdroje (file-like, iterátor bytes nebo bytes) → (hlavička, zbytek zdroje)."""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source), b""
+    buf = bytearray()
+    if hasattr(source, "read"):
+        while len(buf) < size and (chunk := source.read(size - len(buf))):
+            buf += chunk
+        return bytes(buf), source
+    it = iter(source)
+    for chunk in it:
+        buf += chunk
+        if len(buf) >= size:
+            break
+    return bytes(buf), it
+
+def convert_stream(source, sink, container: str = "mp4", name: str | None = None,
+                   preset: str | None = None, crf: int | None = None, thread_budget: ThreadBudget | None = None,
+                   on_progress=None, usage: ChildUsage | None = None) -> tuple[bool, str]:
+    """Enkód bez dočasných souborů: source (cesta, file-like s read(), iterátor bytes) → fragmentovaný
+    MP4/MKV do sink (file-like s write(), nebo callback(bytes)) průběžně, jak ho ffmpeg vyrábí.
+    Probe jde z hlavičky streamu (MediaInfo nad bufferem); cestu čte ffmpeg sám (seek → i MP4 s moov
+    na konci, ten z roury nepřečte ani ffmpeg). on_progress(ProgressRecord, duration | None). Vrací (ok, chyba)."""
+    if container not in STREAM_FORMATS:
+        raise ValueError(f"unsupported stream container: {container}")
+    ff = _find_tool("ffmpeg.exe")
+    if not ff:
+        return False, "ffmpeg.exe not found"
+    if isinstance(source, (str, os.PathLike)):
+        probe, input_arg, chunks = probe_media(os.fspath(source)), os.fspath(source), None
+    else:
+        head, rest = _read_head(source, STREAM_PROBE_BYTES)
+        probe = probe_stream(head, str(name or getattr(source, "name", None) or "pipe"))
+        input_arg, chunks = "pipe:0", _chunks(rest, head)
+    plan = plan_streams(probe, f"pipe.{container}", audio_codec=AUDIO_CODEC)
+    video_args = video_encode_args(preset, crf, thread_budget)
+    # z hlavičky nic nevyčteno → aspoň první video + audio, když existuje
+    stream_args = plan.ffmpeg_args(video_args, audio_encode_args()) if plan.actions else \
+        ["-map", "0:v:0", "-map", "0:a?", *video_args, *audio_encode_args()]
+    cmd = [
+        ff, "-hide_banner", "-v", "error", "-y",
+        *(thread_budget.ffmpeg_input_args() if thread_budget else []),
+        *(["-f", "hevc"] if probe.is_raw_hevc else []),
+        "-i", input_arg,
+        *stream_args,
+        *STREAM_FORMATS[container],
+        "pipe:1",
+    ]
+    write = sink.write if hasattr(sink, "write") else sink
+    progress = (lambda rec: on_progress(rec, probe.duration)) if on_progress else None
+    rc, errors = run_ffmpeg_stream(cmd, chunks, write, progress, cwd=_base_dir(),
+                                   preexec_fn=thread_budget.preexec() if thread_budget else None, usage=usage)
+    if hasattr(sink, "flush"):
+        sink.flush()
+    return rc == 0, ("" if rc == 0 else (errors[-1] if errors else "ffmpeg failed"))
+
+def _pipe_main(argv: list[str]) -> int:
+    """python AnyToH265Converter.py --pipe [--format mp4|mkv] [vstup] > výstup
+    Bez vstupu čte stdin. Médium jde na stdout, hlášky na stderr."""
+    import argparse
+    ap = argparse.ArgumentParser(description="Stream transcode to H.265 (fragmented MP4/MKV on stdout).")
+    ap.add_argument("--pipe", action="store_true")
+    ap.add_argument("--format", choices=sorted(STREAM_FORMATS), default="mp4")
+    ap.add_argument("--preset")
+    ap.add_argument("--crf", type=int)
+    ap.add_argument("input", nargs="?", help="input file (default stdin)")
+    args = ap.parse_args(argv)
+    last = [-1.0]
+
+    def on_progress(rec: ProgressRecord, duration: float | None):
+        done = rec.out_time / duration * 100.0 if duration else None
+        if rec.end or (done if done is not None else rec.out_time) - last[0] >= 1.0:
+            last[0] = done if done is not None else rec.out_time
+            text = f"{done:.1f}%" if done is not None else f"{rec.out_time:.0f} s"
+            sys.stderr.write(f"\r⏳ {text}  {rec.fps:.1f} fps  {rec.speed:.2f}x")
+            sys.stderr.flush()
+
+    source = args.input or sys.stdin.buffer
+    ok, err = convert_stream(source, sys.stdout.buffer, args.format, preset=args.preset, crf=args.crf,
+                             on_progress=on_progress)
+    sys.stderr.write("\n✅ Hotovo\n" if ok else f"\n❌ Chyba: {err}\n")
+    return 0 if ok else 1
+
+
+def _ladder_arg(argv: list[str]) -> list[int] | None:
+    """Výšky z "--ladder 2160,1080,720" (hodnota hned za přepínačem); špatná hodnota = konec s usage."""
+    if "--ladder" not in argv:
+        return None
+    i = argv.index("--ladder")
+    value = argv[i + 1] if i + 1 < len(argv) else ""
+    try:
+        heights = [int(h) for h in value.split(",")]
+    except ValueError:
+        heights = []
+    if not heights or min(heights) <= 0:
+        print(f"❌ Usage: --ladder HEIGHTS, e.g. --ladder 2160,1080,720 (got {value!r})")
+        sys.exit(2)
+    return heights
 
 if __name__ == "__main__":
+    if "--pipe" in sys.argv[1:]:
+        sys.exit(_pipe_main(sys.argv[1:]))
+
+    # --ladder 2160,1080,720 → všechny výšky z jednoho dekódu (output/<jméno>_<výška>p.mp4)
+    heights = _ladder_arg(sys.argv[1:])
+
     import tkinter as tk
     from tkinter import filedialog
 
@@ -170,9 +506,12 @@ if __name__ == "__main__":
         sys.exit(1)
 
     if not _find_tool("ffmpeg.exe"):
+        from download_ffmpeg import download_and_extract_ffmpeg
         download_and_extract_ffmpeg()
 
     if not _mediainfo_dll():
+        from download_MediaInfo import download_and_extract_mediainfo
         download_and_extract_mediainfo()
 
-    AnyToH265Converter(test_input, show_progress=True).convert()
+    renditions = ladder(test_input, heights) if heights else None
+    AnyToH265Converter(test_input, show_progress=True, renditions=renditions).convert()
@@ -0,0 +1,318 @@
+# AsyncBatchConverter.py
+import os, sys, time, asyncio, contextlib
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from ffmpeg_progress import ProgressParser, ProgressRecord, with_progress, ERR_LINES
+from job_journal import part_path, discard_output, finalize_output, is_verify_error
+from media_probe import MediaProbe, probe_media
+from scheduler import ThreadBudget, merge_budgets, take_slots
+from BatchConverter import (BatchConverter, _base_dir, _find_tool, _mediainfo_dll, _remux_command,
+                            _render_progress, _print_final, _enable_vt_output, _fmt_eta, _arg_value,
+                            _startup_report, _LOADED_AT, VERIFY_RETRIES)
+
+# Jeden Python proces, N ffmpeg potomků přes asyncio – žádný spawn workerů ani Manager.
+# Worker v BatchConverter stejně jen čeká na ffmpeg, takže proces na slot je zbytečný.
+# Umí: žurnál, ladění presetu/CRF, store (i duplicity v dávce), I/O limity a scratch, ověření výstupu
+# s opakováním a run log. Neumí (konstruktor je odmítne → BatchConverter): segmentový enkód,
+# adaptivní limit podle zátěže a distribuovaný režim.
+
+UNSUPPORTED = ("segment_threshold", "adaptive", "distributed")
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+@dataclass
+class JobEvent:
+    """Událost jobu: kind = "start" | "progress" | "done" | "error" | "skipped" | "retry"."""
+    job: str
+    kind: str
+    percent: float | None = None
+    error: str | None = None
+    record: ProgressRecord | None = None   # u "progress" – fps, speed, velikost, …
+    duration: float | None = None          # délka vstupu (s) – pro ETA
+
+def _proc_usage(pid: int) -> dict | None:
+    """CPU/RSS/IO běžícího ffmpeg z /proc (jen Linux). rusage přes os.wait4 tu nejde – potomka reapuje
+    child watcher asyncia; vzorkuje se s každým blokem progresu, takže chybí nejvýš poslední ~0,5 s."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read().rsplit(")", 1)[1].split()
+        usage = {"user": int(stat[11]) / _CLK_TCK, "sys": int(stat[12]) / _CLK_TCK, "children": 1}
+    except (OSError, IndexError, ValueError):
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    usage["peak_rss"] = int(line.split()[1]) * 1024
+        with open(f"/proc/{pid}/io") as f:
+            io = dict(line.split(":", 1) for line in f if ":" in line)
+        usage["disk_read"] = int(io["read_bytes"])
+        usage["disk_written"] = int(io["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        pass
+    return usage
+
+async def _drain(stream: asyncio.StreamReader, errors: deque):
+    """stderr jen do omezeného bufferu (progres chodí zvlášť přes -progress pipe:1)."""
+    while line := await stream.readline():
+        line = line.decode("utf-8", errors="replace").strip()
+        if line:
+            errors.append(line)
+
+class AsyncBatchConverter(BatchConverter):
+    def __init__(self, input_dir="input", reserve_cores=2, **kwargs):
+        unsupported = [k for k in UNSUPPORTED if kwargs.get(k)]
+        if unsupported:
+            raise ValueError(f"AsyncBatchConverter does not support {', '.join(unsupported)} – use BatchConverter")
+        super().__init__(input_dir=input_dir, reserve_cores=reserve_cores, **kwargs)
+        self._procs: set[asyncio.subprocess.Process] = set()
+        self._queued_at: float | None = None
+        self._first_start: float | None = None   # studený start dávky (žádné worker procesy tu nejsou)
+
+    async def _run_job(self, path: str, emit, thread_budget: ThreadBudget | None = None,
+                       probe: MediaProbe | None = None, retry: bool = False) -> str | None:
+        """Vrací chybu, nebo None (hotovo / převzato ze store). retry=True: neověřený výstup
+        ohlásí jako "retry" (dávka ho spustí znovu) místo "error"."""
+        key = self._display_name(path)
+        try:
+            # MediaInfo je blokující C knihovna → mimo event loop
+            probe = probe or await asyncio.to_thread(probe_media, path, _mediainfo_dll())
+            out_path = self._output_path_for(path, probe)
+            settings = self._settings_for(probe)
+            store_key = await asyncio.to_thread(self._store_key, path, settings)
+            if await asyncio.to_thread(self._reuse_stored, path, probe, out_path, settings, store_key,
+                                       self._queued_at):
+                emit(JobEvent(key, "skipped", 100.0))
+                return None
+            work_path = self._work_path(out_path)   # se scratchem se píše tam, přesun až po ověření
+            tmp = part_path(work_path)   # cílové jméno dostane až ověřený výstup
+            if probe.is_hevc:
+                ff = _find_tool("ffmpeg.exe")
+                if not ff:
+                    raise FileNotFoundError("ffmpeg.exe not found")
+                cmd = _remux_command(ff, path, probe, tmp)
+            else:
+                from AnyToH265Converter import AnyToH265Converter
+                conv = AnyToH265Converter(path, output_path=work_path, probe=probe, thread_budget=thread_budget,
+                                          **self.tuned.get(path, {}))
+                cmd = conv.build_command(tmp)
+
+            emit(JobEvent(key, "start", 0.0, duration=probe.duration))
+            started = time.time()
+            self._first_start = self._first_start or started
+            proc = await asyncio.create_subprocess_exec(
+                *with_progress(cmd),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=_base_dir(),
+                preexec_fn=thread_budget.preexec() if thread_budget else None,
+            )
+            self._procs.add(proc)
+            errors = deque(maxlen=ERR_LINES)
+            usage = None
+            drain = asyncio.create_task(_drain(proc.stderr, errors))
+            try:
+                parser = ProgressParser()
+                while line := await proc.stdout.readline():
+                    rec = parser.feed(line.decode("ascii", errors="replace"))
+                    if rec is not None:
+                        usage = _proc_usage(proc.pid) or usage
+                    if rec is not None and probe.duration:
+                        percent = max(0.0, min(100.0, rec.out_time / probe.duration * 100.0))
+                        emit(JobEvent(key, "progress", percent, record=rec, duration=probe.duration))
+                await drain
+                rc = await proc.wait()
+            except BaseException:
+                discard_output(tmp)
+                raise
+            finally:
+                drain.cancel()
+                self._procs.discard(proc)
+
+            if rc != 0:
+                discard_output(tmp)
+                err = errors[-1] if errors else "ffmpeg failed"
+            else:
+                check = None
+                if self.verify:
+                    from verify_output import verify_output
+                    plan = self._plan_for(probe)
+                    check = lambda p: verify_output(p, probe, plan)
+                err = await asyncio.to_thread(finalize_output, tmp, work_path, probe.duration, _mediainfo_dll(),
+                                              check)
+                if not err and self.stager is not None:
+                    err = await asyncio.wrap_future(self.stager.submit(work_path, out_path))
+            self._record_job(path, probe, out_path, not err, err, self._queued_at,
+                             {"started": started, "finished": time.time(),
+                              "threads": thread_budget.threads if thread_budget else None, **(usage or {})})
+            if err:
+                emit(JobEvent(key, "retry" if retry and is_verify_error(err) else "error", error=err))
+                return err
+            if self.journal:
+                self.journal.mark_done(path, settings, out_path)
+            if store_key:
+                await asyncio.to_thread(self.store.add, store_key, out_path)
+            emit(JobEvent(key, "done", 100.0))
+            return None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            emit(JobEvent(key, "error", error=str(e)))
+            return str(e)
+
+    async def events(self, files=None) -> AsyncIterator[JobEvent]:
+        """Async iterátor událostí všech jobů; max_workers ffmpeg procesů současně."""
+        files = self._get_video_files() if files is None else list(files)
+        queue: asyncio.Queue[JobEvent | None] = asyncio.Queue()
+        probes = await asyncio.to_thread(self._probe_all, files)
+        done_before = await asyncio.to_thread(self._resume, files, probes)
+        self._start_run_log()
+        self._queued_at = time.time()
+        for p in done_before:
+            queue.put_nowait(JobEvent(self._display_name(p), "skipped", 100.0))
+        todo = [p for p in files if p not in done_before]
+        # store: stejný obsah + nastavení v dávce → enkóduje se jen první kopie, ostatní se po ní nalinkují
+        followers: dict[str, list[str]] = {}
+        if self.store is not None and todo:
+            keys = await asyncio.to_thread(lambda: [self._store_key(p, self._settings_for(probes[p])) for p in todo])
+            leaders = {}
+            for p, k in zip(todo, keys):
+                if k is not None and k in leaders:
+                    followers.setdefault(leaders[k], []).append(p)
+                elif k is not None:
+                    leaders[k] = p
+        waiting = {f for fl in followers.values() for f in fl}
+        remux, encode = self._split_jobs([p for p in todo if p not in waiting], probes)
+        free = self._plan_slots(len(encode))
+        pending = deque(encode)   # LPT: nejdražší první
+        tasks: dict[asyncio.Task, tuple[list[ThreadBudget], str]] = {}
+        attempts: dict[str, int] = {}   # cesta -> počet opakování po neúspěšném ověření výstupu
+        remux_sem = asyncio.Semaphore(self.remux_workers)
+        dev_sems: dict[int, asyncio.Semaphore] = {}
+
+        async def remux_job(p, retry):
+            # celkový strop remuxu + limit každého zařízení (vstup i výstup); zámky vždy ve stejném
+            # pořadí, takže se dva joby nemůžou zablokovat navzájem
+            devs = sorted(self.limiter.devices(*self._io_paths(p, self._output_path_for(p, probes[p]))))
+            sems = [dev_sems.setdefault(d, asyncio.Semaphore(self.limiter.limit(d))) for d in devs]
+            async with remux_sem:
+                async with contextlib.AsyncExitStack() as stack:
+                    for sem in sems:
+                        await stack.enter_async_context(sem)
+                    return await self._run_job(p, queue.put_nowait, None, probes[p], retry)
+
+        def enqueue(p):
+            # remux běží ve vlastním pruhu, enkódovací sloty neblokuje
+            if probes[p].is_hevc:
+                tasks[asyncio.create_task(remux_job(p, attempts.get(p, 0) < VERIFY_RETRIES))] = ([], p)
+            else:
+                pending.appendleft(p)
+
+        async def dispatch():
+            for p in remux:
+                enqueue(p)
+            while pending or tasks:
+                # stejná logika slotů jako BatchConverter.convert_all
+                while pending and free:
+                    p = pending.popleft()
+                    slots = take_slots(free, len(pending) + 1)
+                    job = self._run_job(p, queue.put_nowait, merge_budgets(slots), probes[p],
+                                        attempts.get(p, 0) < VERIFY_RETRIES)
+                    tasks[asyncio.create_task(job)] = (slots, p)
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    slots, p = tasks.pop(t)
+                    free.extend(slots)
+                    if is_verify_error(t.result()) and attempts.get(p, 0) < VERIFY_RETRIES:
+                        attempts[p] = attempts.get(p, 0) + 1   # neověřený výstup → znovu na začátek fronty
+                        enqueue(p)
+                        continue
+                    # duplikáty: po hotové kopii se nalinkují ze store, po chybě se enkóduje další z nich
+                    rest = followers.pop(p, [])
+                    if rest:
+                        if rest[1:]:
+                            followers[rest[0]] = rest[1:]
+                        enqueue(rest[0])
+
+        dispatcher = asyncio.create_task(dispatch())
+        dispatcher.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (ev := await queue.get()) is not None:
+                yield ev
+        finally:
+            # konzument skončil dřív → zruš joby a zabij rozběhnuté ffmpeg
+            dispatcher.cancel()
+            for t in tasks:
+                t.cancel()
+            for proc in list(self._procs):
+                if proc.returncode is None:
+                    proc.kill()
+            await asyncio.gather(dispatcher, *tasks, return_exceptions=True)
+
+    async def _convert_all_async(self, files):
+        status = {self._display_name(p): "⏳ 0.0%" for p in files}
+        running: dict[str, JobEvent] = {}
+        retried: set[str] = set()
+        last, last_draw = 0, 0.0
+
+        def summary():
+            done = sum(1 for v in status.values() if v.startswith(("✅", "⏭️", "❌")))
+            recs = [ev.record for ev in running.values() if ev.record]
+            fps, speed = sum(r.fps for r in recs), sum(r.speed for r in recs)
+            return f"{done}/{len(status)} done · {fps:.0f} fps · {speed:.2f}x"
+
+        async for ev in self.events(files):
+            if ev.kind in ("start", "progress"):
+                running[ev.job] = ev
+                text = f"⏳ {ev.percent:.1f}%"
+                r = ev.record
+                if r and r.fps:
+                    text += f"  {r.fps:5.1f} fps  {r.speed:.2f}x"
+                if r and r.speed > 0 and ev.duration:
+                    text += f"  ETA {_fmt_eta((ev.duration - r.out_time) / r.speed)}"
+                status[ev.job] = text
+            elif ev.kind == "retry":
+                running.pop(ev.job, None)
+                retried.add(ev.job)
+                status[ev.job] = f"🔁 Retry: {ev.error or ''}"
+            else:
+                running.pop(ev.job, None)
+                done = "✅ Done (retried)" if ev.job in retried else "✅ Done"
+                status[ev.job] = {"done": done, "skipped": "⏭️  Already done"}.get(ev.kind) \
+                                 or f"❌ Error: {ev.error or ''}"
+            now = time.monotonic()
+            if now - last_draw >= 0.5 or ev.kind in ("done", "error", "skipped", "retry"):
+                last = _render_progress(status.items(), last, summary())
+                last_draw = now
+        _render_progress(status.items(), last, summary())
+        return sorted(status.items())
+
+    def convert_all(self):
+        files = self._get_video_files()
+        if not files:
+            print("❌ No supported video files found in the folder.")
+            return
+
+        self._ensure_tools()
+        print(f"🔁 Found {len(files)} videos. Starting conversion with up to {self.max_workers} ffmpeg jobs (asyncio)...\n")
+        _print_final(asyncio.run(self._convert_all_async(files)))
+        if self.stager:
+            self.stager.close()
+        if self.run_log is not None and self.run_log.summary():
+            print(self.run_log.summary())
+        print(_startup_report(_LOADED_AT, self._first_start, []))
+
+if __name__ == "__main__":
+    _enable_vt_output()
+    io_jobs = _arg_value("--io-jobs")
+    argv = sys.argv[1:]
+    try:
+        conv = AsyncBatchConverter(input_dir="input", reserve_cores=2, io_per_device=int(io_jobs) if io_jobs else None,
+                                   scratch_dir=_arg_value("--scratch"), verify="--no-verify" not in argv,
+                                   adaptive="--adaptive" in argv, distributed="--distributed" in argv)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+    conv.convert_all()
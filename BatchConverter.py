@@ -1,15 +1,30 @@
 # BatchConverter.py
-import os, sys, time, threading, multiprocessing
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from multiprocessing import Manager
+import os, sys, time, heapq, queue, threading, multiprocessing
+_LOADED_AT = time.time()   # start měření studeného startu (před importem modulů projektu)
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from collections import deque
-import subprocess
 
-from pymediainfo import MediaInfo  # ⬅️ kvůli _is_hevc
-from download_ffmpeg import download_and_extract_ffmpeg
-from download_MediaInfo import download_and_extract_mediainfo
+from content_store import ContentStore
+from device_limits import DeviceLimiter, ScratchStager
+from ffmpeg_progress import run_ffmpeg
+from folder_watch import iter_video_files, watch_files, DEFAULT_SETTLE, DEFAULT_POLL
+from job_journal import (JobJournal, settings_hash, part_path, commit_output, discard_output, finalize_output,
+                         is_verify_error)
+from job_metrics import ChildUsage, RunLog, job_record
+from pressure import PressureController, supported as _pressure_supported
+from media_probe import MediaProbe, probe_media  # ⬅️ jeden probe na job (sdílená cache na disku)
+from progress_board import (ProgressBoard, ProgressSlot, STATE_QUEUED, STATE_RUNNING, STATE_DONE, STATE_ERROR,
+                            STATE_SKIPPED, FINISHED_STATES)
+from work_queue import WorkQueue, job_key, FREE, LEASED, DONE
+from stream_plan import StreamPlan, plan_streams
+from scheduler import ThreadBudget, plan_slots, merge_budgets, take_slots, lpt_order, estimate_cost, DEFAULT_MIN_THREADS
+import tools
+from tools import _base_dir, find_tool as _find_tool, mediainfo_dll as _mediainfo_dll
 
-RAW_HEVC_EXT = {".hevc", ".h265", ".265"}  # ⬅️ raw HEVC bez kontejneru
+# raw HEVC (bez kontejneru) → MKV; demuxer nedá PTS posledním snímkům → doplní se z DTS
+RAW_HEVC_CONTAINER = ".mkv"
+RAW_HEVC_BSF = r"setts=pts=if(eq(PTS\,NOPTS)\,DTS\,PTS)"
+VERIFY_RETRIES = 1   # kolikrát se job zopakuje, když ffmpeg skončil OK, ale výstup neprošel ověřením
 
 def _enable_vt_output():
     if os.name == "nt":
@@ -25,158 +40,558 @@ def _enable_vt_output():
         except Exception:
             pass
 
-def _base_dir():
-    return os.path.dirname(sys.executable) if getattr(sys, "frozen", False) \
-           else os.path.dirname(os.path.abspath(__file__))
-
-def _find_tool(name: str) -> str | None:
-    b = _base_dir()
-    meipass = getattr(sys, "_MEIPASS", None)
-    for p in (
-        os.path.join(b, name),
-        os.path.join(b, "_internal", name),
-        os.path.join(meipass, name) if meipass else "",
-        os.path.join(meipass, "_internal", name) if meipass else "",
-    ):
-        if p and os.path.isfile(p):
-            return p
-    from shutil import which
-    return which(name)
-
-def _mediainfo_dll() -> str | None:
-    b = _base_dir()
-    meipass = getattr(sys, "_MEIPASS", None)
-    for p in (
-        os.path.join(b, "MediaInfo.dll"),
-        os.path.join(b, "_internal", "MediaInfo.dll"),
-        os.path.join(meipass, "MediaInfo.dll") if meipass else "",
-        os.path.join(meipass, "_internal", "MediaInfo.dll") if meipass else "",
-    ):
-        if p and os.path.isfile(p):
-            return p
-    return None
-
 # ------------------ HEVC detekce + remux (JEDNODUŠE) ------------------
 
 def _is_hevc(path: str) -> bool:
     """True, pokud je soubor HEVC/H.265 (včetně raw .hevc/.h265/.265)."""
-    ext = os.path.splitext(path)[1].lower()
-    if ext in RAW_HEVC_EXT:
-        return True
-    try:
-        mi = MediaInfo.parse(path)
-        for t in mi.tracks:
-            if t.track_type == "Video":
-                fmt = (getattr(t, "format", "") or "").lower()
-                cid = (getattr(t, "codec_id", "") or "").lower()
-                if "hevc" in fmt or "h265" in fmt or "hvc1" in cid or "hev1" in cid or "hevc" in cid:
-                    return True
-    except Exception:
-        pass
-    return False
-
-def _ffmpeg_copy_remux(input_path: str, progress_dict, key: str) -> tuple[bool, str | None]:
-    """Rychlý remux bez rekomprese. Raw HEVC → -f hevc + výstup .mkv, jinak zachová kontejner."""
-    ff = _find_tool("ffmpeg.exe")
-    if not ff:
-        return False, "ffmpeg.exe not found"
+    return probe_media(path, _mediainfo_dll()).is_hevc
 
+def _remux_output_path(input_path: str, probe: MediaProbe) -> str:
+    """Raw HEVC → RAW_HEVC_CONTAINER, jinak zachová kontejner."""
     ext = os.path.splitext(input_path)[1].lower()
     base = os.path.splitext(os.path.basename(input_path))[0]
     out_dir = os.path.join(_base_dir(), "output")
     os.makedirs(out_dir, exist_ok=True)
+    return os.path.join(out_dir, base + (RAW_HEVC_CONTAINER if probe.is_raw_hevc else ext))
 
-    input_opts = []
-    if ext in RAW_HEVC_EXT:
-        input_opts = ["-f", "hevc"]
-        out_path = os.path.join(out_dir, base + ".mkv")
-    else:
-        out_path = os.path.join(out_dir, base + ext)
-
-    # nech stav neutrální ("⏳ 0.0%") – nastavuje ho worker
+def _remux_plan(input_path: str, probe: MediaProbe) -> StreamPlan:
+    """Video copy; audio/titulky copy, pokud je kontejner unese (jinak se překódují)."""
+    from AnyToH265Converter import AUDIO_CODEC
+    return plan_streams(probe, _remux_output_path(input_path, probe), remux=True, audio_codec=AUDIO_CODEC)
 
-    cmd = [
+def _remux_command(ff: str, input_path: str, probe: MediaProbe, out_path: str | None = None) -> list[str]:
+    """Příkaz pro remux bez rekomprese videa. Raw HEVC → -f hevc (časy podle fps) + výstup .mkv,
+    jinak zachová kontejner."""
+    from AnyToH265Converter import audio_encode_args
+    input_opts = ["-f", "hevc", "-framerate", f"{probe.fps or 25:g}"] if probe.is_raw_hevc else []
+    return [
         ff,
         "-hide_banner", "-v", "error", "-nostdin",
         "-y",
         *input_opts,
         "-i", input_path,
-        "-c", "copy",
-        out_path
+        *_remux_plan(input_path, probe).ffmpeg_args([], audio_encode_args()),
+        *(["-bsf:v:0", RAW_HEVC_BSF] if probe.is_raw_hevc else []),
+        out_path or _remux_output_path(input_path, probe)
     ]
 
-    last = deque(maxlen=8)
-    p = subprocess.Popen(cmd, stderr=subprocess.PIPE, universal_newlines=True, cwd=_base_dir())
-    if p.stderr:
-        for line in p.stderr:
-            ls = (line or "").strip()
-            if ls:
-                last.append(ls)
-    p.wait()
-    ok = (p.returncode == 0)
-    err = None if ok else ("\n".join(last) or "ffmpeg copy failed")
-
-    if progress_dict is not None:
-        progress_dict[key] = "✅ Done" if ok else f"❌ Error: {err}"
+def _ffmpeg_copy_remux(input_path: str, progress: ProgressSlot | None,
+                       probe: MediaProbe | None = None, out_path: str | None = None,
+                       usage: ChildUsage | None = None, verify: bool = True) -> tuple[bool, str | None]:
+    """Rychlý remux bez rekomprese (příkaz viz _remux_command) – přes dočasný soubor a atomický rename."""
+    ff = _find_tool("ffmpeg.exe")
+    if not ff:
+        return False, "ffmpeg.exe not found"
+
+    probe = probe or probe_media(input_path, _mediainfo_dll())
+    out_path = out_path or _remux_output_path(input_path, probe)
+    tmp = part_path(out_path)
+    # stav "běží" nastavuje worker
+    cmd = _remux_command(ff, input_path, probe, tmp)
+
+    def on_progress(rec):
+        # remux teď taky hlásí procenta (z -progress), stejně jako enkód
+        if progress is not None and probe.duration:
+            percent = max(0.0, min(100.0, rec.out_time / probe.duration * 100.0))
+            progress.update(STATE_RUNNING, percent, rec.fps, rec.speed, rec.total_size)
+
+    try:
+        rc, errors = run_ffmpeg(cmd, on_progress, cwd=_base_dir(), usage=usage)
+    except BaseException:
+        discard_output(tmp)
+        raise
+    ok = (rc == 0)
+    err = None if ok else ("\n".join(errors) or "ffmpeg copy failed")
+    if ok:
+        check = None
+        if verify:
+            from verify_output import verify_output
+            plan = _remux_plan(input_path, probe)
+            check = lambda path: verify_output(path, probe, plan)
+        err = finalize_output(tmp, out_path, probe.duration, _mediainfo_dll(), check)
+        ok = err is None
+    else:
+        discard_output(tmp)
+
+    if progress is not None:
+        progress.update(STATE_DONE if ok else STATE_ERROR, 100.0 if ok else 0.0)
     return ok, err
 
+def _render_progress(items, last: int, summary: str = "") -> int:
+    """Překreslí tabulku stavů na místě (ANSI). Vrací počet řádků pro příští přepis."""
+    lines = [f"📊 Conversion in progress:{'  ' + summary if summary else ''}\n"]
+    for k, v in sorted(items):
+        name = k if len(k) <= 40 else k[:37] + "..."
+        lines.append(f"  {name:<40} {v}")
+    out = "\n".join(lines) + "\n"
+    if last:
+        try:
+            sys.stdout.write(f"\x1b[{last}F")
+        except Exception:
+            pass
+    sys.stdout.write(out); sys.stdout.flush()
+    return len(lines) + 1
+
+def _fmt_eta(seconds: float) -> str:
+    seconds = int(max(0, seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+def _remaining(rec, duration: float | None) -> float:
+    """Kolik sekund média jobu ještě zbývá zpracovat."""
+    state, percent = rec[0], rec[1]
+    if state in FINISHED_STATES or not duration:
+        return 0.0
+    return duration * (1.0 - percent / 100.0)
+
+def _batch_summary(recs, durations) -> str:
+    """Souhrn celé dávky: hotovo/celkem, součet fps a speed, odhad konce."""
+    done = sum(1 for r in recs if r[0] in FINISHED_STATES)
+    running = [r for r in recs if r[0] == STATE_RUNNING]
+    fps = sum(r[2] for r in running)
+    speed = sum(r[3] for r in running)
+    text = f"{done}/{len(recs)} done · {fps:.0f} fps · {speed:.2f}x"
+    if speed > 0:
+        left = sum(_remaining(r, d) for r, d in zip(recs, durations))
+        text += f" · ETA {_fmt_eta(left / speed)}"
+    return text
+
+def _format_status(rec, error: str | None = None, duration: float | None = None) -> str:
+    """Text pro jeden záznam z ProgressBoard – formátuje se jen tady (v rendereru)."""
+    state, percent, fps, speed, out_bytes = rec
+    if state == STATE_DONE:
+        return "✅ Done (retried)" if error else "✅ Done"
+    if state == STATE_ERROR:
+        return f"❌ Error: {error or ''}"
+    if state == STATE_SKIPPED:
+        return "⏭️  Already done"
+    if state == STATE_QUEUED:
+        return f"🔁 Retry: {error}" if error else "🕓 Queued"
+    text = f"⏳ {percent:.1f}%"
+    if fps:
+        text += f"  {fps:5.1f} fps  {speed:.2f}x"
+    if out_bytes:
+        text += f"  {out_bytes / 1048576:.1f} MB"
+    if speed > 0 and duration:
+        text += f"  ETA {_fmt_eta(_remaining(rec, duration) / speed)}"
+    return text
+
+def _print_final(final_items):
+    print("\n📊 Final status:")
+    for k, v in final_items:
+        print(f"  {k:<40} {v}")
+    print("\n🎉 All conversions finished.")
+
+def _startup_report(loaded_at: float, first_submit: float | None, cold_starts: list[float]) -> str:
+    """Studený start: dávka (import → první job) a worker procesy (submit → start prvního jobu)."""
+    if first_submit is None:
+        return ""
+    text = f"🚀 Cold start: batch {first_submit - loaded_at:.2f} s to first job"
+    if cold_starts:
+        text += (f" · workers {sum(cold_starts) / len(cold_starts):.2f} s avg / {max(cold_starts):.2f} s max "
+                 f"({len(cold_starts)} spawned)")
+    return text
+
 # ------------------ Worker ------------------
 
-def convert_one_file(file_path, progress_dict):
-    try:
-        base = os.path.basename(file_path)
+_worker_jobs = None   # počet jobů v tomto worker procesu (None = nejsme v poolu, např. remux pruh)
 
+def _init_worker(tool_paths: dict):
+    """Initializer poolu: cesty k nástrojům od rodiče, worker je sám nehledá."""
+    global _worker_jobs
+    tools.seed(tool_paths)
+    _worker_jobs = 0
+
+def convert_one_file(file_path, progress: ProgressSlot | None, thread_budget: ThreadBudget | None = None,
+                     probe: MediaProbe | None = None, conv_opts: dict | None = None, output_path: str | None = None):
+    """Worker. Vrací (file_path, ok, chyba, stats) – stats = začátek/konec + rusage ffmpeg potomků
+    (cold = první job čerstvě spuštěného worker procesu)."""
+    global _worker_jobs
+    started = time.time()
+    usage = ChildUsage()
+    cold = _worker_jobs == 0
+    if _worker_jobs is not None:
+        _worker_jobs += 1
+
+    def stats():
+        return {"started": started, "finished": time.time(), "cold": cold,
+                "threads": thread_budget.threads if thread_budget else None, **usage.as_dict()}
+
+    try:
         # Před startem nastav neutrální stav
-        if progress_dict is not None:
-            progress_dict[base] = "⏳ 0.0%"
+        if progress is not None:
+            progress.set_pid(os.getpid())   # pro PressureController (pozastavení / renice stromu ffmpeg)
+            progress.update(STATE_RUNNING)
+
+        # jediný probe za celý job (typicky už z rodiče) – dál se předává remuxu i konvertoru
+        probe = probe or probe_media(file_path, _mediainfo_dll())
 
         # HEVC? -> remux; jinak transcode přes AnyToH265Converter
-        if _is_hevc(file_path):
-            ok, err = _ffmpeg_copy_remux(file_path, progress_dict, base)
-            return (file_path, ok, err)
+        if probe.is_hevc:
+            ok, err = _ffmpeg_copy_remux(file_path, progress, probe=probe, out_path=output_path, usage=usage,
+                                         verify=(conv_opts or {}).get("verify", True))
+            return (file_path, ok, err, stats())
         else:
             from AnyToH265Converter import AnyToH265Converter
             conv = AnyToH265Converter(
                 file_path,
-                progress_dict=progress_dict,
-                show_progress=False
+                output_path=output_path,
+                progress=progress,
+                show_progress=False,
+                probe=probe,
+                thread_budget=thread_budget,
+                **(conv_opts or {})
             )
+            usage = conv.usage
             ok = conv.convert()
             err = getattr(conv, "last_error", "")
-            return (file_path, ok, err if not ok else None)
+            return (file_path, ok, err if not ok else None, stats())
 
     except Exception as e:
-        return (file_path, False, str(e))
+        return (file_path, False, str(e), stats())
 
 # ------------------ Třída BatchConverter ------------------
 
 class BatchConverter:
-    def __init__(self, input_dir="input", reserve_cores=2):
+    def __init__(self, input_dir="input", reserve_cores=2, min_threads_per_job=DEFAULT_MIN_THREADS, pin_cpus=False,
+                 remux_workers=4, segment_threshold=None, segment_count=4, resume=True, recursive=False,
+                 time_budget=None, target_size_mb=None, metrics=True, prom_path=None,
+                 io_per_device=None, scratch_dir=None, store=True, store_max_gb=None,
+                 adaptive=False, pressure_action="stop", distributed=False, queue_dir=None, verify=True):
         self.input_dir = os.path.join(_base_dir(), input_dir)
+        self.recursive = recursive   # i podsložky (struktura se zrcadlí do output/)
+        self.reserve_cores = reserve_cores
+        self.min_threads_per_job = min_threads_per_job
+        self.pin_cpus = pin_cpus   # os.sched_setaffinity – jen kde to OS umí
+        self.remux_workers = max(1, remux_workers)   # vlastní pruh pro remux, neblokuje enkódovací sloty
+        # remux = sekvenční I/O → souběh se hlídá po zařízeních (vstup i výstup); None = podle typu disku
+        self.limiter = DeviceLimiter(io_per_device)
+        # výstupy nejdřív na rychlý lokální scratch, do output/ je přesune mover na pozadí
+        self.stager = ScratchStager(scratch_dir, self.limiter) if scratch_dir else None
+        # hotové výstupy podle obsahu vstupu – duplicitní video (jiné jméno/cesta) se neenkóduje znovu
+        self.store = None
+        if store:
+            self.store = ContentStore() if store_max_gb is None else ContentStore(max_bytes=int(store_max_gb * 1024 ** 3))
+        # soubory delší než segment_threshold (s) se enkódují po segmentech paralelně
+        self.segment_threshold = segment_threshold
+        self.segment_count = segment_count
+        # žurnál hotových jobů – opakovaný běh přeskočí, co už je hotové a ověřené
+        self.journal = JobJournal() if resume else None
+        # volitelné ladění presetu/CRF ze vzorků: dávka do time_budget (s) / výstup do target_size_mb
+        self.time_budget = time_budget
+        self.target_size_mb = target_size_mb
+        self.tuned: dict[str, dict] = {}   # cesta -> {"preset": …, "crf": …}
+        # run log po jobech (metrics/runs.jsonl + .csv) a Prometheus textfile (prom_path, jinak metrics/)
+        self.metrics = metrics
+        self.prom_path = prom_path
+        self.run_log: RunLog | None = None
+        # adaptivní počet enkódů podle zátěže stroje (cizí CPU, PSI); přebytečné joby SIGSTOP / renice
+        self.adaptive = adaptive
+        self.pressure_action = pressure_action
+        self.pressure: PressureController | None = None
+        # víc strojů nad sdíleným input/ + output/: job se bere přes lease soubor ve frontě na share
+        self.queue = WorkQueue(queue_dir) if distributed else None
+        if self.queue is not None and self.stager is not None:
+            self.stager.part_tag = self.queue.node
+        # výstup se před přejmenováním ověří (streamy + vzorky dekódu); neprošlý job jde znovu do fronty
+        self.verify = verify
         total_cores = multiprocessing.cpu_count()
-        self.max_workers = max(1, total_cores - reserve_cores)
+        self.max_workers = max(1, (total_cores - reserve_cores) // max(1, min_threads_per_job))
         self.supported_ext = (".mp4", ".avi", ".mkv", ".mov", ".flv", ".mpeg", ".mpg", ".hevc", ".h265", ".265")
 
     def _get_video_files(self):
         if not os.path.exists(self.input_dir):
             raise FileNotFoundError(f"Folder '{self.input_dir}' does not exist.")
-        return [
-            os.path.join(self.input_dir, f)
-            for f in os.listdir(self.input_dir)
-            if f.lower().endswith(self.supported_ext)
-        ]
+        return list(iter_video_files(self.input_dir, self.supported_ext, self.recursive))
+
+    def _display_name(self, path: str) -> str:
+        return os.path.relpath(path, self.input_dir) if self.recursive else os.path.basename(path)
 
     def _ensure_tools(self):
-        # stáhni jen pokud opravdu chybí (MEIPASS-aware)
+        # stáhni jen pokud opravdu chybí (MEIPASS-aware); chybí-li oba, stahují se souběžně
+        # downloadery (urllib, zipfile) se importují, jen když je opravdu potřeba stahovat
+        missing = []
         if _find_tool("ffmpeg.exe"):
             print("✅ ffmpeg.exe already exists.")
         else:
-            download_and_extract_ffmpeg()
+            from download_ffmpeg import FFMPEG_SPEC
+            missing.append(FFMPEG_SPEC)
 
         if _mediainfo_dll():
             print("✅ MediaInfo.dll už existuje.")
         else:
-            download_and_extract_mediainfo()
+            from download_MediaInfo import MEDIAINFO_SPEC
+            missing.append(MEDIAINFO_SPEC)
+
+        if missing:
+            from bootstrap import ensure_tools
+            print(f"⬇️ Downloading {', '.join(s.name for s in missing)}...")
+            ensure_tools(missing)
+
+    def _probe_all(self, files) -> dict[str, MediaProbe]:
+        # MediaInfo volá C knihovnu přes ctypes (uvolní GIL) → vlákna stačí
+        dll = _mediainfo_dll()
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            return dict(zip(files, ex.map(lambda p: probe_media(p, dll), files)))
+
+    def _split_jobs(self, files, probes) -> tuple[list[str], list[str]]:
+        """(remux, encode) – obojí seřazené LPT podle odhadu ceny."""
+        ordered = lpt_order(files, probes)
+        return [p for p in ordered if probes[p].is_hevc], [p for p in ordered if not probes[p].is_hevc]
+
+    def _output_path_for(self, path: str, probe: MediaProbe) -> str:
+        if probe.is_hevc:
+            out = _remux_output_path(path, probe)
+        else:
+            from AnyToH265Converter import default_output_path
+            out = default_output_path(path)
+        # podsložka vstupu → stejná podsložka ve výstupu (input/a/x.avi → output/a/x.mp4)
+        rel = os.path.relpath(os.path.dirname(os.path.abspath(path)), self.input_dir)
+        if rel != "." and not rel.startswith(".."):
+            out_dir = os.path.join(os.path.dirname(out), rel)
+            os.makedirs(out_dir, exist_ok=True)
+            out = os.path.join(out_dir, os.path.basename(out))
+        # x.avi a x.mkv vedle sebe by skončily obě jako x.mp4 → přípona zdroje do jména (x_avi.mp4)
+        stem, ext = os.path.splitext(path)
+        if any(os.path.exists(stem + e) for e in self.supported_ext if e != ext.lower()):
+            base, out_ext = os.path.splitext(out)
+            out = f"{base}_{ext.lstrip('.').lower()}{out_ext}"
+        return out
+
+    def _work_path(self, out: str) -> str:
+        """Kam worker skutečně píše – cílová cesta, obraz na scratchi, nebo (distribuovaně) jméno
+        vlastní tomuto uzlu, které se na cílové přejmenuje až s ověřeným lease (_complete_job)."""
+        if self.stager:
+            return self.stager.stage_path(out)
+        if self.queue is not None:
+            return part_path(out, self.queue.node)
+        return out
+
+    def _io_paths(self, path: str, out: str) -> tuple[str, str]:
+        return path, self._work_path(out)
+
+    def _store_key(self, path: str, settings: str) -> str | None:
+        if self.store is None:
+            return None
+        try:
+            return self.store.key(path, settings)
+        except OSError:
+            return None
+
+    def _reuse_stored(self, path: str, probe: MediaProbe, out: str, settings: str, key: str | None,
+                      queued_at: float | None = None) -> bool:
+        """Výstup se stejným obsahem vstupu a nastavením už ve store je → hardlink/kopie místo enkódu."""
+        if key is None or not self.store.materialize(key, out):
+            return False
+        if self.journal:
+            self.journal.mark_done(path, settings, out)
+        if self.run_log is not None:
+            try:
+                self.run_log.record(job_record(self.run_log.run_id, path, out, True, "store", probe, queued_at))
+            except OSError:
+                pass
+        return True
+
+    def _complete_job(self, path: str, probe: MediaProbe, out: str, settings: str, ok: bool, err: str | None,
+                      queued_at: float | None, stats: dict | None, report, retry=None):
+        """Dokončený job: přesun ze scratche (na pozadí), žurnál, store, run log a nakonec report(ok, err).
+        Žurnál se zapíše až ve chvíli, kdy výstup leží ve finální složce.
+        retry(err) = výstup neprošel ověřením a job smí jít znovu (lease ve frontě zůstává náš)."""
+        if retry is not None and not ok and is_verify_error(err):
+            self._record_job(path, probe, out, False, err, queued_at, stats)
+            retry(err)
+            return
+        work = self._work_path(out)
+        if not self._still_ours(path, probe):
+            # lease mezitím převzal jiný uzel → výsledek zahodit, hotový ho ohlásí ten druhý
+            discard_output(work)
+            self._record_job(path, probe, out, False, "lease lost", queued_at, stats)
+            report(False, "taken over by another node")
+            return
+        if ok and self.queue is not None and self.stager is None:
+            try:
+                commit_output(work, out)
+            except OSError as e:
+                ok, err = False, f"move to output failed: {e}"
+
+        def finish(move_err=None):
+            done, error = (False, move_err) if move_err else (ok, err)
+            if done and self.journal:
+                self.journal.mark_done(path, settings, out)
+            if done and self.store is not None:
+                key = self._store_key(path, settings)
+                if key:
+                    self.store.add(key, out)
+            if self.queue is not None:
+                try:
+                    self.queue.finish(self._queue_key(path, probe), done, error)
+                except OSError:
+                    pass
+            self._record_job(path, probe, out, done, error, queued_at, stats)
+            report(done, error)
+
+        if ok and self.stager is not None:
+            self.stager.submit(work, out, finish)
+        else:
+            finish()
+
+    def _queue_key(self, path: str, probe: MediaProbe) -> str:
+        """Stejný na všech uzlech: identita vstupu + nastavení, o která požádal uživatel.
+        Preset/CRF z _tune se na každém uzlu (jiný hardware) může lišit, proto v klíči není."""
+        return job_key(os.path.relpath(path, self.input_dir), path, self._settings_for(probe, requested=True))
+
+    def _claim(self, path: str, probe: MediaProbe) -> bool:
+        """Distribuovaný režim: job je náš, jen když se podaří vzít lease (jinak ho dělá / udělal jiný uzel)."""
+        if self.queue is None:
+            return True
+        try:
+            return self.queue.claim(self._queue_key(path, probe), self._display_name(path))
+        except OSError:
+            return False
+
+    def _still_ours(self, path: str, probe: MediaProbe) -> bool:
+        """Distribuovaný režim: lease jobu pořád drží tento uzel (heartbeat ho mohl ztratit)."""
+        if self.queue is None:
+            return True
+        try:
+            return self.queue.holds(self._queue_key(path, probe))
+        except OSError:
+            return True   # vstup zrovna nejde přečíst – lease se ověřit nedá, výsledek necháme
+
+    def _settle_elsewhere(self, elsewhere: dict) -> list[tuple]:
+        """elsewhere = {cesta: probe} jobů, které drží jiné uzly. Vrací [(cesta, stav)] těch,
+        které už nikdo nedrží – hotové (DONE), vzdané (FAILED), nebo volné po mrtvém uzlu (FREE)."""
+        settled = []
+        for path, probe in list(elsewhere.items()):
+            try:
+                state = self.queue.state(self._queue_key(path, probe))
+            except OSError:
+                continue   # vstup zrovna nejde přečíst (share) – příště
+            if state != LEASED:
+                del elsewhere[path]
+                settled.append((path, state))
+        return settled
+
+    def _plan_for(self, probe: MediaProbe) -> StreamPlan:
+        if probe.is_hevc:
+            return _remux_plan(probe.path, probe)
+        from AnyToH265Converter import default_output_path, AUDIO_CODEC
+        return plan_streams(probe, default_output_path(probe.path), audio_codec=AUDIO_CODEC)
+
+    def _settings_for(self, probe: MediaProbe, requested: bool = False) -> str:
+        """Hash nastavení, která určují výstup – spolu s otiskem vstupu klíč žurnálu.
+        requested=True: místo vyladěného presetu/CRF jen zadání ladění (time_budget / target_size_mb)."""
+        from AnyToH265Converter import encode_settings
+        plan = self._plan_for(probe).settings()
+        if probe.is_hevc:
+            return settings_hash({"mode": "remux", "raw": probe.is_raw_hevc, "plan": plan,
+                                  "audio": encode_settings()["audio"]})
+        if requested:
+            return settings_hash({"mode": "encode", **encode_settings(), "plan": plan,
+                                  "tune": [self.time_budget, self.target_size_mb]})
+        return settings_hash({"mode": "encode", **encode_settings(**self.tuned.get(probe.path, {})), "plan": plan})
+
+    def _conv_opts(self, path: str | None = None) -> dict:
+        """Extra kwargs pro AnyToH265Converter (předávají se do workeru)."""
+        return {"segment_threshold": self.segment_threshold, "segment_count": self.segment_count,
+                "verify": self.verify, **self.tuned.get(path, {})}
+
+    def _resume(self, files, probes) -> set:
+        """Soubory hotové podle žurnálu; zbytku dávky vyladí preset/CRF.
+        Klíč žurnálu obsahuje preset/CRF, proto se nejdřív načtou dřívější volby (bez vzorkování) a hotové
+        soubory se do ladění vůbec nepustí – jinak by nový plán změnil jejich nastavení a enkódovaly by se znovu."""
+        if self.time_budget or self.target_size_mb:
+            from AnyToH265Converter import X265_PRESET, X265_CRF
+            from preset_tuner import stored_choices
+            self.tuned = stored_choices([probes[p] for p in files if not probes[p].is_hevc],
+                                        self.time_budget, self.target_size_mb, X265_PRESET, X265_CRF)
+        done = {p for p in files if self.journal and self.journal.is_done(p, self._settings_for(probes[p]))}
+        self._tune([p for p in files if p not in done], probes, done)
+        return done
+
+    def _tune(self, files, probes, done=()):
+        """Preset/CRF pro enkódované soubory ze zkušebních vzorků (jen s time_budget / target_size_mb).
+        done = hotové soubory dávky – nevzorkují se, jen jejich výstupy ubírají z rozpočtu velikosti."""
+        if not (self.time_budget or self.target_size_mb):
+            return
+        from AnyToH265Converter import X265_PRESET, X265_CRF
+        from preset_tuner import tune_batch
+        encode = [probes[p] for p in files if not probes[p].is_hevc]
+        if not encode:
+            return
+        spent = 0
+        for p in done:
+            if not probes[p].is_hevc:
+                try:
+                    spent += os.path.getsize(self._output_path_for(p, probes[p]))
+                except OSError:
+                    pass
+        slots = plan_slots(len(encode), reserve_cores=self.reserve_cores,
+                           min_threads=self.min_threads_per_job, pin=self.pin_cpus)
+        new = sum(1 for pr in encode if pr.path not in self.tuned)
+        if new:
+            print(f"🧪 Sampling {new} videos to pick preset/CRF...")
+        self.tuned.update(tune_batch(_find_tool("ffmpeg.exe"), encode, slots, self.time_budget,
+                                     self.target_size_mb, X265_PRESET, X265_CRF, spent_mb=spent / 1e6))
+        picks = {}
+        for pr in encode:
+            choice = self.tuned.get(pr.path)
+            if choice:
+                key = f"{choice['preset']}/crf {choice['crf']}"
+                picks[key] = picks.get(key, 0) + 1
+        print("🎚️  " + (", ".join(f"{n}× {k}" for k, n in sorted(picks.items())) or "defaults kept"))
+
+    def _encode_choice(self, path: str) -> dict:
+        """Preset/CRF, se kterým se soubor enkóduje (vyladěný, jinak výchozí)."""
+        from AnyToH265Converter import X265_PRESET, X265_CRF
+        return {"preset": X265_PRESET, "crf": X265_CRF, **self.tuned.get(path, {})}
+
+    def _slots_wanted(self, probe: MediaProbe) -> int:
+        # segmentovaný job si řekne o slot na segment (dostane je, jen pokud jsou volné)
+        if self.segment_threshold and probe.duration and probe.duration > self.segment_threshold:
+            return self.segment_count
+        return 1
+
+    def _start_run_log(self):
+        self.run_log = RunLog(prom_path=self.prom_path) if self.metrics else None
+
+    def _record_job(self, path: str, probe: MediaProbe, output: str, ok: bool, err: str | None,
+                    queued_at: float | None, stats: dict | None):
+        if self.run_log is None:
+            return
+        mode = "remux" if probe.is_hevc else "segments" if self._slots_wanted(probe) > 1 else "encode"
+        try:
+            self.run_log.record(job_record(self.run_log.run_id, path, output, ok, mode, probe, queued_at, stats, err,
+                                           None if probe.is_hevc else self._encode_choice(path)))
+        except OSError:
+            pass   # metriky nesmí shodit dávku
+
+    def _plan_slots(self, n_jobs: int) -> list[ThreadBudget]:
+        slots = plan_slots(n_jobs, reserve_cores=self.reserve_cores,
+                           min_threads=self.min_threads_per_job, pin=self.pin_cpus)
+        self.max_workers = len(slots)
+        self.pressure = self._make_pressure(slots)
+        return slots
+
+    def _make_pressure(self, slots: list[ThreadBudget]) -> PressureController | None:
+        if not self.adaptive or not slots:
+            return None
+        if not _pressure_supported():
+            print("⚠️  Adaptive mode needs Linux /proc – using the static job limit.")
+            return None
+        ctrl = PressureController(max_jobs=len(slots), threads_per_job=slots[0].threads,
+                                  action=self.pressure_action)
+        if ctrl.action != self.pressure_action:
+            print(f"⚠️  --pressure-action {self.pressure_action} needs root / CAP_SYS_NICE – "
+                  f"pausing jobs (SIGSTOP) instead.")
+        return ctrl
+
+    def _pressure_tick(self, running: dict, board: ProgressBoard):
+        """running = {future: index na boardu} běžících enkódů (v pořadí spuštění)."""
+        if self.pressure is not None:
+            self.pressure.update({idx: board.pid(idx) for idx in running.values()})
+
+    def _can_start_encode(self, running: dict) -> bool:
+        return self.pressure is None or self.pressure.can_start(len(running))
 
     def convert_all(self):
         files = self._get_video_files()
@@ -185,64 +600,488 @@ class BatchConverter:
             return
 
         self._ensure_tools()
-        print(f"🔁 Found {len(files)} videos. Starting conversion with {self.max_workers} processes...\n")
+        probes = self._probe_all(files)
+        done_before = self._resume(files, probes)
+        outputs = {p: self._output_path_for(p, probes[p]) for p in files}
+        settings = {p: self._settings_for(probes[p]) for p in files}
+        self._start_run_log()
+        queued_at = time.time()   # čekání ve frontě se měří od startu dávky
 
-        final_items = []
+        # store: stejný obsah + nastavení → výstup z dřívějška; v dávce se enkóduje jen první kopie
+        todo = [p for p in files if p not in done_before]
+        keys, reused, leaders, followers = {}, set(), {}, {}
+        if self.store is not None and todo:
+            with ThreadPoolExecutor(max_workers=8) as ex:
+                keys = dict(zip(todo, ex.map(lambda p: self._store_key(p, settings[p]), todo)))
+            for p in todo:
+                k = keys[p]
+                if self._reuse_stored(p, probes[p], outputs[p], settings[p], k, queued_at):
+                    reused.add(p)
+                elif k is not None and k in leaders:
+                    followers.setdefault(leaders[k], []).append(p)
+                elif k is not None:
+                    leaders[k] = p
+        waiting = {f for fl in followers.values() for f in fl}
+        remux, encode = self._split_jobs([p for p in todo if p not in reused and p not in waiting], probes)
+        free = self._plan_slots(len(encode))
+        if done_before:
+            print(f"⏭️  {len(done_before)} videos already converted (journal) – skipping.")
+        if reused:
+            print(f"♻️  {len(reused)} videos reused from the output store (same content, same settings).")
+        if waiting:
+            print(f"🧬 {len(waiting)} duplicates will be linked from their first copy.")
+        print(f"🔁 Found {len(files)} videos ({len(encode)} to encode, {len(remux)} to remux). "
+              f"Starting conversion with {self.max_workers} processes "
+              f"({'/'.join(str(b.threads) for b in free)} threads)...")
+        if remux:
+            print(f"💽 Remux I/O per device: {self.limiter.describe(*{q for p in remux for q in self._io_paths(p, outputs[p])})}")
+        if self.stager:
+            print(f"📦 Staging outputs in {self.stager.scratch_dir}")
+        if self.queue:
+            print(f"🌐 Distributed mode: node {self.queue.node}, queue {self.queue.queue_dir} "
+                  f"({self.queue.nodes()} nodes)")
+        print()
 
-        with Manager() as manager:
-            progress_dict = manager.dict()
+        errors = {}
+        index = {p: i for i, p in enumerate(files)}
+        names = [self._display_name(p) for p in files]
+        durations = [probes[p].duration for p in files]
+
+        with ProgressBoard(len(files)) as board:
+            for p in done_before | reused:
+                board.slot(index[p]).update(STATE_SKIPPED, 100.0)
 
             ctx = multiprocessing.get_context("spawn")
-            with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx) as executor:
-                futures = {executor.submit(convert_one_file, p, progress_dict): p for p in files}
+            with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx, initializer=_init_worker,
+                                     initargs=(tools.resolved(),)) as executor, \
+                 ThreadPoolExecutor(max_workers=self.remux_workers) as remux_lane:
+                # remux = čisté I/O → vlákna v rodiči, vlastní pruh mimo enkódovací sloty
+                futures = {}              # future -> sloty (remux: [])
+                submitted = {}            # future -> čas odeslání (studený start workeru)
+                cold_starts = []
+                io_held = {}              # future -> zařízení držená remuxem
+                encoding = {}             # future -> index na boardu (běžící enkódy, pro PressureController)
+                ctrl = self.pressure
+                elsewhere = {}            # cesta -> probe: job drží jiný uzel (distribuovaný režim)
+                attempts = {}             # cesta -> počet opakování po neúspěšném ověření výstupu
+                next_check = 0.0
+                remux_pending = deque(remux)
+                pending = deque(encode)   # LPT: nejdražší první
+
+                resolved = queue.Queue()  # (první kopie, ok) – z moveru i z hlavního vlákna
+
+                def report(p):
+                    i = index[p]
+
+                    def done(ok, err):
+                        if not ok:
+                            errors[i] = err or ""
+                        board.slot(i).update(STATE_DONE if ok else STATE_ERROR, 100.0 if ok else 0.0)
+                        if p in followers:
+                            resolved.put((p, ok))
+                    return done
+
+                def retry(p):
+                    """Neověřený výstup: job znovu na začátek fronty (nejvýš VERIFY_RETRIES×)."""
+                    if attempts.get(p, 0) >= VERIFY_RETRIES:
+                        return None
+
+                    def again(err):
+                        attempts[p] = attempts.get(p, 0) + 1
+                        errors[index[p]] = err
+                        board.slot(index[p]).update(STATE_QUEUED)
+                        (remux_pending if probes[p].is_hevc else pending).appendleft(p)
+                    return again
+
+                def release_followers(leader, ok):
+                    """Duplikáty hotové kopie se nalinkují; když selhala, enkóduje se další z nich."""
+                    rest = followers.pop(leader, [])
+                    for n, f in enumerate(rest):
+                        if ok and self._reuse_stored(f, probes[f], outputs[f], settings[f], keys[f], queued_at):
+                            board.slot(index[f]).update(STATE_SKIPPED, 100.0)
+                            continue
+                        if rest[n + 1:]:
+                            followers[f] = rest[n + 1:]
+                        (remux_pending if probes[f].is_hevc else pending).appendleft(f)
+                        break
 
                 stop_event = threading.Event()
 
                 def printer():
                     last = 0
                     while not stop_event.is_set():
-                        try:
-                            items = list(progress_dict.items())
-                        except (BrokenPipeError, EOFError):
-                            break
-                        lines = ["📊 Conversion in progress:\n"]
-                        for k, v in sorted(items):
-                            name = k if len(k) <= 40 else k[:37] + "..."
-                            lines.append(f"  {name:<40} {v}")
-                        out = "\n".join(lines) + "\n"
-                        if last:
-                            try:
-                                sys.stdout.write(f"\x1b[{last}F")
-                            except Exception:
-                                pass
-                        sys.stdout.write(out); sys.stdout.flush()
-                        last = len(lines) + 1
-                        if all(f.done() for f in futures):
-                            break
+                        recs = board.snapshot()
+                        paused = ctrl.throttled if ctrl is not None else ()
+                        items = [(names[i], ("⏸️  " if i in paused else "")
+                                  + _format_status(rec, errors.get(i), durations[i]))
+                                 for i, rec in enumerate(recs) if rec[0] >= STATE_RUNNING or i in errors]
+                        summary = _batch_summary(recs, durations)
+                        if ctrl is not None:
+                            summary += f" · {ctrl.describe()}"
+                        if elsewhere:
+                            summary += f" · 🌐 {len(elsewhere)} on other nodes"
+                        if self.stager and self.stager.pending:
+                            summary += f" · 📦 {self.stager.pending} moving"
+                        last = _render_progress(items, last, summary)
                         time.sleep(0.5)
 
                 t = threading.Thread(target=printer, daemon=True)
                 t.start()
 
-                for fut in as_completed(futures):
-                    fp, ok, err = fut.result()
-                    progress_dict[os.path.basename(fp)] = "✅ Done" if ok else f"❌ Error: {err or ''}"
+                try:
+                    while pending or futures or remux_pending or followers or elsewhere:
+                        while not resolved.empty():
+                            release_followers(*resolved.get())
+
+                        # joby jiných uzlů: hotové se odškrtnou, po mrtvém uzlu (prošlý lease) se vezmou znovu
+                        if elsewhere and time.monotonic() >= next_check:
+                            next_check = time.monotonic() + 5.0
+                            for p, state in self._settle_elsewhere(elsewhere):
+                                if state == FREE:
+                                    (remux_pending if probes[p].is_hevc else pending).append(p)
+                                    continue
+                                if state != DONE:
+                                    errors[index[p]] = "failed on other nodes"
+                                board.slot(index[p]).update(STATE_SKIPPED if state == DONE else STATE_ERROR,
+                                                            100.0 if state == DONE else 0.0)
+                                if p in followers:
+                                    resolved.put((p, state == DONE))
+
+                        # remux: první čekající job, jehož disky mají volno (jiné disky tak nečekají)
+                        while remux_pending and len(io_held) < self.remux_workers:
+                            got = self.limiter.take(remux_pending, lambda p: self._io_paths(p, outputs[p]))
+                            if got is None:
+                                break
+                            p, devs = got
+                            if not self._claim(p, probes[p]):
+                                self.limiter.release(devs)
+                                elsewhere[p] = probes[p]
+                                continue
+                            fut = remux_lane.submit(convert_one_file, p, board.slot(index[p]), None, probes[p],
+                                                    {"verify": self.verify}, self._work_path(outputs[p]))
+                            futures[fut] = []
+                            io_held[fut] = devs
+                            submitted[fut] = time.time()
 
+                        # job dostane volný slot; na konci fronty i víc slotů najednou (širší job)
+                        # adaptivně: nový enkód jen pod limitem PressureControlleru (a když nic nestojí)
+                        while pending and free and self._can_start_encode(encoding):
+                            p = pending.popleft()
+                            if not self._claim(p, probes[p]):
+                                elsewhere[p] = probes[p]
+                                continue
+                            # s PressureControllerem bez slučování – limit počítá joby × vlákna slotu
+                            slots = take_slots(free, len(pending) + 1 if ctrl is None else len(free),
+                                               self._slots_wanted(probes[p]))
+                            fut = executor.submit(convert_one_file, p, board.slot(index[p]), merge_budgets(slots),
+                                                  probes[p], self._conv_opts(p), self._work_path(outputs[p]))
+                            futures[fut] = slots
+                            encoding[fut] = index[p]
+                            submitted[fut] = time.time()
+
+                        self._pressure_tick(encoding, board)
+                        if not futures:
+                            time.sleep(0.2)   # přesun první kopie, limit 0 kvůli zátěži, joby jiných uzlů
+                            continue
+                        done, _ = wait(futures, timeout=1.0 if ctrl is not None else None,
+                                       return_when=FIRST_COMPLETED)
+                        for fut in done:
+                            free.extend(futures.pop(fut))
+                            idx = encoding.pop(fut, None)
+                            if idx is not None and ctrl is not None:
+                                ctrl.forget(idx)
+                            if fut in io_held:
+                                self.limiter.release(io_held.pop(fut))
+                            fp, ok, err, stats = fut.result()
+                            if stats.get("cold"):
+                                cold_starts.append(stats["started"] - submitted[fut])
+                            self._complete_job(fp, probes[fp], outputs[fp], settings[fp], ok, err, queued_at, stats,
+                                               report(fp), retry(fp))
+                finally:
+                    if ctrl is not None:
+                        # nic nesmí zůstat zastavené (SIGSTOP) – ani po Ctrl+C / výjimce
+                        ctrl.release_all({idx: board.pid(idx) for idx in encoding.values()})
+
+                if self.stager:
+                    self.stager.close()   # počkej na poslední přesuny do output/
+                if self.queue is not None:
+                    self.queue.close()    # až po přesunech – done marker se píše před uvolněním lease
                 stop_event.set()
                 t.join()
 
-                # snapshot ještě uvnitř Manageru
-                try:
-                    final_items = sorted(list(progress_dict.items()))
-                except Exception:
-                    final_items = []
+            final_items = sorted((names[i], _format_status(rec, errors.get(i)))
+                                 for i, rec in enumerate(board.snapshot()))
 
-        print("\n📊 Final status:")
-        for k, v in final_items:
-            print(f"  {k:<40} {v}")
-        print("\n🎉 All conversions finished.")
+        _print_final(final_items)
+        if self.run_log is not None and self.run_log.summary():
+            print(self.run_log.summary())
+        print(_startup_report(_LOADED_AT, min(submitted.values(), default=None), cold_starts))
+
+    def dry_run(self):
+        """Jen vypíše plán po streamech pro každý soubor (copy / encode / drop), nic nekonvertuje."""
+        files = self._get_video_files()
+        if not files:
+            print("❌ No supported video files found in the folder.")
+            return
+        self._ensure_tools()
+        probes = self._probe_all(files)
+        for p in sorted(files):
+            plan = self._plan_for(probes[p])
+            mode = "remux" if probes[p].is_hevc else "encode"
+            print(f"\n🎬 {self._display_name(p)} → {os.path.basename(self._output_path_for(p, probes[p]))} ({mode})")
+            for line in plan.describe() or ["(no streams found)"]:
+                print(f"   {line}")
+
+    def plan(self):
+        """Jen odhad dávky (nic nekonvertuje): remux vs. enkód, čas a velikost po souborech z modelu
+        naučeného na run logu minulých běhů (jinak heuristiky) a simulace rozvrhu na sloty → makespan a disk."""
+        import shutil
+        from batch_planner import CostModel, load_history, simulate, fmt_bytes, fmt_duration
+        files = self._get_video_files()
+        if not files:
+            print("❌ No supported video files found in the folder.")
+            return
+        self._ensure_tools()
+        probes = self._probe_all(files)
+        settings = {p: self._settings_for(probes[p]) for p in files}
+        done_before = {p for p in files if self.journal and self.journal.is_done(p, settings[p])}
+        remux, encode = self._split_jobs([p for p in files if p not in done_before], probes)
+        slots = self._plan_slots(len(encode))
+        history = load_history()
+        model = CostModel(history)
+
+        def estimate(p, threads):
+            choice = {} if probes[p].is_hevc else self._encode_choice(p)
+            return model.predict(probes[p], threads, choice.get("preset"), choice.get("crf"))
+
+        lane = [ThreadBudget(1)] * self.remux_workers
+        enc_span, _ = simulate(encode, slots, lambda p, slot: estimate(p, slot.threads).seconds)
+        rem_span, _ = simulate(remux, lane, lambda p, slot: estimate(p, 1).seconds)
+
+        basis = f"model from {model.samples} past jobs" if model.samples else "no run history – heuristics"
+        skipped = f", {len(done_before)} already done" if done_before else ""
+        print(f"🗓️  Batch plan for {len(files)} videos ({len(encode)} to encode, {len(remux)} to remux{skipped})"
+              f" · {basis}\n")
+        total_out = 0.0
+        for p in encode + remux:
+            pr = probes[p]
+            est = estimate(p, slots[0].threads if slots and not pr.is_hevc else 1)
+            total_out += est.output_bytes
+            res = f"{pr.width}x{pr.height}" if pr.resolution else "?"
+            print(f"  {self._display_name(p)[:40]:<40} {'remux' if pr.is_hevc else 'encode':<6} "
+                  f"{fmt_duration(pr.duration or 0):>9} {res:>10} {pr.codec or '?':<6} "
+                  f"→ {fmt_duration(est.seconds):>10} {fmt_bytes(est.output_bytes):>10}  ({est.source})")
+
+        out_dir = os.path.join(_base_dir(), "output")
+        os.makedirs(out_dir, exist_ok=True)
+        free_bytes = shutil.disk_usage(out_dir).free
+        print(f"\n⏱️  Expected makespan {fmt_duration(max(enc_span, rem_span))} with {self.max_workers} processes "
+              f"({'/'.join(str(b.threads) for b in slots)} threads) · encode {fmt_duration(enc_span)}, "
+              f"remux {fmt_duration(rem_span)} ({self.remux_workers} lanes)")
+        print(f"💾 Output ≈ {fmt_bytes(total_out)} · free in output/: {fmt_bytes(free_bytes)}")
+        if total_out > free_bytes:
+            print("⚠️  Not enough free space for the whole batch.")
+
+    def watch(self, settle: float = DEFAULT_SETTLE, poll: float = DEFAULT_POLL, status_every: float = 10.0):
+        """Režim služby: zpracuje, co ve vstupu už leží, a pak hlídá nové soubory (rekurzivně).
+        Nové soubory jdou rovnou do běžícího poolu. Konec přes Ctrl+C."""
+        if not os.path.exists(self.input_dir):
+            raise FileNotFoundError(f"Folder '{self.input_dir}' does not exist.")
+        self._ensure_tools()
+        self.recursive = True
+        dll = _mediainfo_dll()
+        free = self._plan_slots(10 ** 6)   # počet jobů předem neznáme → co nejvíc úzkých slotů
+        print(f"👀 Watching '{self.input_dir}' with {self.max_workers} processes "
+              f"({'/'.join(str(b.threads) for b in free)} threads). Ctrl+C to stop.\n")
+        if self.queue:
+            print(f"🌐 Distributed mode: node {self.queue.node}, queue {self.queue.queue_dir}\n")
+
+        incoming = queue.Queue()
+        stop_event = threading.Event()
+
+        def feeder():
+            for path in watch_files(self.input_dir, self.supported_ext, settle, poll, stop_event):
+                incoming.put(path)
+
+        threading.Thread(target=feeder, daemon=True).start()
+
+        pending = []              # halda (-cena, pořadí, job) – z čekajících jde první nejdražší
+        remux_pending = deque()
+        jobs = {}                 # future -> (job, index na boardu, sloty | zařízení u remuxu)
+        submitted = {}            # future -> čas odeslání (studený start workeru)
+        encoding = {}             # future -> index na boardu (běžící enkódy, pro PressureController)
+        ctrl = self.pressure
+        elsewhere, parked = {}, {}  # cesta -> probe / job: drží ho jiný uzel (distribuovaný režim)
+        attempts = {}             # cesta -> počet opakování po neúspěšném ověření výstupu
+        next_check = 0.0
+        board_free = list(range(len(free) + self.remux_workers))
+        seq = 0
+        last_status = time.monotonic()
+        conv_opts = self._conv_opts()
+        ctx = multiprocessing.get_context("spawn")
+        self._start_run_log()
+
+        with ProgressBoard(len(board_free)) as board, \
+             ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(tools.resolved(),)) as executor, \
+             ThreadPoolExecutor(max_workers=self.remux_workers) as remux_lane:
+            try:
+                while True:
+                    # 1) nově ustálené soubory: probe, žurnál, do fronty
+                    try:
+                        block = not jobs
+                        while True:
+                            path = incoming.get(timeout=0.5) if block else incoming.get_nowait()
+                            block = False
+                            probe = probe_media(path, dll)
+                            job = (path, probe, self._output_path_for(path, probe), self._settings_for(probe),
+                                   time.time())
+                            if self.journal and self.journal.is_done(path, job[3]):
+                                print(f"⏭️  {self._display_name(path)}: already done")
+                            elif self._reuse_stored(path, probe, job[2], job[3], self._store_key(path, job[3]),
+                                                    job[4]):
+                                print(f"♻️  {self._display_name(path)}: reused from the output store")
+                            elif probe.is_hevc:
+                                remux_pending.append(job)
+                            else:
+                                heapq.heappush(pending, (-estimate_cost(probe), seq, job))
+                                seq += 1
+                    except queue.Empty:
+                        pass
+
+                    # joby jiných uzlů: hotové pryč, po mrtvém uzlu (prošlý lease) zpátky do fronty
+                    if elsewhere and time.monotonic() >= next_check:
+                        next_check = time.monotonic() + 5.0
+                        for path, state in self._settle_elsewhere(elsewhere):
+                            job = parked.pop(path)
+                            if state == FREE:
+                                if job[1].is_hevc:
+                                    remux_pending.append(job)
+                                else:
+                                    heapq.heappush(pending, (-estimate_cost(job[1]), seq, job))
+                                    seq += 1
+                            else:
+                                print(f"🌐 {self._display_name(path)}: "
+                                      f"{'done' if state == DONE else 'failed'} on another node")
+
+                    # 2) rozdej volné sloty (bez slučování – další soubor může přijít kdykoliv)
+                    n_remux = sum(1 for _, _, s in jobs.values() if isinstance(s, frozenset))
+                    while remux_pending and n_remux < self.remux_workers:
+                        got = self.limiter.take(remux_pending, lambda j: self._io_paths(j[0], j[2]))
+                        if got is None:
+                            break
+                        job, devs = got
+                        if not self._claim(job[0], job[1]):
+                            self.limiter.release(devs)
+                            elsewhere[job[0]], parked[job[0]] = job[1], job
+                            continue
+                        idx = board_free.pop()
+                        board.slot(idx).update(STATE_QUEUED)
+                        fut = remux_lane.submit(convert_one_file, job[0], board.slot(idx), None, job[1],
+                                                {"verify": self.verify}, self._work_path(job[2]))
+                        jobs[fut] = (job, idx, devs)
+                        n_remux += 1
+                        print(f"▶️  {self._display_name(job[0])} (remux)")
+                    while pending and free and self._can_start_encode(encoding):
+                        job = heapq.heappop(pending)[2]
+                        if not self._claim(job[0], job[1]):
+                            elsewhere[job[0]], parked[job[0]] = job[1], job
+                            continue
+                        idx = board_free.pop()
+                        slots = take_slots(free, len(free), self._slots_wanted(job[1]))
+                        board.slot(idx).update(STATE_QUEUED)
+                        fut = executor.submit(convert_one_file, job[0], board.slot(idx), merge_budgets(slots),
+                                              job[1], conv_opts, self._work_path(job[2]))
+                        jobs[fut] = (job, idx, slots)
+                        encoding[fut] = idx
+                        submitted[fut] = time.time()
+                        print(f"▶️  {self._display_name(job[0])}")
+
+                    # 3) dokončené joby
+                    self._pressure_tick(encoding, board)
+                    if jobs:
+                        done, _ = wait(jobs, timeout=0.5, return_when=FIRST_COMPLETED)
+                        for fut in done:
+                            (path, probe, out, st, queued_at), idx, held = jobs.pop(fut)
+                            sent = submitted.pop(fut, None)
+                            if encoding.pop(fut, None) is not None and ctrl is not None:
+                                ctrl.forget(idx)
+                            board.slot(idx).set_pid(0)   # index se použije pro další job
+                            if isinstance(held, frozenset):
+                                self.limiter.release(held)
+                            else:
+                                free.extend(held)
+                            board_free.append(idx)
+                            _, ok, err, stats = fut.result()
+                            if stats.get("cold") and sent:
+                                print(f"🚀 Worker cold start {stats['started'] - sent:.2f} s")
+
+                            def report(ok, err, name=self._display_name(path)):
+                                print(f"✅ {name}" if ok else f"❌ {name}: {err or ''}")
+
+                            def again(err, job=(path, probe, out, st, queued_at)):
+                                nonlocal seq
+                                attempts[job[0]] = attempts.get(job[0], 0) + 1
+                                print(f"🔁 {self._display_name(job[0])}: {err} – retrying")
+                                if job[1].is_hevc:
+                                    remux_pending.appendleft(job)
+                                else:
+                                    heapq.heappush(pending, (-estimate_cost(job[1]), seq, job))
+                                    seq += 1
+
+                            self._complete_job(path, probe, out, st, ok, err, queued_at, stats, report,
+                                               again if attempts.get(path, 0) < VERIFY_RETRIES else None)
+
+                    # 4) průběžný stav běžících jobů (log, ne překreslování – služba běží v konzoli/službě)
+                    now = time.monotonic()
+                    if jobs and now - last_status >= status_every:
+                        last_status = now
+                        print(f"📊 {len(jobs)} running, {len(pending) + len(remux_pending)} queued:"
+                              + (f"  {ctrl.describe()}" if ctrl is not None else ""))
+                        for (path, probe, *_), idx, _ in jobs.values():
+                            paused = "⏸️  " if ctrl is not None and idx in ctrl.throttled else ""
+                            print(f"  {self._display_name(path):<40} "
+                                  f"{paused}{_format_status(board.read(idx), duration=probe.duration)}")
+            except KeyboardInterrupt:
+                print("\n🛑 Stopping watch mode...")
+                stop_event.set()
+                if ctrl is not None:
+                    ctrl.release_all({idx: board.pid(idx) for idx in encoding.values()})
+                for fut in jobs:
+                    fut.cancel()
+                if self.stager and self.stager.pending:
+                    print(f"📦 Waiting for {self.stager.pending} moves to output...")
+                if self.stager:
+                    self.stager.close()
+                if self.queue is not None:
+                    self.queue.close()
+
+def _arg_value(name: str, default=None):
+    """Hodnota přepínače "--name hodnota" z argv (bez argparse – exe se spouští i dvojklikem)."""
+    argv = sys.argv[1:]
+    if name in argv and argv.index(name) + 1 < len(argv):
+        return argv[argv.index(name) + 1]
+    return default
 
 if __name__ == "__main__":
     _enable_vt_output()
     multiprocessing.freeze_support()
-    BatchConverter(input_dir="input", reserve_cores=2).convert_all()
+    io_jobs = _arg_value("--io-jobs")
+    store_gb = _arg_value("--store-max-gb")
+    adaptive = "--adaptive" in sys.argv[1:]
+    io_opts = {"io_per_device": int(io_jobs) if io_jobs else None, "scratch_dir": _arg_value("--scratch"),
+               "store": "--no-store" not in sys.argv[1:], "store_max_gb": float(store_gb) if store_gb else None,
+               "adaptive": adaptive, "pressure_action": _arg_value("--pressure-action", "stop"),
+               "distributed": "--distributed" in sys.argv[1:], "queue_dir": _arg_value("--queue-dir"),
+               "verify": "--no-verify" not in sys.argv[1:]}
+    # adaptivně se rezerva pro popředí neodečítá předem – limit ji drží podle skutečné zátěže
+    reserve = 0 if adaptive else 2
+    if "--plan" in sys.argv[1:]:
+        BatchConverter(input_dir="input", reserve_cores=reserve, recursive="--recursive" in sys.argv[1:]).plan()
+    elif "--dry-run" in sys.argv[1:]:
+        BatchConverter(input_dir="input", recursive="--recursive" in sys.argv[1:]).dry_run()
+    elif "--watch" in sys.argv[1:]:
+        BatchConverter(input_dir="input", reserve_cores=reserve, **io_opts).watch()
+    else:
+        BatchConverter(input_dir="input", reserve_cores=reserve, recursive="--recursive" in sys.argv[1:],
+                       **io_opts).convert_all()
@@ -0,0 +1,169 @@
+# batch_planner.py
+import os, json, heapq, statistics
+from dataclasses import dataclass
+from job_metrics import DEFAULT_METRICS_DIR
+from scheduler import ThreadBudget, DEFAULT_FPS, DEFAULT_PIXELS
+
+# Odhad dávky před startem: čas enkódu a velikost výstupu po souborech + simulace rozvrhu na sloty.
+# Model se učí z run logu předchozích běhů (metrics/runs.jsonl): pro enkód rychlost v pixel-snímcích
+# za sekundu na vlákno a bity na pixel-snímek, pro remux propustnost a poměr velikostí.
+# Skupiny od nejužší (kodek + preset + CRF) po nejširší; bez historie tabulkové heuristiky.
+
+MIN_SAMPLES = 2            # skupina s méně záznamy se přeskočí (jeden běh může být náhoda)
+DEFAULT_PRESET = "slow"
+DEFAULT_CRF = 28
+
+# heuristiky: x265 "slow" ~ 1.3 Mpx-snímků/s na vlákno; ostatní presety relativně k němu
+HEURISTIC_RATE = 1.3e6
+PRESET_SPEED = {"ultrafast": 20.0, "superfast": 15.0, "veryfast": 10.0, "faster": 7.0, "fast": 5.0,
+                "medium": 3.5, "slow": 1.0, "slower": 0.4, "veryslow": 0.15, "placebo": 0.05}
+HEURISTIC_BPP = 0.03       # bitů na pixel-snímek při CRF 28 (1080p25 ≈ 1.5 Mbit/s)
+CRF_DOUBLING = 6           # −6 CRF ≈ dvojnásobný bitrate
+AUDIO_BPS = 128_000
+REMUX_BYTES_PER_SEC = 100e6
+FALLBACK_BYTES_PER_SEC = 625_000   # délka ze velikosti, když ji MediaInfo nezná (~5 Mbit/s)
+
+@dataclass(frozen=True)
+class Estimate:
+    seconds: float             # wall time jobu s daným počtem vláken
+    output_bytes: float
+    source: str                # odkud odhad je ("model: HEVC/slow/28 (12)", "heuristic")
+
+def _codec_family(codec: str | None) -> str:
+    c = (codec or "").lower()
+    for family in ("hevc", "avc", "vp9", "av1", "mpeg-4", "mpeg video"):
+        if family in c:
+            return family
+    return c or "?"
+
+def _work(duration: float | None, width: int | None, height: int | None, fps: float | None) -> float:
+    """Pixel-snímky jobu (délka × pixely × fps)."""
+    pixels = width * height if width and height else DEFAULT_PIXELS
+    return (duration or 0.0) * pixels * (fps or DEFAULT_FPS)
+
+def _media_seconds(probe, size: int | None) -> float:
+    if probe.duration:
+        return probe.duration
+    return (size or 0) / FALLBACK_BYTES_PER_SEC
+
+def load_history(path: str | None = None) -> list[dict]:
+    """Úspěšné joby ze všech minulých běhů (run log JSONL); poškozené řádky se přeskočí."""
+    path = path or os.path.join(DEFAULT_METRICS_DIR, "runs.jsonl")
+    out = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get("status") == "done" and rec.get("wall_s"):
+                    out.append(rec)
+    except OSError:
+        pass
+    return out
+
+class CostModel:
+    """Mediány z historie po skupinách; predict() bere nejužší skupinu s dost vzorky."""
+
+    def __init__(self, history: list[dict] | None = None):
+        self.rate: dict[tuple, list[float]] = {}     # skupina → pixel-snímky / s / vlákno
+        self.bpp: dict[tuple, list[float]] = {}      # skupina → bity / pixel-snímek (vč. audia)
+        self.remux_rate: list[float] = []            # B/s
+        self.remux_ratio: list[float] = []           # výstup / vstup
+        self.samples = 0
+        for rec in history or []:
+            self._add(rec)
+
+    @staticmethod
+    def _groups(codec: str | None, preset: str | None, crf) -> list[tuple]:
+        fam = _codec_family(codec)
+        return [(fam, preset, crf), (fam, preset), (preset,), ()]
+
+    def _add(self, rec: dict):
+        mode, wall = rec.get("mode"), rec.get("wall_s") or 0.0
+        if mode == "remux":
+            if rec.get("input_bytes"):
+                self.remux_rate.append(rec["input_bytes"] / wall)
+                if rec.get("output_bytes"):
+                    self.remux_ratio.append(rec["output_bytes"] / rec["input_bytes"])
+            self.samples += 1
+            return
+        if mode not in ("encode", "segments") or not rec.get("media_s"):
+            return   # "store" = jen hardlink, o enkódu nic neříká
+        work = _work(rec["media_s"], rec.get("width"), rec.get("height"), rec.get("fps"))
+        if work <= 0:
+            return
+        threads = rec.get("threads") or 1
+        for g in self._groups(rec.get("codec"), rec.get("preset"), rec.get("crf")):
+            self.rate.setdefault(g, []).append(work / (wall * threads))
+            if rec.get("output_bytes"):
+                self.bpp.setdefault(g, []).append(rec["output_bytes"] * 8 / work)
+        self.samples += 1
+
+    def _lookup(self, table: dict, groups: list[tuple]) -> tuple[float, str] | None:
+        for g in groups:
+            values = table.get(g, [])
+            if len(values) >= MIN_SAMPLES:
+                label = "/".join(str(x) for x in g) or "all"
+                return statistics.median(values), f"model: {label} ({len(values)})"
+        return None
+
+    def predict(self, probe, threads: int, preset: str | None = None, crf: int | None = None,
+                size: int | None = None) -> Estimate:
+        if size is None:
+            try:
+                size = os.path.getsize(probe.path)
+            except OSError:
+                size = 0
+        if probe.is_hevc:
+            rate = statistics.median(self.remux_rate) if len(self.remux_rate) >= MIN_SAMPLES else None
+            ratio = statistics.median(self.remux_ratio) if len(self.remux_ratio) >= MIN_SAMPLES else 1.0
+            return Estimate(size / (rate or REMUX_BYTES_PER_SEC), size * ratio,
+                            "model: remux" if rate else "heuristic")
+
+        preset, crf = preset or DEFAULT_PRESET, DEFAULT_CRF if crf is None else crf
+        duration = _media_seconds(probe, size)
+        work = _work(duration, probe.width, probe.height, probe.fps)
+        groups = self._groups(probe.codec, preset, crf)
+        threads = max(1, threads)
+        rate = self._lookup(self.rate, groups)
+        if rate is None:
+            rate = (HEURISTIC_RATE * PRESET_SPEED.get(preset, 1.0), "heuristic")
+        bpp = self._lookup(self.bpp, groups)
+        if bpp is None:
+            video = HEURISTIC_BPP * 2 ** ((DEFAULT_CRF - crf) / CRF_DOUBLING) * work / 8
+            out = video + AUDIO_BPS * duration / 8 if probe.has_audio else video
+        else:
+            out = bpp[0] * work / 8
+        size_source = bpp[1] if bpp else "heuristic"
+        source = rate[1] if size_source == rate[1] else f"time {rate[1]}, size {size_source}"
+        return Estimate(work / (rate[0] * threads), out, source)
+
+def simulate(jobs: list, slots: list[ThreadBudget], seconds_for) -> tuple[float, dict]:
+    """LPT rozvrh: joby v daném pořadí (nejdražší první) dostává vždy nejdřív uvolněný slot.
+    seconds_for(job, slot) = odhad času na daném slotu. Vrací (makespan, {job: konec})."""
+    if not jobs:
+        return 0.0, {}
+    heap = [(0.0, i) for i in range(max(1, len(slots)))]
+    heapq.heapify(heap)
+    finish = {}
+    for job in jobs:
+        t, i = heapq.heappop(heap)
+        end = t + seconds_for(job, slots[i] if slots else ThreadBudget(1))
+        finish[job] = end
+        heapq.heappush(heap, (end, i))
+    return max(finish.values()), finish
+
+def fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.2f} TB"
+
+def fmt_duration(seconds: float) -> str:
+    seconds = int(max(0, seconds))
+    days, rest = divmod(seconds, 86400)
+    text = f"{rest // 3600}:{rest // 60 % 60:02d}:{rest % 60:02d}"
+    return f"{days}d {text}" if days else text
@@ -0,0 +1,313 @@
+# benchmark.py
+import os, sys, json, time, shutil, platform, subprocess, statistics, multiprocessing
+from contextlib import redirect_stdout
+from tools import _base_dir
+
+# Reprodukovatelný benchmark: syntetické fixtures z lavfi (testsrc2 + sine), časy jednotlivých fází
+# a porovnání s uloženým baseline. Každá fáze běží v čerstvém procesu v izolované pracovní kopii
+# (bench/work) – výstupy, probe cache i žurnál nepřepíšou ostrá data v output/ a cache/.
+#
+#   python benchmark.py                   # změř a porovnej s bench/baseline.json
+#   python benchmark.py --save-baseline   # změř a ulož jako nový baseline
+#   python benchmark.py --workers 1,2,4 --repeat 3 --tolerance 0.1
+
+BENCH_DIR = os.path.join(_base_dir(), "bench")
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+WORK_DIR = os.path.join(BENCH_DIR, "work")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+DEFAULT_TOLERANCE = 0.10     # o kolik (relativně) smí být fáze pomalejší než baseline
+NOISE_FLOOR = 0.05           # s – menší rozdíly jsou šum, ne regrese
+
+# (jméno, kodek, šířka, výška, délka s, audio) – obsah je deterministický (lavfi + bitexact)
+FIXTURES = [
+    ("h264_240p_4s.mp4",  "libx264", 320, 240, 4, True),
+    ("h264_480p_4s.mkv",  "libx264", 854, 480, 4, True),
+    ("h264_720p_2s.mp4",  "libx264", 1280, 720, 2, True),
+    ("h264_240p_20s.mp4", "libx264", 320, 240, 20, True),
+    ("hevc_480p_4s.mp4",  "libx265", 854, 480, 4, True),
+    ("hevc_480p_4s.mkv",  "libx265", 854, 480, 4, False),
+    ("hevc_480p_4s.hevc", "libx265", 854, 480, 4, False),
+]
+
+# ------------------ Fixtures ------------------
+
+def _fixture_command(ff: str, name: str, codec: str, w: int, h: int, dur: float, audio: bool) -> list[str]:
+    out = os.path.join(FIXTURES_DIR, name)
+    venc = ["-threads", "1"] if codec == "libx264" else ["-x265-params", "pools=1:frame-threads=1:log-level=error"]
+    return [
+        ff, "-hide_banner", "-v", "error", "-nostdin", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={w}x{h}:rate=25:duration={dur}",
+        *(["-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={dur}"] if audio else []),
+        "-c:v", codec, "-preset", "ultrafast", *venc, "-pix_fmt", "yuv420p", "-g", "50",
+        *(["-c:a", "aac", "-b:a", "128k"] if audio else []),
+        "-fflags", "+bitexact", "-flags:v", "+bitexact", "-flags:a", "+bitexact", "-map_metadata", "-1",
+        *(["-f", "hevc"] if name.endswith(".hevc") else []),
+        out,
+    ]
+
+def ensure_fixtures(ff: str) -> list[str]:
+    """Vygeneruj chybějící fixtures (existující se nepřegenerovávají)."""
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    paths = []
+    for spec in FIXTURES:
+        path = os.path.join(FIXTURES_DIR, spec[0])
+        if not os.path.isfile(path):
+            print(f"🎞️  Generating {spec[0]}...")
+            subprocess.run(_fixture_command(ff, *spec), check=True)
+        paths.append(path)
+    return paths
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def _prepare_work(ff: str, dll: str | None):
+    """Čistá pracovní kopie: moduly projektu + nástroje vedle nich (=> _base_dir() míří sem)."""
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    os.makedirs(WORK_DIR)
+    for f in os.listdir(_base_dir()):
+        if f.endswith(".py"):
+            shutil.copy2(os.path.join(_base_dir(), f), WORK_DIR)
+    _link_or_copy(ff, os.path.join(WORK_DIR, "ffmpeg.exe"))
+    if dll:
+        _link_or_copy(dll, os.path.join(WORK_DIR, "MediaInfo.dll"))
+
+# ------------------ Fáze (běží uvnitř pracovní kopie) ------------------
+
+def _timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+def _worker_ready(_):
+    import BatchConverter   # noqa: F401 – stejný import, jaký dělá skutečný worker
+    return os.getpid()
+
+def _stage_probe_cold(fx):
+    from media_probe import probe_media
+    return {"seconds": _timed(lambda: [probe_media(f) for f in fx])}
+
+def _stage_probe_warm(fx):
+    from media_probe import probe_media
+    for f in fx:
+        probe_media(f)
+    return {"seconds": _timed(lambda: [probe_media(f) for f in fx])}
+
+def _stage_is_hevc(fx):
+    from BatchConverter import _is_hevc
+    return {"seconds": _timed(lambda: [_is_hevc(f) for f in fx])}
+
+def _stage_converter_init(fx):
+    # dřív _get_duration (druhý MediaInfo průchod); dnes konstruktor = probe + plán streamů
+    from AnyToH265Converter import AnyToH265Converter
+    return {"seconds": _timed(lambda: [AnyToH265Converter(f).duration for f in fx])}
+
+def _stage_video_analyzer(fx):
+    from videoAnalyzer import VideoAnalyzer
+    return {"seconds": _timed(lambda: [VideoAnalyzer(f).get_video_format() for f in fx])}
+
+def _stage_worker_startup(fx, workers=2):
+    from concurrent.futures import ProcessPoolExecutor
+    from BatchConverter import _init_worker
+    import tools
+    ctx = multiprocessing.get_context("spawn")
+
+    def run():
+        # stejný initializer jako dávka – cesty k nástrojům přijdou od rodiče
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(tools.resolved(),)) as ex:
+            list(ex.map(_worker_ready, range(workers)))
+    return {"seconds": _timed(run), "workers": workers}
+
+def _stage_remux(fx):
+    from BatchConverter import _ffmpeg_copy_remux, RAW_HEVC_CONTAINER
+    from media_probe import probe_media
+    out_dir = os.path.join(_base_dir(), "output")
+    os.makedirs(out_dir, exist_ok=True)
+    probes = [probe_media(f) for f in fx]
+    hevc = [p for p in probes if p.is_hevc]
+
+    def run():
+        for i, p in enumerate(hevc):
+            # raw .hevc nemá kontejner (ani časové značky) → do kontejneru jako v dávce (_remux_output_path)
+            ext = RAW_HEVC_CONTAINER if p.is_raw_hevc else os.path.splitext(p.path)[1]
+            ok, err = _ffmpeg_copy_remux(p.path, None, probe=p, out_path=os.path.join(out_dir, f"remux{i}{ext}"))
+            if not ok:
+                raise RuntimeError(err)
+    return {"seconds": _timed(run), "files": len(hevc)}
+
+def _stage_convert(fx):
+    from AnyToH265Converter import AnyToH265Converter
+    src = next(f for f in fx if os.path.basename(f).startswith("h264_240p_4s"))
+    os.makedirs(os.path.join(_base_dir(), "output"), exist_ok=True)
+    conv = AnyToH265Converter(src, output_path=os.path.join(_base_dir(), "output", "convert.mp4"))
+
+    def run():
+        if not conv.convert():
+            raise RuntimeError(conv.last_error)
+    return {"seconds": _timed(run)}
+
+def _stage_progress(fx, updates=100_000):
+    from progress_board import ProgressBoard, STATE_RUNNING
+    with ProgressBoard(64) as board:
+        slot = board.slot(0)
+        up = _timed(lambda: [slot.update(STATE_RUNNING, i % 100, 25.0, 1.0, i) for i in range(updates)])
+        snap = _timed(lambda: [board.snapshot() for _ in range(updates // 100)])
+    return {"seconds": up + snap, "update_us": up / updates * 1e6, "snapshot_us": snap / (updates // 100) * 1e6}
+
+def _stage_convert_all(fx, workers=1):
+    from BatchConverter import BatchConverter
+    from scheduler import ThreadBudget, available_cpus
+
+    class FixedSlots(BatchConverter):
+        def _plan_slots(self, n_jobs):
+            threads = max(1, len(available_cpus()) // workers)
+            self.max_workers = workers
+            return [ThreadBudget(threads) for _ in range(workers)]
+
+    in_dir = os.path.join(_base_dir(), "input")
+    shutil.rmtree(in_dir, ignore_errors=True)
+    shutil.rmtree(os.path.join(_base_dir(), "output"), ignore_errors=True)
+    os.makedirs(in_dir)
+    for f in fx:
+        _link_or_copy(f, os.path.join(in_dir, os.path.basename(f)))
+    bc = FixedSlots(input_dir="input", resume=False)
+    with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull):
+        seconds = _timed(bc.convert_all)
+    return {"seconds": seconds, "workers": workers, "files": len(fx)}
+
+STAGES = {
+    "probe_cold": _stage_probe_cold,
+    "probe_warm": _stage_probe_warm,
+    "is_hevc": _stage_is_hevc,
+    "converter_init": _stage_converter_init,
+    "video_analyzer": _stage_video_analyzer,
+    "worker_startup": _stage_worker_startup,
+    "remux": _stage_remux,
+    "convert": _stage_convert,
+    "progress": _stage_progress,
+}
+
+def _run_stage_here(name: str, fixtures: list[str]) -> dict:
+    if name.startswith("convert_all_w"):
+        return _stage_convert_all(fixtures, workers=int(name[len("convert_all_w"):]))
+    return STAGES[name](fixtures)
+
+# ------------------ Orchestrace ------------------
+
+def run_stage(name: str, fixtures: list[str]) -> dict:
+    """Jedna fáze v čerstvém procesu uvnitř bench/work (studená cache, vlastní output/)."""
+    shutil.rmtree(os.path.join(WORK_DIR, "cache"), ignore_errors=True)
+    shutil.rmtree(os.path.join(WORK_DIR, "output"), ignore_errors=True)
+    p = subprocess.run(
+        [sys.executable, os.path.join(WORK_DIR, "benchmark.py"), "--stage", name, *fixtures],
+        cwd=WORK_DIR, capture_output=True, text=True,
+    )
+    if p.returncode != 0:
+        raise RuntimeError(f"stage {name} failed:\n{p.stderr.strip()}")
+    return json.loads(p.stdout.strip().splitlines()[-1])
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_base_dir(),
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def _ffmpeg_version(ff: str) -> str:
+    try:
+        return subprocess.run([ff, "-version"], capture_output=True, text=True).stdout.splitlines()[0]
+    except (OSError, IndexError):
+        return "?"
+
+def run_benchmark(workers=(1, 2), repeat: int = 3) -> dict:
+    from BatchConverter import _find_tool, _mediainfo_dll
+    ff = _find_tool("ffmpeg.exe")
+    if not ff:
+        raise FileNotFoundError("ffmpeg.exe not found – run download_ffmpeg.py first")
+    fixtures = ensure_fixtures(ff)
+    _prepare_work(ff, _mediainfo_dll())
+
+    names = [*STAGES, *(f"convert_all_w{n}" for n in workers)]
+    stages = {}
+    for name in names:
+        runs = []
+        for _ in range(repeat if not name.startswith("convert") else 1):
+            runs.append(run_stage(name, fixtures))
+        best = dict(runs[0], seconds=statistics.median(r["seconds"] for r in runs))
+        best["runs"] = [round(r["seconds"], 4) for r in runs]
+        stages[name] = best
+        print(f"  {name:<20} {best['seconds']:8.3f} s")
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "ffmpeg": _ffmpeg_version(ff),
+        },
+        "stages": stages,
+    }
+
+def compare(result: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """Fáze, které jsou proti baseline pomalejší než tolerance (a nad hranicí šumu)."""
+    regressions = []
+    print("\n📈 Compared to baseline:")
+    for name, cur in result["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old:
+            print(f"  {name:<20} (new)")
+            continue
+        ratio = cur["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        slower = ratio > 1 + tolerance and cur["seconds"] - old["seconds"] > NOISE_FLOOR
+        mark = "❌" if slower else "✅"
+        print(f"  {mark} {name:<20} {old['seconds']:8.3f} → {cur['seconds']:8.3f} s  ({ratio:5.2f}×)")
+        if slower:
+            regressions.append(name)
+    return regressions
+
+def main(argv: list[str]) -> int:
+    if argv[:1] == ["--stage"]:
+        # potomek: jedna fáze, výsledek jako JSON na poslední řádek stdout
+        print(json.dumps(_run_stage_here(argv[1], argv[2:])))
+        return 0
+
+    import argparse
+    ap = argparse.ArgumentParser(description="Benchmark konverzní pipeline")
+    ap.add_argument("--workers", default="1,2", help="počty workerů pro end-to-end convert_all")
+    ap.add_argument("--repeat", type=int, default=3, help="opakování rychlých fází (bere se medián)")
+    ap.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    ap.add_argument("--save-baseline", action="store_true")
+    args = ap.parse_args(argv)
+
+    print("⏱️  Running benchmark...")
+    result = run_benchmark(tuple(int(n) for n in args.workers.split(",") if n), max(1, args.repeat))
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n💾 Results: {out}")
+
+    if args.save_baseline:
+        shutil.copy2(out, BASELINE_PATH)
+        print(f"📌 Baseline saved: {BASELINE_PATH}")
+        return 0
+    if not os.path.isfile(BASELINE_PATH):
+        print("ℹ️  No baseline yet – run with --save-baseline.")
+        return 0
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        regressions = compare(result, json.load(f), args.tolerance)
+    if regressions:
+        print(f"\n❌ Regressions: {', '.join(regressions)}")
+        return 1
+    print("\n🎉 No regressions.")
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,246 @@
+# bootstrap.py
+import os, sys, time, shutil, hashlib, zipfile, threading, http.client, urllib.parse, urllib.request, urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from tools import _base_dir
+
+# Stažení nástrojů (ffmpeg.exe, MediaInfo.dll) – oba najednou, s navazováním přes HTTP Range,
+# opakováním, kontrolou SHA-256 a vybalením jen potřebného souboru z archivu.
+# Archivy se drží v cache/downloads; mirror (sdílená složka nebo http URL, CONVERTER_MIRROR)
+# se zkouší před originálem, takže flotila strojů nestahuje ffmpeg essentials zip každý zvlášť.
+
+DEFAULT_CACHE_DIR = os.path.join(_base_dir(), "cache", "downloads")
+MIRROR_ENV = "CONVERTER_MIRROR"
+USER_AGENT = "converter-bootstrap/1.0"
+CHUNK = 1 << 20
+RETRIES = 5
+TIMEOUT = 30.0
+
+@dataclass(frozen=True)
+class ToolSpec:
+    name: str                       # pro výpisy (ffmpeg.exe)
+    url: str                        # archiv (zip) u originálu
+    member: str                     # přípona hledaného členu archivu (bin/ffmpeg.exe)
+    dest: str                       # kam nástroj uložit
+    sha256: str | None = None       # známý hash archivu
+    sha256_url: str | None = None   # nebo kde ho zdroj publikuje
+
+    @property
+    def archive(self) -> str:
+        return os.path.basename(urllib.parse.urlsplit(self.url).path)
+
+class _Progress:
+    """Jeden řádek se stavem všech souběžných stahování."""
+
+    def __init__(self):
+        self.state: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._last = 0.0
+
+    def update(self, name: str, done: int, total: int | None, force: bool = False):
+        with self._lock:
+            self.state[name] = f"{done * 100 // total}%" if total else f"{done / 1048576:.0f} MB"
+            now = time.monotonic()
+            if force or now - self._last >= 0.2:
+                self._last = now
+                sys.stdout.write("\r📦 Downloading… " + " · ".join(f"{k} {v}" for k, v in self.state.items()))
+                sys.stdout.flush()
+
+def _is_url(source: str) -> bool:
+    return urllib.parse.urlsplit(source).scheme in ("http", "https", "file")
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _parse_sha256(text: str) -> str | None:
+    """"<hash>" nebo "<hash>  soubor.zip" (sha256sum formát)."""
+    for token in text.split():
+        token = token.strip().lower()
+        if len(token) == 64 and all(c in "0123456789abcdef" for c in token):
+            return token
+    return None
+
+def _read_small(source: str) -> str | None:
+    try:
+        if _is_url(source):
+            req = urllib.request.Request(source, headers={"User-Agent": USER_AGENT})
+            with urllib.request.urlopen(req, timeout=TIMEOUT) as r:
+                return r.read(4096).decode("utf-8", errors="replace")
+        with open(source, encoding="utf-8", errors="replace") as f:
+            return f.read(4096)
+    except (OSError, http.client.HTTPException):
+        return None
+
+def fetch(url: str, part: str, on_progress=None, retries: int = RETRIES):
+    """Stáhne url do part. Existující part se navazuje (Range); server bez Range → od začátku.
+    Přechodné chyby (síť, 5xx, 429) se opakují s exponenciálním čekáním."""
+    last_error = None
+    for attempt in range(retries):
+        have = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {"User-Agent": USER_AGENT}
+        if have:
+            headers["Range"] = f"bytes={have}-"
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=TIMEOUT) as r:
+                if have and r.status != 206:
+                    have = 0   # Range ignorován – přišel celý soubor
+                length = r.headers.get("Content-Length")
+                total = have + int(length) if length else None
+                with open(part, "ab" if have else "wb") as f:
+                    while chunk := r.read(CHUNK):
+                        f.write(chunk)
+                        have += len(chunk)
+                        if on_progress:
+                            on_progress(have, total)
+            if total is not None and have < total:
+                raise http.client.IncompleteRead(b"", total - have)
+            return
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and have:
+                return   # part už je celý – ověří ho hash
+            if e.code < 500 and e.code != 429:
+                raise
+            last_error = e
+        except (urllib.error.URLError, OSError, http.client.HTTPException) as e:
+            last_error = e
+        time.sleep(min(30.0, 2.0 ** attempt))
+    raise RuntimeError(f"download failed after {retries} attempts: {url} ({last_error})")
+
+def _sources(spec: ToolSpec, mirror: str | None) -> list[str]:
+    if not mirror:
+        return [spec.url]
+    sep = "" if mirror.endswith("/") else "/"
+    mirrored = f"{mirror}{sep}{spec.archive}" if _is_url(mirror) else os.path.join(mirror, spec.archive)
+    return [mirrored, spec.url]
+
+def _expected_sha256(spec: ToolSpec, mirror: str | None, zip_path: str) -> str | None:
+    """Hash ze specifikace nebo od originálu (sha256_url). Mirror ani vlastní záznam z dřívějška nesmí
+    ručit samy za sebe – berou se jen tehdy, když originál hash nevydá (a s varováním)."""
+    if spec.sha256:
+        return spec.sha256.lower()
+    if spec.sha256_url:
+        text = _read_small(spec.sha256_url)
+        digest = _parse_sha256(text) if text else None
+        if digest:
+            return digest
+    fallback = [zip_path + ".sha256"] + [s + ".sha256" for s in _sources(spec, mirror)[:-1]]
+    for c in fallback:
+        text = _read_small(c)
+        digest = _parse_sha256(text) if text else None
+        if digest:
+            print(f"\n⚠️  {spec.name}: upstream SHA-256 unavailable – trusting {c}")
+            return digest
+    return None
+
+def _download(source: str, zip_path: str, expected: str | None, progress: _Progress, name: str):
+    part = zip_path + ".part"
+    for fresh in (False, True):
+        if fresh:
+            try:
+                os.remove(part)   # navázaný part nesedí s hashem → jednou znovu od nuly
+            except OSError:
+                pass
+        if _is_url(source):
+            fetch(source, part, lambda done, total: progress.update(name, done, total))
+        else:
+            shutil.copyfile(source, part)
+        progress.update(name, 1, 1, force=True)
+        digest = _sha256_file(part)
+        if expected is None or digest == expected:
+            os.replace(part, zip_path)
+            with open(zip_path + ".sha256", "w", encoding="utf-8") as f:
+                f.write(f"{digest}  {os.path.basename(zip_path)}\n")
+            return
+    os.remove(part)
+    raise ValueError(f"SHA-256 mismatch for {source}: expected {expected}")
+
+def _publish(zip_path: str, mirror: str | None):
+    """Do složkového mirroru se archiv nahraje, pokud tam chybí (první stroj naplní sdílenou cache)."""
+    if not mirror or _is_url(mirror) or not os.path.isdir(mirror):
+        return
+    target = os.path.join(mirror, os.path.basename(zip_path))
+    if os.path.exists(target):
+        return
+    try:
+        tmp = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(zip_path, tmp)
+        os.replace(tmp, target)
+        shutil.copyfile(zip_path + ".sha256", target + ".sha256")
+    except OSError:
+        pass
+
+def extract_member(zip_path: str, suffix: str, dest: str) -> str:
+    """Vybalí jen jeden soubor (streamem, bez rozbalení celého archivu); CRC hlídá zipfile."""
+    with zipfile.ZipFile(zip_path) as zf:
+        member = next((n for n in zf.namelist() if n.endswith(suffix)), None)
+        if member is None:
+            raise RuntimeError(f"❌ {suffix} not found in {os.path.basename(zip_path)}")
+        os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+        tmp = dest + ".part"
+        with zf.open(member) as src, open(tmp, "wb") as out:
+            shutil.copyfileobj(src, out, CHUNK)
+    os.replace(tmp, dest)
+    return dest
+
+def ensure_tool(spec: ToolSpec, cache_dir: str | None = None, mirror: str | None = None,
+                progress: _Progress | None = None) -> str:
+    """Cesta k nástroji – stáhne a vybalí ho jen tehdy, když chybí."""
+    if os.path.isfile(spec.dest):
+        return spec.dest
+    progress = progress or _Progress()
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    mirror = mirror if mirror is not None else os.environ.get(MIRROR_ENV)
+    os.makedirs(cache_dir, exist_ok=True)
+    zip_path = os.path.join(cache_dir, spec.archive)
+    expected = _expected_sha256(spec, mirror, zip_path)
+
+    if not (os.path.isfile(zip_path) and (expected is None or _sha256_file(zip_path) == expected)):
+        errors = []
+        for source in _sources(spec, mirror):
+            try:
+                _download(source, zip_path, expected, progress, spec.name)
+                break
+            except (RuntimeError, ValueError, OSError, urllib.error.HTTPError) as e:
+                errors.append(f"{source}: {e}")
+        else:
+            raise RuntimeError(f"❌ {spec.name}: " + "; ".join(errors))
+        if expected is None:
+            print(f"\n⚠️  {spec.name}: no published SHA-256 – recorded the hash of this download.")
+    _publish(zip_path, mirror)
+    return extract_member(zip_path, spec.member, spec.dest)
+
+def ensure_tools(specs: list[ToolSpec], cache_dir: str | None = None, mirror: str | None = None) -> list[str]:
+    """Všechny chybějící nástroje souběžně. Chyba jednoho nezastaví ostatní – hlásí se na konci."""
+    progress = _Progress()
+    with ThreadPoolExecutor(max_workers=max(1, len(specs))) as ex:
+        futures = [ex.submit(ensure_tool, s, cache_dir, mirror, progress) for s in specs]
+        results, errors = [], []
+        for spec, fut in zip(specs, futures):
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                errors.append(str(e))
+    if progress.state:
+        print()
+    for path in results:
+        print(f"✅ Saved: {path}")
+    if errors:
+        raise RuntimeError("\n".join(errors))
+    return results
+
+def default_specs() -> list[ToolSpec]:
+    from download_ffmpeg import FFMPEG_SPEC
+    from download_MediaInfo import MEDIAINFO_SPEC
+    return [FFMPEG_SPEC, MEDIAINFO_SPEC]
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Download ffmpeg.exe and MediaInfo.dll (resumable, verified).")
+    ap.add_argument("--mirror", help=f"mirror folder or http URL with the zips (default ${MIRROR_ENV})")
+    ap.add_argument("--cache", help="download cache folder (default cache/downloads)")
+    args = ap.parse_args()
+    ensure_tools(default_specs(), args.cache, args.mirror)
@@ -0,0 +1,158 @@
+# content_store.py
+import os, time, shutil, hashlib, sqlite3, threading
+from job_journal import part_path, discard_output, commit_output
+from probe_cache import get_cache
+from tools import _base_dir
+
+# Content-addressed úložiště hotových výstupů. Klíč = otisk obsahu vstupu + hash nastavení enkódu,
+# takže stejné video pod jiným jménem / v jiné složce se podruhé neenkóduje – výstup se jen
+# hardlinkne (nebo zkopíruje) ze store. Velikost store hlídá LRU podle posledního použití.
+
+DEFAULT_STORE_DIR = os.path.join(_base_dir(), "cache", "store")
+DEFAULT_MAX_BYTES = 100 * 1024 ** 3
+TOUCH_INTERVAL = 3600.0
+
+# otisk: velikost + hlava + konec + STRIDES bloků rovnoměrně mezi nimi (malé soubory celé)
+HEAD_TAIL_BYTES = 1 << 20
+STRIDE_BYTES = 64 << 10
+STRIDES = 16
+FULL_HASH_LIMIT = 8 << 20
+FINGERPRINT_KIND = "content_fp"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    key       TEXT PRIMARY KEY,
+    file      TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_last_used ON objects(last_used);
+"""
+
+def content_fingerprint(path: str) -> str:
+    """Rychlý vzorkovaný otisk obsahu (blake2b) – čte ~3 MB místo celého souboru.
+    Výsledek se pamatuje v probe cache (extras), dokud se soubor nezmění."""
+    cache = get_cache()
+    hit = cache.get_extra(path, FINGERPRINT_KIND)
+    if hit is not None:
+        return hit
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(size.to_bytes(8, "little"))
+    with open(path, "rb") as f:
+        if size <= FULL_HASH_LIMIT:
+            while chunk := f.read(1 << 20):
+                h.update(chunk)
+        else:
+            blocks = [(0, HEAD_TAIL_BYTES)]
+            blocks += [(size * (i + 1) // (STRIDES + 1), STRIDE_BYTES) for i in range(STRIDES)]
+            blocks.append((size - HEAD_TAIL_BYTES, HEAD_TAIL_BYTES))
+            for offset, length in blocks:
+                f.seek(offset)
+                h.update(f.read(length))
+    fp = h.hexdigest()
+    cache.put_extra(path, FINGERPRINT_KIND, fp)
+    return fp
+
+def _link_or_copy(src: str, dst: str):
+    """Hardlink (stejný FS, nic se nekopíruje), jinak kopie. Cíl vzniká přes .part + os.replace."""
+    tmp = part_path(dst)
+    discard_output(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    commit_output(tmp, dst)
+
+class ContentStore:
+    """Soubory v store/<xx>/<klíč><přípona>, index v SQLite (WAL) – sdílený mezi procesy."""
+
+    def __init__(self, store_dir: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.store_dir = store_dir or DEFAULT_STORE_DIR
+        self.max_bytes = max(0, int(max_bytes))
+        self.db_path = os.path.join(self.store_dir, "index.sqlite")
+        self._tls = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            os.makedirs(self.store_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._tls.conn = conn
+        return conn
+
+    @staticmethod
+    def key(input_path: str, settings: str) -> str:
+        return f"{content_fingerprint(input_path)}-{settings}"
+
+    def lookup(self, key: str) -> str | None:
+        """Cesta k uloženému výstupu, nebo None (chybějící / poškozený soubor se z indexu vyřadí)."""
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT file, size, last_used FROM objects WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            file, size, last_used = row
+            try:
+                ok = os.path.getsize(file) == size
+            except OSError:
+                ok = False
+            if not ok:
+                conn.execute("DELETE FROM objects WHERE key = ?", (key,))
+                return None
+            now = time.time()
+            if now - last_used > TOUCH_INTERVAL:
+                conn.execute("UPDATE objects SET last_used = ? WHERE key = ?", (now, key))
+            return file
+        except sqlite3.Error:
+            return None
+
+    def materialize(self, key: str, output_path: str) -> bool:
+        """Výstup ze store na cílové místo. False = ve store není (nebo se nepodařilo)."""
+        src = self.lookup(key)
+        if src is None:
+            return False
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            _link_or_copy(src, output_path)
+            return True
+        except OSError:
+            return False
+
+    def add(self, key: str, output_path: str):
+        """Ulož hotový výstup (hardlink, když to jde – store pak nezabírá místo navíc)."""
+        if self.max_bytes <= 0:
+            return
+        sub = os.path.join(self.store_dir, key[:2])
+        file = os.path.join(sub, key + os.path.splitext(output_path)[1])
+        try:
+            os.makedirs(sub, exist_ok=True)
+            _link_or_copy(output_path, file)
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("INSERT OR REPLACE INTO objects (key, file, size, last_used) VALUES (?, ?, ?, ?)",
+                             (key, file, os.path.getsize(file), time.time()))
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except (OSError, sqlite3.Error):
+            pass   # store je jen optimalizace
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Nad max_bytes mazej nejdéle nepoužité objekty (LRU)."""
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()
+        if total <= self.max_bytes:
+            return
+        for key, file, size in conn.execute(
+                "SELECT key, file, size FROM objects ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            discard_output(file)
+            conn.execute("DELETE FROM objects WHERE key = ?", (key,))
+            total -= size
@@ -0,0 +1,173 @@
+# device_limits.py
+import os, sys, shutil, hashlib, threading
+from concurrent.futures import ThreadPoolExecutor
+from job_journal import part_path, discard_output, commit_output
+
+# I/O-vázané joby (remux) neběží přes CPU sloty, ale každý je jeden sekvenční stream na disk.
+# Desítky takových streamů na jednom rotačním disku / NFS mountu propad propustnosti jen zhorší,
+# proto se omezují po zařízeních (st_dev) – vstup i výstup jobu, každé zařízení zvlášť.
+# Volitelně se výstupy píšou na rychlý lokální scratch a do output/ je přesouvá vlákno na pozadí.
+
+ROTATIONAL_IO_JOBS = 1      # klasický disk: víc souběžných streamů = seek thrashing
+SOLID_STATE_IO_JOBS = 4
+NETWORK_IO_JOBS = 2         # NFS/SMB a jiné FS bez blokového zařízení (major 0)
+DEFAULT_IO_JOBS = 2         # nevíme (Windows, macOS, …)
+
+def _existing(path: str) -> str:
+    """Nejbližší existující předek (výstup ještě nemusí existovat)."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+def device_of(path: str) -> int:
+    return os.stat(_existing(path)).st_dev
+
+def mount_point(path: str) -> str:
+    path = _existing(path)
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+def auto_limit(dev: int) -> int:
+    """Výchozí počet souběžných I/O jobů podle typu zařízení (Linux sysfs, jinak DEFAULT_IO_JOBS)."""
+    if not sys.platform.startswith("linux"):
+        return DEFAULT_IO_JOBS
+    major, minor = os.major(dev), os.minor(dev)
+    if major == 0:
+        return NETWORK_IO_JOBS
+    base = f"/sys/dev/block/{major}:{minor}"
+    for p in (f"{base}/queue/rotational", f"{base}/../queue/rotational"):   # oddíl → disk nad ním
+        try:
+            with open(p) as f:
+                return ROTATIONAL_IO_JOBS if f.read().strip() == "1" else SOLID_STATE_IO_JOBS
+        except OSError:
+            continue
+    return DEFAULT_IO_JOBS
+
+class DeviceLimiter:
+    """Počítadla běžících I/O jobů po zařízeních. Job drží všechna svá zařízení najednou (vše, nebo nic),
+    takže se nemůže zaseknout s půlkou zámků."""
+
+    def __init__(self, per_device: int | None = None, overrides: dict[str, int] | None = None):
+        self.per_device = per_device          # None = auto_limit() podle zařízení
+        self.overrides = {device_of(p): n for p, n in (overrides or {}).items()}   # {cesta/mount: limit}
+        self.running: dict[int, int] = {}
+        self._limits: dict[int, int] = {}
+        self._cond = threading.Condition()
+
+    def limit(self, dev: int) -> int:
+        if dev not in self._limits:
+            n = self.overrides.get(dev) or self.per_device or auto_limit(dev)
+            self._limits[dev] = max(1, n)
+        return self._limits[dev]
+
+    def devices(self, *paths: str) -> frozenset[int]:
+        return frozenset(device_of(p) for p in paths if p)
+
+    def _free(self, devs) -> bool:
+        return all(self.running.get(d, 0) < self.limit(d) for d in devs)
+
+    def try_acquire(self, devs) -> bool:
+        with self._cond:
+            if not self._free(devs):
+                return False
+            for d in devs:
+                self.running[d] = self.running.get(d, 0) + 1
+            return True
+
+    def acquire(self, devs):
+        with self._cond:
+            self._cond.wait_for(lambda: self._free(devs))
+            for d in devs:
+                self.running[d] = self.running.get(d, 0) + 1
+
+    def release(self, devs):
+        with self._cond:
+            for d in devs:
+                self.running[d] -= 1
+            self._cond.notify_all()
+
+    def take(self, jobs, paths_of) -> tuple | None:
+        """Z fronty (deque) vyjme první job, jehož zařízení mají volno → (job, zařízení).
+        Job blokovaný na jednom disku tak nezdrží joby na jiných discích."""
+        for i, job in enumerate(jobs):
+            devs = self.devices(*paths_of(job))
+            if self.try_acquire(devs):
+                del jobs[i]
+                return job, devs
+        return None
+
+    def describe(self, *paths: str) -> str:
+        seen = {}
+        for p in paths:
+            seen.setdefault(device_of(p), p)
+        return ", ".join(f"{mount_point(p)} ≤{self.limit(d)}" for d, p in seen.items())
+
+class ScratchStager:
+    """Výstupy se píšou na lokální scratch a do cílové složky je na pozadí přesouvá mover
+    (přes .part + os.replace, takže v output/ se nikdy neobjeví rozepsaný soubor).
+    Přesun drží limit cílového zařízení stejně jako remux."""
+
+    def __init__(self, scratch_dir: str, limiter: DeviceLimiter | None = None, workers: int = 1,
+                 part_tag: str | None = None):
+        self.scratch_dir = os.path.abspath(scratch_dir)
+        self.part_tag = part_tag   # uzel (distribuovaný režim) – vlastní .part v cílové složce
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        self.limiter = limiter
+        self._ex = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="mover")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def stage_path(self, final_path: str) -> str:
+        """Cesta na scratchi – podsložka podle cílové složky, aby se stejná jména nepotkala."""
+        final_dir = os.path.dirname(os.path.abspath(final_path))
+        sub = hashlib.blake2b(final_dir.encode("utf-8"), digest_size=6).hexdigest()
+        d = os.path.join(self.scratch_dir, sub)
+        os.makedirs(d, exist_ok=True)
+        return os.path.join(d, os.path.basename(final_path))
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _move(self, staged: str, final: str) -> str | None:
+        devs = self.limiter.devices(final) if self.limiter else frozenset()
+        if self.limiter:
+            self.limiter.acquire(devs)
+        tmp = part_path(final, self.part_tag)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(final)), exist_ok=True)
+            shutil.move(staged, tmp)      # jiné zařízení → kopie + smazání zdroje
+            commit_output(tmp, final)
+            return None
+        except OSError as e:
+            discard_output(tmp)
+            return f"move to output failed: {e}"
+        finally:
+            if self.limiter:
+                self.limiter.release(devs)
+
+    def submit(self, staged: str, final: str, on_done=None):
+        """Přesun na pozadí; on_done(err) se volá z vlákna moveru (err None = hotovo)."""
+        with self._lock:
+            self._pending += 1
+
+        def run():
+            err = self._move(staged, final)
+            with self._lock:
+                self._pending -= 1
+            if on_done is not None:
+                on_done(err)
+            return err
+
+        return self._ex.submit(run)
+
+    def close(self, wait: bool = True):
+        self._ex.shutdown(wait=wait)
@@ -0,0 +1,165 @@
+# ffmpeg_progress.py
+import os, re, subprocess, threading
+from collections import deque
+from dataclasses import dataclass, replace
+
+# Strojově čitelný progres z ffmpeg: -progress pipe:1 -nostats posílá na stdout
+# bloky key=value ukončené řádkem progress=continue|end. Chybový výstup (stderr)
+# jde zvlášť do omezeného bufferu – regex přes každý stderr řádek už není potřeba.
+
+PROGRESS_ARGS = ["-progress", "pipe:1", "-nostats"]
+ERR_LINES = 8
+STREAM_CHUNK = 64 << 10
+_KEY_VALUE = re.compile(r"^[a-z_0-9]+=")
+
+@dataclass
+class ProgressRecord:
+    out_time_us: int = 0
+    frame: int = 0
+    fps: float = 0.0
+    speed: float = 0.0
+    bitrate_kbps: float = 0.0
+    total_size: int = 0
+    end: bool = False
+
+    @property
+    def out_time(self) -> float:
+        return self.out_time_us / 1_000_000.0
+
+def _f(v: str) -> float:
+    try:
+        return float(v.rstrip("x").replace("kbits/s", ""))
+    except ValueError:
+        return 0.0   # "N/A" apod.
+
+def _i(v: str) -> int:
+    try:
+        return int(v)
+    except ValueError:
+        return 0
+
+class ProgressParser:
+    """Skládá key=value řádky do ProgressRecord; feed() vrací hotový záznam na konci bloku.
+    Hodnoty se mezi bloky přenáší, takže chybějící/N/A klíč nevynuluje progres."""
+
+    def __init__(self):
+        self._cur = ProgressRecord()
+
+    def feed(self, line: str) -> ProgressRecord | None:
+        key, sep, value = line.strip().partition("=")
+        if not sep or value.strip() == "N/A":
+            return None   # N/A (typicky při flushi enkodéru) → necháme poslední známou hodnotu
+        if key == "out_time_us" or key == "out_time_ms":   # out_time_ms je historicky taky v µs
+            self._cur.out_time_us = max(0, _i(value))
+        elif key == "frame":
+            self._cur.frame = _i(value)
+        elif key == "fps":
+            self._cur.fps = _f(value)
+        elif key == "speed":
+            self._cur.speed = _f(value)
+        elif key == "bitrate":
+            self._cur.bitrate_kbps = _f(value)
+        elif key == "total_size":
+            self._cur.total_size = _i(value)
+        elif key == "progress":
+            rec = replace(self._cur, end=(value == "end"))
+            self._cur = replace(rec, end=False)
+            return rec
+        return None
+
+def with_progress(cmd: list[str], target: str = "pipe:1") -> list[str]:
+    """Vlož -progress pipe:1 -nostats hned za cestu k ffmpeg (globální volby)."""
+    return [cmd[0], "-progress", target, *PROGRESS_ARGS[2:], *cmd[1:]]
+
+def _reap(p: subprocess.Popen, usage) -> int:
+    if usage is not None and hasattr(os, "wait4"):
+        _, status, ru = os.wait4(p.pid, 0)
+        p.returncode = os.waitstatus_to_exitcode(status)
+        usage.add(ru)
+    else:
+        p.wait()
+    return p.returncode
+
+def run_ffmpeg(cmd: list[str], on_progress=None, cwd=None, preexec_fn=None,
+               err_lines: int = ERR_LINES, usage=None) -> tuple[int, list[str]]:
+    """Spusť ffmpeg s -progress na stdout. Vrací (returncode, posledních pár řádků stderr).
+    usage = objekt s .add(rusage) (job_metrics.ChildUsage) – dostane CPU/RSS/IO potomka přes os.wait4."""
+    p = subprocess.Popen(
+        with_progress(cmd),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        cwd=cwd,
+        preexec_fn=preexec_fn,
+    )
+    errors = deque(maxlen=err_lines)
+
+    def drain_stderr():
+        for line in p.stderr:
+            line = line.strip()
+            if line:
+                errors.append(line)
+
+    t = threading.Thread(target=drain_stderr, daemon=True)
+    t.start()
+    parser = ProgressParser()
+    for line in p.stdout:
+        rec = parser.feed(line)
+        if rec is not None and on_progress:
+            on_progress(rec)
+    _reap(p, usage)
+    t.join()
+    return p.returncode, list(errors)
+
+def run_ffmpeg_stream(cmd: list[str], chunks, sink, on_progress=None, cwd=None, preexec_fn=None,
+                      err_lines: int = ERR_LINES, usage=None) -> tuple[int, list[str]]:
+    """ffmpeg jako filtr v rouře: chunks (iterátor bytes, None = vstup je v cmd) → stdin, stdout → sink(bytes)
+    průběžně. stdout nese médium, takže -progress jde na stderr a od chybových řádků se odliší podle key=value."""
+    p = subprocess.Popen(
+        with_progress(cmd, "pipe:2"),
+        stdin=subprocess.PIPE if chunks is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        preexec_fn=preexec_fn,
+    )
+    errors = deque(maxlen=err_lines)
+
+    def feed():
+        try:
+            for chunk in chunks:
+                p.stdin.write(chunk)
+        except (BrokenPipeError, OSError):
+            pass   # ffmpeg skončil dřív (chyba je ve stderr)
+        finally:
+            try:
+                p.stdin.close()
+            except OSError:
+                pass
+
+    def drain_stderr():
+        parser = ProgressParser()
+        for raw in p.stderr:
+            line = raw.decode("utf-8", errors="replace").strip()
+            if _KEY_VALUE.match(line):
+                rec = parser.feed(line)
+                if rec is not None and on_progress:
+                    on_progress(rec)
+            elif line:
+                errors.append(line)
+
+    if chunks is not None:
+        threading.Thread(target=feed, daemon=True).start()   # nečeká se na něj – zdroj může viset (tty)
+    t = threading.Thread(target=drain_stderr, daemon=True)
+    t.start()
+    try:
+        while chunk := p.stdout.read1(STREAM_CHUNK):
+            sink(chunk)
+    except BaseException:
+        p.kill()   # odběratel selhal / Ctrl+C – ffmpeg nenechat viset na plné rouře
+        _reap(p, usage)
+        raise
+    _reap(p, usage)
+    t.join()
+    return p.returncode, list(errors)
@@ -0,0 +1,184 @@
+# folder_watch.py
+import os, sys, time, select, struct
+
+# Streamované (rekurzivní) procházení vstupní složky a hlídání nových souborů.
+# Linux: inotify přes ctypes (bez závislostí), jinde polling přes os.scandir.
+# Soubor se předá ke zpracování až když se mu `settle` sekund nezměnila velikost ani mtime
+# – kopírovaný/nahrávaný soubor se tak nesebere napůl zapsaný.
+
+DEFAULT_SETTLE = 5.0
+DEFAULT_POLL = 2.0
+
+def _walk(root: str):
+    """(cesta, is_dir) pro všechno pod root – generátor přes os.scandir, bez budování seznamu."""
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    if e.name.startswith("."):
+                        continue   # skryté / dočasné soubory
+                    try:
+                        is_dir = e.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if is_dir:
+                        stack.append(e.path)
+                    yield e.path, is_dir
+        except OSError:
+            continue   # složka mezitím zmizela / nemáme práva
+
+def iter_video_files(root: str, exts: tuple, recursive: bool = True):
+    """Video soubory pod root, postupně (první cesta je k dispozici hned, i u obřího stromu)."""
+    if not recursive:
+        with os.scandir(root) as it:
+            for e in it:
+                if e.name.lower().endswith(exts) and e.is_file():
+                    yield e.path
+        return
+    for path, is_dir in _walk(root):
+        if not is_dir and path.lower().endswith(exts):
+            yield path
+
+class _Inotify:
+    """Minimální inotify přes ctypes – hlídá celý strom (watch na každou podsložku)."""
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self):
+        import ctypes, ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, str] = {}
+
+    @classmethod
+    def create(cls):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return cls()
+        except (OSError, AttributeError):
+            return None
+
+    def add_dir(self, path: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd >= 0:
+            self._dirs[wd] = path
+
+    def read(self, timeout: float) -> tuple[list[tuple[str, bool]], bool]:
+        """([(cesta, is_dir)], overflow) – čeká nejvýš timeout sekund."""
+        r, _, _ = select.select([self.fd], [], [], timeout)
+        if not r:
+            return [], False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+        out, overflow, off = [], False, 0
+        while off + self._EVENT.size <= len(data):
+            wd, mask, _cookie, length = self._EVENT.unpack_from(data, off)
+            off += self._EVENT.size
+            name = data[off:off + length].rstrip(b"\0")
+            off += length
+            if mask & self.IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            d = self._dirs.get(wd)
+            if d and name:
+                out.append((os.path.join(d, os.fsdecode(name)), bool(mask & self.IN_ISDIR)))
+        return out, overflow
+
+    def close(self):
+        os.close(self.fd)
+
+def watch_files(root: str, exts: tuple, settle: float = DEFAULT_SETTLE, poll: float = DEFAULT_POLL,
+                stop=None):
+    """Nekonečný generátor stabilních video souborů pod root: nejdřív existující, pak nově příchozí.
+    Soubor, který se po předání změní (nová velikost/mtime), se po ustálení předá znovu."""
+    ino = _Inotify.create()
+    tracking: dict[str, tuple[int, int, float]] = {}   # cesta -> (size, mtime_ns, stabilní od)
+    yielded: dict[str, tuple[int, int]] = {}
+
+    def sig(path):
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def consider(path):
+        if not path.lower().endswith(exts) or os.path.basename(path).startswith("."):
+            return
+        try:
+            s = sig(path)
+        except OSError:
+            return
+        if yielded.get(path) != s and (path not in tracking or tracking[path][:2] != s):
+            tracking[path] = (*s, time.monotonic())
+
+    def scan(d):
+        if ino:
+            ino.add_dir(d)
+        for path, is_dir in _walk(d):
+            if is_dir:
+                if ino:
+                    ino.add_dir(path)
+            else:
+                yield path
+
+    try:
+        # 1) úvodní průchod – co je dost staré, jde ven hned (první job startuje okamžitě)
+        for path in scan(root):
+            if not path.lower().endswith(exts):
+                continue
+            try:
+                s = sig(path)
+            except OSError:
+                continue
+            if time.time() - s[1] / 1e9 >= settle:
+                yielded[path] = s
+                yield path
+            else:
+                tracking[path] = (*s, time.monotonic())
+
+        # 2) hlídání – inotify události, nebo periodický rescan
+        while not (stop and stop.is_set()):
+            if ino:
+                events, overflow = ino.read(min(poll, settle))
+                if overflow:
+                    for path in scan(root):
+                        consider(path)
+                for path, is_dir in events:
+                    if is_dir:
+                        for p in scan(path):
+                            consider(p)
+                    else:
+                        consider(path)
+            else:
+                time.sleep(poll)
+                for path in iter_video_files(root, exts):
+                    consider(path)
+
+            # ustálené soubory předej dál
+            now = time.monotonic()
+            for path, (size, mtime, since) in list(tracking.items()):
+                try:
+                    s = sig(path)
+                except OSError:
+                    del tracking[path]   # smazáno dřív, než se dopsalo
+                    continue
+                if s != (size, mtime):
+                    tracking[path] = (*s, now)
+                elif now - since >= settle:
+                    del tracking[path]
+                    yielded[path] = s
+                    yield path
+    finally:
+        if ino:
+            ino.close()
@@ -0,0 +1,121 @@
+# job_journal.py
+import os, json, time, hashlib, sqlite3, threading
+from probe_cache import file_key
+from tools import _base_dir
+
+# Žurnál dokončených jobů: (otisk vstupu, hash nastavení enkódu) → hotový a ověřený výstup.
+# Po pádu/restartu dávky se hotová práce přeskočí jedním lookupem na soubor.
+# Výstupy se píšou pod dočasným jménem a až po úspěchu se atomicky přejmenují.
+
+DEFAULT_JOURNAL_PATH = os.path.join(_base_dir(), "cache", "journal.sqlite")
+DURATION_TOLERANCE = 1.0   # s – výstup smí být o tolik kratší/delší než vstup
+VERIFY_PREFIX = "verify: "  # chyba ověření výstupu (ffmpeg skončil OK, ale výstup nesedí) → dávka zkusí znovu
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    input_key     TEXT NOT NULL,
+    settings_hash TEXT NOT NULL,
+    output_path   TEXT NOT NULL,
+    output_size   INTEGER NOT NULL,
+    finished      REAL NOT NULL,
+    PRIMARY KEY (input_key, settings_hash)
+);
+"""
+
+def input_fingerprint(path: str) -> str:
+    """Otisk vstupu – stejný klíč jako probe cache (cesta + velikost + mtime + inode)."""
+    return "|".join(str(x) for x in file_key(path))
+
+def settings_hash(settings) -> str:
+    """Stabilní hash nastavení enkódu (cokoliv JSON-serializovatelného)."""
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def part_path(output_path: str, tag: str | None = None) -> str:
+    """Dočasné jméno vedle cíle (stejný FS → os.replace je atomický); přípona zůstává kvůli muxeru.
+    tag = uzel v distribuovaném režimu – dva uzly nad sdíleným output/ si nepřepíšou rozepsaný soubor."""
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}.part{'-' + tag if tag else ''}{ext}"
+
+def commit_output(tmp_path: str, output_path: str):
+    os.replace(tmp_path, output_path)
+
+def discard_output(tmp_path: str):
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass
+
+def quick_verify(output_path: str, input_duration: float | None, library_file: str | None = None) -> str | None:
+    """Základní kontrola výstupu: existuje, není prázdný a sedí délka. Vrací chybu nebo None."""
+    from media_probe import probe_media
+    try:
+        if os.path.getsize(output_path) <= 0:
+            return "output is empty"
+    except OSError:
+        return "output is missing"
+    if input_duration:
+        out = probe_media(output_path, library_file, use_cache=False)   # .part – do cache nepatří
+        if not out.duration or abs(out.duration - input_duration) > DURATION_TOLERANCE:
+            return f"output duration {out.duration} s != input {input_duration:.2f} s"
+    return None
+
+def is_verify_error(err: str | None) -> bool:
+    return bool(err) and err.startswith(VERIFY_PREFIX)
+
+def finalize_output(tmp_path: str, output_path: str, input_duration: float | None,
+                    library_file: str | None = None, verify=None) -> str | None:
+    """Ověř dočasný výstup a atomicky ho přejmenuj na cílové jméno. Vrací chybu (a tmp smaže) nebo None.
+    verify(tmp_path) → chyba/None = důkladnější kontrola (verify_output) po té rychlé."""
+    err = quick_verify(tmp_path, input_duration, library_file)
+    if not err and verify is not None:
+        err = verify(tmp_path)
+    if err:
+        discard_output(tmp_path)
+        return VERIFY_PREFIX + err
+    commit_output(tmp_path, output_path)
+    return None
+
+class JobJournal:
+    """SQLite (WAL) žurnál – lookup je jeden dotaz přes primární klíč."""
+
+    def __init__(self, db_path: str | None = None):
+        self.db_path = db_path or DEFAULT_JOURNAL_PATH
+        self._tls = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._tls.conn = conn
+        return conn
+
+    def is_done(self, input_path: str, settings: str) -> bool:
+        """Hotovo = záznam existuje a výstup pořád leží na disku se stejnou velikostí."""
+        try:
+            row = self._conn().execute(
+                "SELECT output_path, output_size FROM jobs WHERE input_key = ? AND settings_hash = ?",
+                (input_fingerprint(input_path), settings),
+            ).fetchone()
+        except (OSError, sqlite3.Error):
+            return False
+        if row is None:
+            return False
+        try:
+            return os.path.getsize(row[0]) == row[1]
+        except OSError:
+            return False
+
+    def mark_done(self, input_path: str, settings: str, output_path: str):
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO jobs (input_key, settings_hash, output_path, output_size, finished) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (input_fingerprint(input_path), settings, os.path.abspath(output_path),
+                 os.path.getsize(output_path), time.time()),
+            )
+        except (OSError, sqlite3.Error):
+            pass   # žurnál je jen optimalizace – příště se job prostě udělá znovu
@@ -0,0 +1,195 @@
+# job_metrics.py
+import os, sys, csv, json, time, threading
+from dataclasses import dataclass, field, fields
+from tools import _base_dir
+
+# Metriky po jobech: wall time, čekání ve frontě, CPU potomků (user/sys), peak RSS, průměrné fps/speed,
+# přečtené/zapsané bajty a kompresní poměr. Zapisuje se run log (JSONL + CSV) a souhrn pro
+# Prometheus (textfile collector node_exporteru) – ten se přepisuje atomicky přes os.replace.
+
+DEFAULT_METRICS_DIR = os.path.join(_base_dir(), "metrics")
+PROM_PREFIX = "converter"
+
+# ru_maxrss: Linux v KiB, macOS v bajtech
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+_BLOCK = 512   # ru_inblock/ru_oublock počítají 512B bloky
+
+@dataclass
+class ChildUsage:
+    """Součet rusage všech ffmpeg potomků jednoho jobu (segmenty běží ve vláknech → zámek)."""
+    user: float = 0.0
+    sys: float = 0.0
+    peak_rss: int = 0           # bajty, největší z potomků
+    disk_read: int = 0          # bajty skutečně načtené z disku (ne z page cache)
+    disk_written: int = 0
+    children: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, ru):
+        with self._lock:
+            self.user += ru.ru_utime
+            self.sys += ru.ru_stime
+            self.peak_rss = max(self.peak_rss, ru.ru_maxrss * _RSS_UNIT)
+            self.disk_read += ru.ru_inblock * _BLOCK
+            self.disk_written += ru.ru_oublock * _BLOCK
+            self.children += 1
+
+    def as_dict(self) -> dict:
+        return {f.name: getattr(self, f.name) for f in fields(self) if not f.name.startswith("_")}
+
+    def __getstate__(self):
+        return self.as_dict()
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+FIELDS = [
+    "run_id", "file", "status", "mode", "error",
+    "submitted", "started", "finished", "queue_wait_s", "wall_s",
+    "cpu_user_s", "cpu_sys_s", "cpu_util", "peak_rss_mb",
+    "media_s", "avg_fps", "avg_speed",
+    "input_bytes", "output_bytes", "compression_ratio", "disk_read_bytes", "disk_written_bytes",
+    "codec", "width", "height", "fps", "preset", "crf", "threads",
+]
+
+def _size(path: str | None) -> int:
+    try:
+        return os.path.getsize(path) if path else 0
+    except OSError:
+        return 0
+
+def job_record(run_id: str, file_path: str, output_path: str | None, ok: bool, mode: str, probe=None,
+               submitted: float | None = None, stats: dict | None = None, error: str | None = None,
+               settings: dict | None = None) -> dict:
+    """Jeden řádek run logu – stats jsou z workeru (started/finished + ChildUsage.as_dict() + threads).
+    settings = {"preset": …, "crf": …} enkódu – spolu s parametry vstupu data pro batch_planner."""
+    settings = settings or {}
+    stats = stats or {}
+    started = stats.get("started")
+    finished = stats.get("finished") or time.time()
+    wall = finished - started if started else None
+    cpu = stats.get("user", 0.0) + stats.get("sys", 0.0)
+    in_bytes, out_bytes = _size(file_path), (_size(output_path) if ok else 0)
+    media = probe.duration if probe is not None else None
+    fps = probe.fps if probe is not None else None
+    return {
+        "run_id": run_id,
+        "file": file_path,
+        "status": "done" if ok else "error",
+        "mode": mode,
+        "error": error or "",
+        "submitted": submitted,
+        "started": started,
+        "finished": finished,
+        "queue_wait_s": round(started - submitted, 3) if started and submitted else None,
+        "wall_s": round(wall, 3) if wall else None,
+        "cpu_user_s": round(stats["user"], 3) if "user" in stats else None,
+        "cpu_sys_s": round(stats["sys"], 3) if "sys" in stats else None,
+        "cpu_util": round(cpu / wall, 2) if wall and "user" in stats else None,   # 4.0 = 4 jádra naplno
+        "peak_rss_mb": round(stats["peak_rss"] / 1048576, 1) if stats.get("peak_rss") else None,
+        "media_s": media,
+        "avg_fps": round(media * fps / wall, 2) if media and fps and wall else None,
+        "avg_speed": round(media / wall, 3) if media and wall else None,
+        "input_bytes": in_bytes,
+        "output_bytes": out_bytes,
+        "compression_ratio": round(in_bytes / out_bytes, 3) if out_bytes else None,
+        "disk_read_bytes": stats.get("disk_read"),
+        "disk_written_bytes": stats.get("disk_written"),
+        "codec": probe.codec if probe is not None else None,
+        "width": probe.width if probe is not None else None,
+        "height": probe.height if probe is not None else None,
+        "fps": fps,
+        "preset": settings.get("preset"),
+        "crf": settings.get("crf"),
+        "threads": stats.get("threads"),
+    }
+
+def _csv_header(path: str) -> list[str]:
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            return next(csv.reader(f), [])
+    except OSError:
+        return []
+
+class RunLog:
+    """Run log dávky: metrics/runs.jsonl + runs.csv (přidává se) a converter.prom (přepisuje se)."""
+
+    def __init__(self, metrics_dir: str | None = None, prom_path: str | None = None):
+        self.metrics_dir = metrics_dir or DEFAULT_METRICS_DIR
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        self.jsonl_path = os.path.join(self.metrics_dir, "runs.jsonl")
+        self.csv_path = os.path.join(self.metrics_dir, "runs.csv")
+        self.prom_path = prom_path or os.path.join(self.metrics_dir, f"{PROM_PREFIX}.prom")
+        self.run_id = time.strftime("%Y%m%d-%H%M%S")
+        self.started = time.time()
+        self.records: list[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, rec: dict):
+        with self._lock:
+            self.records.append(rec)
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec) + "\n")
+            new = not os.path.exists(self.csv_path)
+            if not new and _csv_header(self.csv_path) != FIELDS:
+                # starší verze logu s jinými sloupci → odložit stranou, ať CSV nemá rozházené řádky
+                os.replace(self.csv_path, self.csv_path[:-4] + f".{int(os.path.getmtime(self.csv_path))}.csv")
+                new = True
+            with open(self.csv_path, "a", encoding="utf-8", newline="") as f:
+                w = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+                if new:
+                    w.writeheader()
+                w.writerow(rec)
+            self._write_prometheus()
+
+    def _write_prometheus(self):
+        recs = self.records
+        done = [r for r in recs if r["status"] == "done"]
+        now = time.time()
+
+        def total(key, rows=recs):
+            return sum(r.get(key) or 0 for r in rows)
+
+        elapsed = max(1e-6, now - self.started)
+        gauges = [
+            ("run_start_timestamp_seconds", "Start of the current batch run.", [("", self.started)]),
+            ("run_updated_timestamp_seconds", "Last update of this file.", [("", now)]),
+            ("run_jobs", "Jobs finished in the current run by status.",
+             [(f'{{status="{s}"}}', sum(1 for r in recs if r["status"] == s)) for s in ("done", "error")]),
+            ("run_wall_seconds", "Sum of job wall times.", [("", total("wall_s"))]),
+            ("run_queue_wait_seconds", "Sum of queue waits.", [("", total("queue_wait_s"))]),
+            ("run_cpu_seconds", "ffmpeg CPU time by mode.",
+             [('{mode="user"}', total("cpu_user_s")), ('{mode="system"}', total("cpu_sys_s"))]),
+            ("run_peak_rss_bytes", "Largest peak RSS of a single ffmpeg child.",
+             [("", int(max((r.get("peak_rss_mb") or 0 for r in recs), default=0) * 1048576))]),
+            ("run_media_seconds", "Media duration processed (finished jobs).", [("", total("media_s", done))]),
+            ("run_input_bytes", "Input bytes of finished jobs.", [("", total("input_bytes", done))]),
+            ("run_output_bytes", "Output bytes of finished jobs.", [("", total("output_bytes", done))]),
+            ("run_throughput_speed", "Media seconds processed per wall-clock second of the run.",
+             [("", total("media_s", done) / elapsed)]),
+        ]
+        lines = []
+        for name, help_text, samples in gauges:
+            full = f"{PROM_PREFIX}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} gauge")
+            lines += [f"{full}{labels} {float(value)!r}" for labels, value in samples]
+        tmp = f"{self.prom_path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(self.prom_path)), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.prom_path)   # collector nikdy neuvidí rozepsaný soubor
+
+    def summary(self) -> str:
+        done = [r for r in self.records if r["status"] == "done"]
+        if not done:
+            return ""
+        wall = sum(r.get("wall_s") or 0 for r in done)
+        cpu = sum((r.get("cpu_user_s") or 0) + (r.get("cpu_sys_s") or 0) for r in done)
+        ins, outs = sum(r["input_bytes"] for r in done), sum(r["output_bytes"] for r in done)
+        text = f"⏱️  {len(done)} jobs · {wall:.0f} s wall"
+        if any(r.get("cpu_user_s") is not None for r in done):
+            text += f" · {cpu:.0f} s CPU"
+        if outs:
+            text += f" · {ins / 1048576:.0f} → {outs / 1048576:.0f} MB ({ins / outs:.2f}×)"
+        return text + f" · log: {self.jsonl_path}"
@@ -0,0 +1,61 @@
+# keyframes.py
+import re, subprocess
+from fractions import Fraction
+from probe_cache import get_cache
+
+# Index keyframů (časy v s) pro dělení dlouhých souborů na segmenty.
+# Stačí nám ffmpeg: framecrc s -c copy vypíše každý paket bez dekódování
+# a ne-keyframy označí ", F=0x…". Výsledek se ukládá do probe cache.
+
+CACHE_KIND = "keyframes"
+_TB_RE = re.compile(r"^#tb 0: (\d+)/(\d+)")
+
+def scan_keyframes(ffmpeg: str, path: str, input_opts: list[str] | None = None) -> list[float]:
+    cmd = [
+        ffmpeg, "-hide_banner", "-v", "error", "-nostdin",
+        *(input_opts or []),
+        "-i", path,
+        "-map", "0:v:0", "-c", "copy",
+        "-f", "framecrc", "-",
+    ]
+    tb = Fraction(1, 1)
+    times = []
+    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    if p.stdout:
+        for line in p.stdout:
+            if line.startswith("#"):
+                m = _TB_RE.match(line)
+                if m:
+                    tb = Fraction(int(m.group(1)), int(m.group(2)))
+                continue
+            if "F=" in line:
+                continue   # ne-keyframe
+            parts = line.split(",")
+            if len(parts) >= 3:
+                try:
+                    times.append(float(int(parts[2]) * tb))
+                except ValueError:
+                    pass
+    p.wait()
+    if p.returncode != 0:
+        raise RuntimeError("ffmpeg keyframe scan failed")
+    return sorted(times)
+
+def keyframe_times(ffmpeg: str, path: str, input_opts: list[str] | None = None) -> list[float]:
+    """Keyframy z cache (klíč path+size+mtime+inode), jinak jeden průchod přes framecrc."""
+    cache = get_cache()
+    times = cache.get_extra(path, CACHE_KIND)
+    if times is None:
+        times = scan_keyframes(ffmpeg, path, input_opts)
+        cache.put_extra(path, CACHE_KIND, times)
+    return times
+
+def pick_split_points(times: list[float], duration: float, segments: int) -> list[float]:
+    """Až segments-1 řezů na keyframech co nejblíž rovnoměrnému dělení (vynechá duplicitní/nulové)."""
+    points = []
+    for k in range(1, segments):
+        target = duration * k / segments
+        best = min(times, key=lambda t: abs(t - target), default=None)
+        if best is not None and best > 0 and best < duration and best not in points:
+            points.append(best)
+    return sorted(points)
@@ -0,0 +1,155 @@
+# media_probe.py
+import io, os
+from dataclasses import dataclass
+from probe_cache import parse_tracks
+from tools import mediainfo_dll as _mediainfo_dll
+
+# přípony "raw" HEVC bez kontejneru
+RAW_HEVC_EXT = {".hevc", ".h265", ".265"}
+
+def _to_float(v) -> float | None:
+    try:
+        return float(v) if v not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+def _to_int(v) -> int | None:
+    f = _to_float(v)
+    return int(f) if f is not None else None
+
+# typ stopy MediaInfo → typ streamu v ffmpeg (-map 0:<typ>:<n>)
+_STREAM_KINDS = {"Video": "v", "Audio": "a", "Text": "s", "Other": "d"}
+
+@dataclass(frozen=True)
+class StreamInfo:
+    """Jedna stopa souboru – index je pořadí v rámci typu (stejně jako specifikátor 0:a:1 v ffmpeg)."""
+    kind: str                          # v / a / s / d
+    index: int
+    format: str | None = None          # AAC, Opus, UTF-8, PGS, …
+    codec_id: str | None = None
+    bit_rate: int | None = None        # b/s
+    channels: int | None = None
+    language: str | None = None
+
+@dataclass(frozen=True)
+class MediaProbe:
+    """Kompaktní (picklovatelný) výsledek jednoho probe – předává se do workeru, konvertoru i analyzeru."""
+    path: str
+    container: str | None = None
+    has_video: bool = False
+    codec: str | None = None            # formát videa dle MediaInfo (HEVC, AVC, …)
+    codec_id: str | None = None         # hvc1, hev1, avc1, …
+    codec_name: str | None = None       # pole "codec" z MediaInfo (starší knihovny; VideoAnalyzer ho vrací)
+    duration: float | None = None       # sekundy
+    width: int | None = None
+    height: int | None = None
+    fps: float | None = None
+    frame_rate_mode: str | None = None  # CFR / VFR (telefony: VFR → fps je jen průměr)
+    has_audio: bool = False
+    audio_codec: str | None = None
+    audio_codec_name: str | None = None
+    audio_channels: int | None = None
+    audio_sampling_rate: int | None = None
+    streams: tuple[StreamInfo, ...] = ()
+
+    @property
+    def is_raw_hevc(self) -> bool:
+        return os.path.splitext(self.path)[1].lower() in RAW_HEVC_EXT
+
+    @property
+    def is_hevc(self) -> bool:
+        """True, když je video HEVC/H.265 (včetně raw .hevc/.h265/.265)."""
+        if self.is_raw_hevc:
+            return True
+        fmt = (self.codec or "").lower()
+        cid = (self.codec_id or "").lower()
+        return ("hevc" in fmt or "h265" in fmt or
+                "hvc1" in cid or "hev1" in cid or "hevc" in cid)
+
+    @property
+    def is_vfr(self) -> bool:
+        return (self.frame_rate_mode or "").upper() == "VFR"
+
+    @property
+    def resolution(self) -> tuple[int, int] | None:
+        return (self.width, self.height) if self.width and self.height else None
+
+def probe_media(path: str, library_file: str | None = None, parse_speed: float | None = None,
+                use_cache: bool = True) -> MediaProbe:
+    """Jeden průchod MediaInfo (přes sdílenou cache) → MediaProbe. Vždy s DLL z _mediainfo_dll().
+    parse_speed viz parse_tracks – jen pro inventuru, konverze chce plný parse.
+    use_cache=False pro dočasné výstupy (.part), které se pod stejným jménem už nikdy neobjeví."""
+    if library_file is None:
+        library_file = _mediainfo_dll()
+    try:
+        tracks = parse_tracks(path, library_file, parse_speed, use_cache)
+    except Exception:
+        # U raw HEVC MediaInfo někdy selže – i prázdný probe nese is_raw_hevc
+        return MediaProbe(path=path)
+    return _from_tracks(path, tracks)
+
+def probe_stream(head: bytes, name: str = "pipe", library_file: str | None = None) -> MediaProbe:
+    """Probe z hlavičky streamu (prvních pár MB v paměti) – bez souboru na disku a bez cache.
+    name nese jen příponu (raw HEVC, kontejner). MP4 s moov na konci z hlavičky nepozná nic."""
+    if library_file is None:
+        library_file = _mediainfo_dll()
+    try:
+        from pymediainfo import MediaInfo
+        kwargs = {"library_file": library_file} if library_file else {}
+        tracks = [t.to_data() for t in MediaInfo.parse(io.BytesIO(head), parse_speed=0, **kwargs).tracks]
+    except Exception:
+        return MediaProbe(path=name)
+    return _from_tracks(name, tracks)
+
+def _from_tracks(path: str, tracks: list[dict]) -> MediaProbe:
+    general = next((t for t in tracks if t.get("track_type") == "General"), {})
+    video = next((t for t in tracks if t.get("track_type") == "Video"), None)
+    audio = next((t for t in tracks if t.get("track_type") == "Audio"), None)
+
+    duration = None
+    for t in (video, general):
+        if t and t.get("duration"):
+            duration = _to_float(t["duration"])
+            if duration is not None:
+                duration /= 1000.0
+                break
+
+    streams, counts = [], {}
+    for t in tracks:
+        kind = _STREAM_KINDS.get(t.get("track_type"))
+        if kind is None:
+            continue
+        if kind == "s" and any(m in (t.get("muxing_mode") or "").lower() for m in ("dtvcc", "sei")):
+            continue   # titulky schované v bitstreamu videa (EIA-608 v SEI) – ffmpeg je nevidí jako stream
+        streams.append(StreamInfo(
+            kind=kind,
+            index=counts.get(kind, 0),
+            format=t.get("format"),
+            codec_id=t.get("codec_id"),
+            bit_rate=_to_int(t.get("bit_rate")),
+            channels=_to_int(t.get("channel_s")),
+            language=t.get("language"),
+        ))
+        counts[kind] = counts.get(kind, 0) + 1
+
+    v = video or {}
+    a = audio or {}
+    return MediaProbe(
+        path=path,
+        container=general.get("format"),
+        has_video=video is not None,
+        codec=v.get("format"),
+        codec_id=v.get("codec_id"),
+        codec_name=v.get("codec"),
+        duration=duration,
+        width=_to_int(v.get("width")),
+        height=_to_int(v.get("height")),
+        fps=_to_float(v.get("frame_rate")),
+        frame_rate_mode=v.get("frame_rate_mode"),
+        has_audio=audio is not None,
+        audio_codec=a.get("format"),
+        audio_codec_name=a.get("codec"),
+        audio_channels=_to_int(a.get("channel_s")),
+        audio_sampling_rate=_to_int(a.get("sampling_rate")),
+        streams=tuple(streams),
+    )
@@ -0,0 +1,182 @@
+# preset_tuner.py
+import os, time, tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from ffmpeg_progress import ProgressRecord, run_ffmpeg
+from probe_cache import get_cache
+from scheduler import ThreadBudget, DEFAULT_FPS
+
+# Volba presetu/CRF z krátkých zkušebních enkódů místo natvrdo "-preset slow -crf 28".
+# Z pár vzorků každého souboru změříme fps a bitrate enkodéru, a pak:
+#  - time budget → co nejpomalejší (nejúspornější) preset, se kterým dávka doběhne včas,
+#  - target size → nejnižší CRF (nejlepší kvalita), který se vejde do cílové velikosti.
+# Měření i výsledná volba se ukládají do probe cache (extras) vedle dat z MediaInfo.
+
+PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow")
+CANDIDATE_PRESETS = ("veryfast", "fast", "medium", "slow", "slower")
+CRF_RANGE = (18, 34)
+CRF_DOUBLING = 6            # x265: +6 CRF ≈ poloviční bitrate
+SAMPLE_COUNT = 3
+SAMPLE_SECONDS = 4.0
+AUDIO_KBPS = 128            # odhad audia při rozpočtu velikosti
+
+SAMPLE_KIND = "x265_sample"
+CHOICE_KIND = "x265_choice"
+
+@dataclass(frozen=True)
+class SampleResult:
+    fps: float                  # snímky za sekundu wall-clock (s daným vláknovým rozpočtem)
+    kbps: float                 # bitrate videa na výstupu
+
+def sample_windows(duration: float, samples: int = SAMPLE_COUNT,
+                   seconds: float = SAMPLE_SECONDS) -> list[tuple[float, float]]:
+    """(start, délka) rovnoměrně přes soubor; krátký soubor = jeden vzorek od začátku."""
+    if duration <= samples * seconds * 2:
+        return [(0.0, min(duration, seconds))]
+    return [(max(0.0, duration * (k + 1) / (samples + 1) - seconds / 2), seconds) for k in range(samples)]
+
+def measure(ffmpeg: str, probe, preset: str, crf: int, thread_budget: ThreadBudget | None = None,
+            samples: int = SAMPLE_COUNT, seconds: float = SAMPLE_SECONDS) -> SampleResult | None:
+    """Zkušební enkód vzorků (jen video) – výsledek z cache, pokud se soubor nezměnil."""
+    threads = thread_budget.threads if thread_budget else 0
+    kind = f"{SAMPLE_KIND}:{preset}:{crf}:{threads}:{samples}x{seconds:g}"
+    cache = get_cache()
+    hit = cache.get_extra(probe.path, kind)
+    if hit is not None:
+        return SampleResult(**hit)
+    if not probe.duration:
+        return None
+
+    frames = size = 0
+    wall = out_time = 0.0
+    input_opts = ["-f", "hevc"] if probe.is_raw_hevc else []
+    x265 = "log-level=error" + (":" + thread_budget.x265_params() if thread_budget else "")
+    with tempfile.TemporaryDirectory(prefix=".tune_") as tmp:
+        for i, (start, length) in enumerate(sample_windows(probe.duration, samples, seconds)):
+            last = [ProgressRecord()]
+            cmd = [
+                ffmpeg, "-hide_banner", "-v", "error", "-nostdin", "-y",
+                *(thread_budget.ffmpeg_input_args() if thread_budget else []),
+                "-ss", f"{start:.3f}", "-t", f"{length:.3f}",
+                *input_opts, "-i", probe.path,
+                "-map", "0:v:0", "-an", "-sn", "-dn",
+                "-c:v", "libx265", "-preset", preset, "-crf", str(crf), "-x265-params", x265,
+                os.path.join(tmp, f"s{i}.mkv"),
+            ]
+            t0 = time.perf_counter()
+            rc, _ = run_ffmpeg(cmd, lambda rec: last.__setitem__(0, rec),
+                               preexec_fn=thread_budget.preexec() if thread_budget else None)
+            if rc != 0:
+                return None
+            wall += time.perf_counter() - t0
+            frames += last[0].frame
+            out_time += last[0].out_time or length
+            size += os.path.getsize(os.path.join(tmp, f"s{i}.mkv"))
+
+    if not frames or wall <= 0:
+        return None
+    result = SampleResult(fps=frames / wall, kbps=size * 8 / 1000 / max(out_time, 1e-3))
+    cache.put_extra(probe.path, kind, {"fps": result.fps, "kbps": result.kbps})
+    return result
+
+def crf_for_bitrate(base_crf: int, base_kbps: float, target_kbps: float) -> int:
+    """Nejnižší CRF, jehož odhadnutý bitrate se vejde do target_kbps (model: 2× bitrate na −6 CRF)."""
+    lo, hi = CRF_RANGE
+    for crf in range(lo, hi + 1):
+        if base_kbps * 2 ** ((base_crf - crf) / CRF_DOUBLING) <= target_kbps:
+            return crf
+    return hi
+
+def _frames(probe) -> float:
+    return (probe.duration or 0.0) * (probe.fps or DEFAULT_FPS)
+
+def _makespan(times: list[float], slots: int) -> float:
+    """Hrubý odhad délky dávky: práce rozdělená do slotů, ale nikdy kratší než nejdelší job."""
+    return max(sum(times) / max(1, slots), max(times, default=0.0))
+
+def _budget_sig(time_budget, target_size_mb, base_preset, base_crf) -> str:
+    return f"{time_budget}:{target_size_mb}:{base_preset}:{base_crf}"
+
+def _stored(probes: list, sig: str) -> dict[str, dict]:
+    """Dřívější volby se stejným zadáním – jen záznamy s odhadem času a velikosti (pevné vstupy plánu)."""
+    cache = get_cache()
+    out = {}
+    for p in probes:
+        c = cache.get_extra(p.path, CHOICE_KIND)
+        if c and c.get("sig") == sig and "secs" in c and "kbit" in c:
+            out[p.path] = c
+    return out
+
+def stored_choices(probes: list, time_budget: float | None = None, target_size_mb: float | None = None,
+                   base_preset: str = "slow", base_crf: int = 28) -> dict[str, dict]:
+    """{cesta: {"preset": …, "crf": …}} z dřívějšího ladění se stejným zadáním – bez vzorkování."""
+    if not (time_budget or target_size_mb):
+        return {}
+    sig = _budget_sig(time_budget, target_size_mb, base_preset, base_crf)
+    return {path: {"preset": c["preset"], "crf": c["crf"]} for path, c in _stored(probes, sig).items()}
+
+def tune_batch(ffmpeg: str, probes: list, slots: list[ThreadBudget], time_budget: float | None = None,
+               target_size_mb: float | None = None, base_preset: str = "slow", base_crf: int = 28,
+               presets: tuple = CANDIDATE_PRESETS, spent_mb: float = 0.0) -> dict[str, dict]:
+    """{cesta: {"preset": …, "crf": …}} pro enkódované soubory dávky.
+    Bez time_budget zůstává base_preset, bez target_size_mb base_crf.
+    Soubory s dřívější volbou (stejné zadání) ji drží a v plánu jsou jen pevným časem a velikostí;
+    vzorkují a plánují se jen ostatní. spent_mb = velikost už hotových výstupů dávky (ubírá z rozpočtu)."""
+    probes = [p for p in probes if p.has_video and p.duration]
+    if not probes or not (time_budget or target_size_mb):
+        return {}
+    cache = get_cache()
+    sig = _budget_sig(time_budget, target_size_mb, base_preset, base_crf)
+    fixed = _stored(probes, sig)
+    out = {path: {"preset": c["preset"], "crf": c["crf"]} for path, c in fixed.items()}
+    probes = [p for p in probes if p.path not in fixed]
+    if not probes:
+        return out
+
+    # vzorky paralelně – každý se vláknovým rozpočtem jednoho slotu (jako v dávce)
+    candidates = list(presets) if time_budget else [base_preset]
+    tasks = [(p, preset) for p in probes for preset in candidates]
+    budget = slots[0] if slots else None
+    with ThreadPoolExecutor(max_workers=max(1, len(slots))) as ex:
+        results = list(ex.map(lambda t: measure(ffmpeg, t[0], t[1], base_crf, budget), tasks))
+    samples: dict[str, dict[str, SampleResult]] = {}
+    for (p, preset), r in zip(tasks, results):
+        if r is not None:
+            samples.setdefault(p.path, {})[preset] = r
+
+    # preset: od nejpomalejšího; dokud dávka nestihne budget, zrychli job, který tím nejvíc ušetří
+    order = sorted(candidates, key=PRESETS.index)            # rychlé → pomalé
+    # soubor, u kterého některý vzorek selhal, zůstává na výchozím nastavení
+    chosen = {p.path: len(order) - 1 for p in probes if len(samples.get(p.path, {})) == len(order)}
+    by_path = {p.path: p for p in probes}
+    fixed_secs = [c["secs"] for c in fixed.values()]
+
+    def est(path, i):
+        return _frames(by_path[path]) / samples[path][order[i]].fps
+
+    if time_budget:
+        while _makespan(fixed_secs + [est(path, i) for path, i in chosen.items()], len(slots)) > time_budget:
+            steps = [(est(path, i) - est(path, i - 1), path) for path, i in chosen.items() if i > 0]
+            if not steps:
+                break   # ani nejrychlejší preset to nestihne – necháme nejrychlejší
+            _, path = max(steps)
+            chosen[path] -= 1
+
+    # CRF: zbytek rozpočtu velikosti (bez hotových a pevných) rozdělený podle práce (délka × pixely)
+    weights = {path: _frames(by_path[path]) * ((by_path[path].width or 1920) * (by_path[path].height or 1080))
+               for path in chosen}
+    total_w = sum(weights.values()) or 1.0
+    left_kbit = ((target_size_mb or 0.0) - spent_mb) * 8 * 1000 - sum(c["kbit"] for c in fixed.values())
+    for path, i in chosen.items():
+        preset = order[i]
+        crf = base_crf
+        r = samples[path][preset]
+        p = by_path[path]
+        audio = AUDIO_KBPS if p.has_audio else 0
+        if target_size_mb:
+            video_kbps = left_kbit * weights[path] / total_w / p.duration - audio
+            crf = crf_for_bitrate(base_crf, r.kbps, max(1.0, video_kbps))
+        out[path] = {"preset": preset, "crf": crf}
+        kbit = (r.kbps * 2 ** ((base_crf - crf) / CRF_DOUBLING) + audio) * p.duration
+        cache.put_extra(path, CHOICE_KIND, {"sig": sig, **out[path], "secs": est(path, i), "kbit": kbit})
+    return out
@@ -0,0 +1,242 @@
+# pressure.py
+import os, sys, time, signal
+from dataclasses import dataclass
+
+# Adaptivní počet běžících enkódů podle zatížení stroje (Linux: /proc/stat, /proc/pressure, /proc/meminfo).
+# Klíčová veličina je "cizí" CPU: celkové vytížení mínus to, co spotřebovaly naše procesy (celý strom
+# potomků, i dožité přes cutime). Volná jádra = CPU − cizí zátěž − rezerva → kolik jobů se vejde.
+# Paměť (MemAvailable, PSI memory) a I/O (PSI io) můžou limit jen snížit.
+# Přebytečné běžící joby se pozastaví (SIGSTOP/SIGCONT) nebo přenicují na nejnižší prioritu.
+
+PSI_DIR = "/proc/pressure"
+DEFAULT_INTERVAL = 5.0
+RAISE_AFTER = 3             # kolik vzorků po sobě musí být volno, než se přidá job (hystereze)
+HEADROOM_CORES = 0.5        # rezerva pro popředí
+FOREIGN_IDLE_CORES = 0.25   # cizí zátěž pod touto hranicí = nečinný stroj
+MEM_AVAILABLE_MIN = 0.10    # pod 10 % dostupné paměti se ubírá
+MEM_PSI_FULL_MAX = 5.0      # % času, kdy všechno stojí na paměti (avg10)
+IO_PSI_FULL_MAX = 30.0
+CPU_PSI_SOME_MAX = 40.0     # jen spolu s cizí zátěží – naše vlastní soupeření vláken se nepočítá
+NICE_SURPLUS = 19
+
+ACTION_STOP, ACTION_NICE = "stop", "nice"
+
+@dataclass(frozen=True)
+class Sample:
+    foreign_cores: float        # CPU spotřebované jinými procesy než našimi
+    cpu_some: float             # PSI avg10 (%), 0 bez PSI
+    mem_full: float
+    io_full: float
+    mem_available: float        # podíl MemAvailable / MemTotal
+
+def supported() -> bool:
+    return sys.platform.startswith("linux") and os.path.exists("/proc/stat")
+
+def read_psi(resource: str) -> dict[str, float]:
+    """{"some": avg10, "full": avg10} z /proc/pressure/<resource>; {} bez PSI (starší jádro, kontejner)."""
+    out = {}
+    try:
+        with open(os.path.join(PSI_DIR, resource)) as f:
+            for line in f:
+                kind, *fields = line.split()
+                values = dict(x.split("=", 1) for x in fields)
+                out[kind] = float(values.get("avg10", 0.0))
+    except (OSError, ValueError):
+        pass
+    return out
+
+def _cpu_times() -> tuple[int, int]:
+    """(busy, total) v jiffies za celý stroj."""
+    with open("/proc/stat") as f:
+        values = [int(x) for x in f.readline().split()[1:]]
+    idle = values[3] + (values[4] if len(values) > 4 else 0)   # idle + iowait
+    total = sum(values[:8])                                    # bez guest (už je v user)
+    return total - idle, total
+
+def _mem_available() -> float:
+    info = {}
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                info[key] = int(value.split()[0])
+        return info["MemAvailable"] / info["MemTotal"]
+    except (OSError, KeyError, ValueError, ZeroDivisionError):
+        return 1.0
+
+def proc_table() -> dict[int, tuple[int, int]]:
+    """{pid: (ppid, jiffies vč. dožitých potomků)} pro všechny procesy."""
+    table = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue   # proces mezitím skončil
+        table[int(name)] = (int(fields[1]), sum(int(x) for x in fields[11:15]))
+    return table
+
+def descendants(table: dict, root: int) -> list[int]:
+    children: dict[int, list[int]] = {}
+    for pid, (ppid, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    out, stack = [], [root]
+    while stack:
+        for c in children.get(stack.pop(), ()):
+            out.append(c)
+            stack.append(c)
+    return out
+
+def _signal_tree(pids: list[int], sig):
+    for pid in pids:
+        try:
+            os.kill(pid, sig)
+        except OSError:
+            pass
+
+def _renice_tree(pids: list[int], nice: int) -> bool:
+    """Nice je na Linuxu per-vlákno → přes všechna vlákna (x265 má vlastní pool).
+    False = některé vlákno nice nezměnilo (snížit nice zpátky smí jen root / CAP_SYS_NICE)."""
+    ok = True
+    for pid in pids:
+        try:
+            tids = [int(t) for t in os.listdir(f"/proc/{pid}/task")]
+        except OSError:
+            continue   # proces mezitím skončil
+        for tid in tids:
+            try:
+                os.setpriority(os.PRIO_PROCESS, tid, nice)
+            except ProcessLookupError:
+                pass
+            except OSError:
+                ok = False
+    return ok
+
+def can_renice() -> bool:
+    """Renice jde vrátit (nice 19 → 0) jen s root / CAP_SYS_NICE; jinak by job zůstal přiškrcený."""
+    if os.geteuid() == 0:
+        return True
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("CapEff:"):
+                    return bool(int(line.split()[1], 16) & (1 << 23))   # CAP_SYS_NICE
+    except (OSError, ValueError, IndexError):
+        pass
+    return False
+
+class PressureController:
+    """Limit souběžných enkódů, přepočítávaný z tlaku na systém.
+    update() se volá z hlavní smyčky dávky často; vzorek se bere nejvýš jednou za interval."""
+
+    def __init__(self, max_jobs: int, threads_per_job: int, min_jobs: int = 0, action: str = ACTION_STOP,
+                 interval: float = DEFAULT_INTERVAL, headroom: float = HEADROOM_CORES):
+        self.max_jobs = max(1, max_jobs)
+        self.min_jobs = max(0, min(min_jobs, self.max_jobs))
+        self.threads_per_job = max(1, threads_per_job)
+        # renice bez práva vrátit nice zpátky → pozastavování (SIGSTOP/SIGCONT)
+        self.action = ACTION_STOP if action == ACTION_NICE and not can_renice() else action
+        self.interval = interval
+        self.headroom = headroom
+        self.ncpu = os.cpu_count() or 1
+        self.limit = self.max_jobs
+        self.sample: Sample | None = None
+        self.throttled: set = set()        # klíče jobů pozastavených / přenicovaných kvůli limitu
+        self._last = 0.0
+        self._prev = None                  # (busy, total, naše jiffies)
+        self._calm = 0
+
+    def _take_sample(self, table: dict) -> Sample | None:
+        busy, total = _cpu_times()
+        me = os.getpid()
+        ours = table.get(me, (0, 0))[1] + sum(table[p][1] for p in descendants(table, me))
+        prev, self._prev = self._prev, (busy, total, ours)
+        if prev is None or total <= prev[1]:
+            return None
+        share = max(0, (busy - prev[0]) - (ours - prev[2])) / (total - prev[1])
+        mem, io, cpu = read_psi("memory"), read_psi("io"), read_psi("cpu")
+        return Sample(foreign_cores=share * self.ncpu, cpu_some=cpu.get("some", 0.0),
+                      mem_full=mem.get("full", 0.0), io_full=io.get("full", 0.0),
+                      mem_available=_mem_available())
+
+    def _target(self, s: Sample, active: int) -> int:
+        # rezerva pro popředí jen tehdy, když tam opravdu něco běží (šum systému se nepočítá)
+        reserve = self.headroom if s.foreign_cores >= FOREIGN_IDLE_CORES else 0.0
+        target = int((self.ncpu - s.foreign_cores - reserve) / self.threads_per_job + 0.5)
+        # tlak na paměť / disk / popředí: ber po jednom jobu, dokud neustane
+        if (s.mem_available < MEM_AVAILABLE_MIN or s.mem_full > MEM_PSI_FULL_MAX or s.io_full > IO_PSI_FULL_MAX
+                or (s.cpu_some > CPU_PSI_SOME_MAX and s.foreign_cores > self.headroom)):
+            target = min(target, active - 1)
+        return max(self.min_jobs, min(self.max_jobs, target))
+
+    def update(self, jobs: dict) -> bool:
+        """jobs = {klíč: pid workeru} běžících enkódů v pořadí spuštění. Vrací True, když se vzal nový vzorek."""
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return False
+        self._last = now
+        table = proc_table()
+        s = self._take_sample(table)
+        if s is not None:
+            self.sample = s
+            target = self._target(s, len(jobs) - len(self.throttled))
+            if target < self.limit:
+                self.limit, self._calm = target, 0
+            elif target > self.limit:
+                self._calm += 1
+                if self._calm >= RAISE_AFTER:
+                    self.limit, self._calm = self.limit + 1, 0   # přidává se pozvolna, ubírá hned
+            else:
+                self._calm = 0
+        self._apply(jobs, table)
+        return True
+
+    def _apply(self, jobs: dict, table: dict):
+        """Nejnovější joby nad limit se pozastaví; při uvolnění se pouští nejstarší."""
+        keys = list(jobs)
+        surplus = set(keys[self.limit:])
+        for key in keys:
+            pids = descendants(table, jobs[key]) if jobs[key] else []
+            if key in surplus:
+                # i nově spuštěné ffmpeg (další segment) – aplikuje se na celý strom každý vzorek
+                if self.action == ACTION_STOP:
+                    _signal_tree(pids, signal.SIGSTOP)
+                else:
+                    _renice_tree(pids, NICE_SURPLUS)
+                self.throttled.add(key)
+            elif key in self.throttled:
+                if self.action == ACTION_STOP:
+                    _signal_tree(pids, signal.SIGCONT)
+                elif not _renice_tree(pids, 0):
+                    continue   # nice zpátky nejde – job se dál počítá jako přiškrcený
+                self.throttled.discard(key)
+        self.throttled &= set(keys)
+
+    def can_start(self, active: int) -> bool:
+        return not self.throttled and active < self.limit
+
+    def forget(self, key):
+        self.throttled.discard(key)
+
+    def release_all(self, jobs: dict):
+        """Před koncem / při Ctrl+C: nic nesmí zůstat zastavené."""
+        if self.action != ACTION_STOP:
+            return
+        table = proc_table()
+        for key in list(self.throttled):
+            if jobs.get(key):
+                _signal_tree(descendants(table, jobs[key]), signal.SIGCONT)
+        self.throttled.clear()
+
+    def describe(self) -> str:
+        s = self.sample
+        text = f"🎛️  limit {self.limit}/{self.max_jobs}"
+        if self.throttled:
+            text += f" · {len(self.throttled)} {'paused' if self.action == ACTION_STOP else 'reniced'}"
+        if s is not None:
+            text += f" · others {s.foreign_cores:.1f} cores · mem {s.mem_available * 100:.0f}% free"
+            if s.io_full:
+                text += f" · io {s.io_full:.0f}%"
+        return text
@@ -0,0 +1,203 @@
+# probe_cache.py
+import os, json, time, sqlite3, threading
+from tools import _base_dir
+
+# Sdílená perzistentní cache výsledků MediaInfo.parse.
+# Klíč = absolutní cesta + velikost + mtime (+ inode, kde ho OS má).
+# Nezměněný soubor se tak mezi běhy už nikdy neparsuje znovu.
+
+DEFAULT_DB_PATH = os.path.join(_base_dir(), "cache", "probe_cache.sqlite")
+DEFAULT_MAX_ENTRIES = 50_000
+TOUCH_INTERVAL = 3600.0      # last_used přepisujeme nejvýš 1× za hodinu (šetří zápisy)
+EVICT_EVERY = 200            # kontrola velikosti po každých N zápisech
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    path      TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    inode     INTEGER NOT NULL,
+    tracks    TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS probes_last_used ON probes(last_used);
+CREATE TABLE IF NOT EXISTS extras (
+    path      TEXT NOT NULL,
+    kind      TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    inode     INTEGER NOT NULL,
+    value     TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (path, kind)
+);
+CREATE INDEX IF NOT EXISTS extras_last_used ON extras(last_used);
+"""
+
+def file_key(path: str) -> tuple[str, int, int, int]:
+    """(abs cesta, velikost, mtime_ns, inode) – inode je 0 tam, kde ho FS nevrací."""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns, st.st_ino or 0
+
+class ProbeCache:
+    """SQLite (WAL) cache – bezpečná pro zápis z více procesů i vláken."""
+
+    def __init__(self, db_path: str | None = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self.max_entries = max(1, int(max_entries))
+        self._tls = threading.local()
+        self._puts = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            # isolation_level=None → transakce řídíme sami (BEGIN IMMEDIATE)
+            conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._tls.conn = conn
+        return conn
+
+    def get(self, path: str) -> list[dict] | None:
+        try:
+            apath, size, mtime_ns, inode = file_key(path)
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT size, mtime_ns, inode, tracks, last_used FROM probes WHERE path = ?",
+                (apath,),
+            ).fetchone()
+        except (OSError, sqlite3.Error):
+            return None
+        if row is None or tuple(row[:3]) != (size, mtime_ns, inode):
+            return None
+        now = time.time()
+        if now - row[4] > TOUCH_INTERVAL:
+            try:
+                conn.execute("UPDATE probes SET last_used = ? WHERE path = ?", (now, apath))
+            except sqlite3.Error:
+                pass
+        try:
+            return json.loads(row[3])
+        except ValueError:
+            return None
+
+    def put(self, path: str, tracks: list[dict]):
+        try:
+            apath, size, mtime_ns, inode = file_key(path)
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO probes (path, size, mtime_ns, inode, tracks, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (apath, size, mtime_ns, inode, json.dumps(tracks, default=str), time.time()),
+                )
+                self._puts += 1
+                if self._puts % EVICT_EVERY == 1:
+                    self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except (OSError, sqlite3.Error):
+            pass  # cache je jen optimalizace – chyba zápisu nesmí shodit konverzi
+
+    # --- další data vázaná na stejný klíč souboru (keyframy, …) ---
+
+    def get_extra(self, path: str, kind: str):
+        try:
+            apath, size, mtime_ns, inode = file_key(path)
+            row = self._conn().execute(
+                "SELECT size, mtime_ns, inode, value, last_used FROM extras WHERE path = ? AND kind = ?",
+                (apath, kind),
+            ).fetchone()
+        except (OSError, sqlite3.Error):
+            return None
+        if row is None or tuple(row[:3]) != (size, mtime_ns, inode):
+            return None
+        now = time.time()
+        if now - row[4] > TOUCH_INTERVAL:
+            try:
+                self._conn().execute("UPDATE extras SET last_used = ? WHERE path = ? AND kind = ?",
+                                     (now, apath, kind))
+            except sqlite3.Error:
+                pass
+        try:
+            return json.loads(row[3])
+        except ValueError:
+            return None
+
+    def put_extra(self, path: str, kind: str, value):
+        try:
+            apath, size, mtime_ns, inode = file_key(path)
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO extras (path, kind, size, mtime_ns, inode, value, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (apath, kind, size, mtime_ns, inode, json.dumps(value, default=str), time.time()),
+                )
+                self._puts += 1
+                if self._puts % EVICT_EVERY == 1:
+                    self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except (OSError, sqlite3.Error):
+            pass
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drž velikost pod max_entries – vyhazuj nejdéle nepoužité (LRU)."""
+        for table in ("probes", "extras"):
+            (count,) = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+            over = count - self.max_entries
+            if over > 0:
+                conn.execute(
+                    f"DELETE FROM {table} WHERE rowid IN "
+                    f"(SELECT rowid FROM {table} ORDER BY last_used LIMIT ?)",
+                    (over,),
+                )
+
+_cache: ProbeCache | None = None
+
+def get_cache() -> ProbeCache:
+    global _cache
+    if _cache is None:
+        _cache = ProbeCache()
+    return _cache
+
+FAST_KIND = "tracks_fast"   # extras: výsledek zkráceného parse (jen hlavičky) – zvlášť od plného
+
+def _parse(path: str, library_file: str | None, parse_speed: float | None) -> list[dict]:
+    from pymediainfo import MediaInfo
+    kwargs = {"library_file": library_file} if library_file else {}
+    if parse_speed is not None:
+        kwargs["parse_speed"] = parse_speed
+    return [t.to_data() for t in MediaInfo.parse(path, **kwargs).tracks]
+
+def parse_tracks(path: str, library_file: str | None = None, parse_speed: float | None = None,
+                 use_cache: bool = True) -> list[dict]:
+    """Vrátí tracky MediaInfo jako list dictů (track.to_data()) – z cache, nebo čerstvě naparsované.
+    parse_speed (0 = jen hlavičky) zrychlí parse; kodek/délka stačí, některá pole (fps u MKV) chybí.
+    Plný výsledek z cache se použije vždy, zkrácený se ukládá zvlášť a konvertor ho nikdy nedostane.
+    use_cache=False: jednorázové soubory (dočasný .part výstup) – do cache by jen přidaly mrtvé řádky."""
+    if not use_cache:
+        return _parse(path, library_file, parse_speed)
+    cache = get_cache()
+    tracks = cache.get(path)
+    if tracks is not None:
+        return tracks
+    if parse_speed is not None:
+        kind = f"{FAST_KIND}:{parse_speed:g}"
+        tracks = cache.get_extra(path, kind)
+        if tracks is None:
+            tracks = _parse(path, library_file, parse_speed)
+            cache.put_extra(path, kind, tracks)
+        return tracks
+    tracks = _parse(path, library_file, None)
+    cache.put(path, tracks)
+    return tracks
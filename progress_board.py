@@ -0,0 +1,102 @@
+# progress_board.py
+import struct
+from multiprocessing import shared_memory
+
+# Progres všech jobů v jednom sdíleném bloku paměti místo Manager().dict().
+# Každý job má pevný číselný záznam; worker do něj zapisuje bez zámku
+# (jediný zapisovatel na slot, konzistenci čtení hlídá seqlock čítač).
+# Formátování textu dělá až renderer v rodiči.
+
+# seq, job_id, state, percent, fps, speed, out_bytes
+_REC = struct.Struct("<IiB3xfffQ")
+_SEQ = struct.Struct("<I")
+# pid procesu, který job právě zpracovává (pro řízení zátěže) – mimo seqlock, 4B zarovnaný zápis je atomický
+_PID = struct.Struct("<i")
+_PID_OFF = _REC.size
+REC_SIZE = _REC.size + _PID.size
+
+STATE_EMPTY, STATE_QUEUED, STATE_RUNNING, STATE_DONE, STATE_ERROR, STATE_SKIPPED = range(6)
+FINISHED_STATES = (STATE_DONE, STATE_ERROR, STATE_SKIPPED)
+
+class ProgressSlot:
+    """Zapisovací konec jednoho záznamu – picklovatelný, do workeru se posílá jen jméno bloku + index."""
+
+    def __init__(self, shm_name: str, index: int):
+        self.shm_name = shm_name
+        self.index = index
+        self._shm = None
+        self._buf = None
+        self._off = index * REC_SIZE
+
+    def __getstate__(self):
+        return {"shm_name": self.shm_name, "index": self.index}
+
+    def __setstate__(self, state):
+        self.__init__(state["shm_name"], state["index"])
+
+    def _attach(self):
+        self._shm = shared_memory.SharedMemory(name=self.shm_name)
+        self._buf = self._shm.buf
+
+    def update(self, state: int = STATE_RUNNING, percent: float = 0.0, fps: float = 0.0,
+               speed: float = 0.0, out_bytes: int = 0):
+        if self._buf is None:
+            self._attach()
+        # v jednu chvíli zapisuje do slotu jen jeden proces (worker, po něm rodič)
+        seq = (_SEQ.unpack_from(self._buf, self._off)[0] + 1) & 0xFFFFFFFF   # liché = zápis probíhá
+        _SEQ.pack_into(self._buf, self._off, seq)
+        _REC.pack_into(self._buf, self._off, seq, self.index, state, percent, fps, speed, out_bytes)
+        _SEQ.pack_into(self._buf, self._off, (seq + 1) & 0xFFFFFFFF)        # sudé = záznam je konzistentní
+
+    def set_pid(self, pid: int):
+        if self._buf is None:
+            self._attach()
+        _PID.pack_into(self._buf, self._off + _PID_OFF, pid)
+
+    def close(self):
+        if self._shm is not None:
+            self._buf = None
+            self._shm.close()
+            self._shm = None
+
+class ProgressBoard:
+    """Vlastník sdíleného bloku (rodič). Rozdává sloty a čte snapshoty pro renderer."""
+
+    def __init__(self, n_jobs: int):
+        self.n_jobs = max(1, n_jobs)
+        self._shm = shared_memory.SharedMemory(create=True, size=self.n_jobs * REC_SIZE)
+        self._shm.buf[:self.n_jobs * REC_SIZE] = bytes(self.n_jobs * REC_SIZE)
+        self._slots = [ProgressSlot(self._shm.name, i) for i in range(self.n_jobs)]
+
+    def slot(self, index: int) -> ProgressSlot:
+        return self._slots[index]
+
+    def read(self, index: int) -> tuple:
+        """(state, percent, fps, speed, out_bytes) – konzistentní snímek jednoho záznamu."""
+        off = index * REC_SIZE
+        buf = self._shm.buf
+        while True:
+            seq1 = _SEQ.unpack_from(buf, off)[0]
+            rec = _REC.unpack_from(buf, off)
+            if seq1 % 2 == 0 and _SEQ.unpack_from(buf, off)[0] == seq1:
+                return rec[2:]
+
+    def pid(self, index: int) -> int:
+        return _PID.unpack_from(self._shm.buf, index * REC_SIZE + _PID_OFF)[0]
+
+    def snapshot(self) -> list[tuple]:
+        return [self.read(i) for i in range(self.n_jobs)]
+
+    def close(self):
+        for s in self._slots:
+            s.close()
+        try:
+            self._shm.close()
+        finally:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
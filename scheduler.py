@@ -0,0 +1,120 @@
+# scheduler.py
+import os
+from dataclasses import dataclass
+
+# Rozdělení CPU mezi souběžné libx265 joby. Bez toho si každý ffmpeg postaví
+# thread pool přes celý stroj a N jobů × N vláken = přetížení a cache thrashing.
+
+DEFAULT_MIN_THREADS = 4   # užší job už x265 nevytíží rozumně (WPP/frame threads)
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    """Vláknový rozpočet jednoho jobu (a volitelně CPU set, na který se pinuje)."""
+    threads: int
+    cpus: tuple[int, ...] | None = None
+
+    @property
+    def frame_threads(self) -> int:
+        # stejná tabulka, jakou x265 používá pro auto-detekci z počtu jader
+        t = self.threads
+        return 6 if t >= 32 else 5 if t >= 16 else 3 if t >= 8 else 2 if t >= 4 else 1
+
+    def ffmpeg_input_args(self) -> list[str]:
+        return ["-threads", str(self.threads)]
+
+    def x265_params(self) -> str:
+        return f"pools={self.threads}:frame-threads={self.frame_threads}"
+
+    def preexec(self):
+        """preexec_fn pro Popen – pin potomka na self.cpus (jen Linux, jinak None)."""
+        if not self.cpus or not hasattr(os, "sched_setaffinity"):
+            return None
+        cpus = set(self.cpus)
+        return lambda: os.sched_setaffinity(0, cpus)
+
+def available_cpus() -> list[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def plan_slots(n_jobs: int, reserve_cores: int = 2, min_threads: int = DEFAULT_MIN_THREADS,
+               pin: bool = False, cpus: list[int] | None = None) -> list[ThreadBudget]:
+    """Kolik jobů najednou a s kolika vlákny. Málo jobů → pár širokých, hodně jobů → víc užších."""
+    cpus = cpus if cpus is not None else available_cpus()
+    usable = cpus[:max(1, len(cpus) - reserve_cores)]
+    slots = max(1, min(max(1, n_jobs), len(usable) // max(1, min_threads)))
+
+    budgets = []
+    start = 0
+    for i in range(slots):
+        # zbytek po dělení rozdej prvním slotům
+        width = len(usable) // slots + (1 if i < len(usable) % slots else 0)
+        chunk = tuple(usable[start:start + width])
+        start += width
+        budgets.append(ThreadBudget(threads=max(1, len(chunk)), cpus=chunk if pin else None))
+    return budgets
+
+def merge_budgets(budgets: list[ThreadBudget]) -> ThreadBudget:
+    """Spoj volné sloty do jednoho širšího (konec fronty – ať jádra nezahálí)."""
+    cpus = None
+    if all(b.cpus for b in budgets):
+        cpus = tuple(sorted(c for b in budgets for c in b.cpus))
+    return ThreadBudget(threads=sum(b.threads for b in budgets), cpus=cpus)
+
+def take_slots(free: list[ThreadBudget], jobs_left: int, want: int = 1) -> list[ThreadBudget]:
+    """Vyber sloty pro další job: víc volných slotů než zbývajících jobů → dej mu jich víc.
+    `want` = kolik slotů by job rád (segmentovaný enkód), pokud jsou volné."""
+    n = min(len(free), max(1, want, len(free) // max(1, jobs_left)))
+    taken, free[:] = free[:n], free[n:]
+    return taken
+
+# ------------------ Pořadí jobů (makespan) ------------------
+
+DEFAULT_FPS = 25.0
+DEFAULT_PIXELS = 1920 * 1080
+FALLBACK_BYTES_PER_SEC = 625_000   # ~5 Mbit/s – odhad délky, když ji MediaInfo nezná
+REMUX_COST_FACTOR = 1e-6           # remux je jen I/O, proti enkódu zanedbatelný
+
+def estimate_cost(probe, remux: bool = False, size_bytes: int | None = None) -> float:
+    """Odhad práce jobu: délka × počet pixelů × fps (remux jen zlomek délky)."""
+    duration = probe.duration
+    if not duration:
+        if size_bytes is None:
+            try:
+                size_bytes = os.path.getsize(probe.path)
+            except OSError:
+                size_bytes = 0
+        duration = size_bytes / FALLBACK_BYTES_PER_SEC
+    pixels = (probe.width * probe.height) if probe.resolution else DEFAULT_PIXELS
+    fps = probe.fps or DEFAULT_FPS
+    work = duration * pixels * fps
+    return work * REMUX_COST_FACTOR if remux else work
+
+def lpt_order(paths, probes: dict) -> list:
+    """Longest-processing-time-first: nejdražší joby startují první, krátké vyplní mezery na konci."""
+    return sorted(paths, key=lambda p: estimate_cost(probes[p], remux=probes[p].is_hevc), reverse=True)
+
+def split_budget(budget: ThreadBudget | None, parts: int, weights: list[float] | None = None) -> list[ThreadBudget]:
+    """Rozděl rozpočet jobu mezi `parts` podúloh (segmenty jednoho souboru).
+    weights = poměr práce podúloh (výstupy žebříčku podle pixelů); bez nich rovným dílem."""
+    parts = max(1, parts)
+    if budget is None:
+        budget = ThreadBudget(threads=len(available_cpus()))   # bez rozpočtu = celý stroj, nepinujeme
+    if weights:
+        total = sum(weights) or 1.0
+        counts = [max(1, int(budget.threads * w / total)) for w in weights]
+        for i in sorted(range(parts), key=lambda i: -weights[i])[:max(0, budget.threads - sum(counts))]:
+            counts[i] += 1   # zbytek po zaokrouhlení dostanou nejdražší
+        cpus, out, start = list(budget.cpus or []), [], 0
+        for n in counts:
+            chunk = tuple(cpus[start:start + n]) if cpus else None
+            start += n
+            out.append(ThreadBudget(threads=n, cpus=chunk or None))
+        return out
+    out = []
+    cpus = list(budget.cpus or [])
+    for i in range(parts):
+        threads = max(1, budget.threads // parts + (1 if i < budget.threads % parts else 0))
+        chunk = tuple(cpus[i::parts]) if cpus else None
+        out.append(ThreadBudget(threads=threads, cpus=chunk or None))
+    return out
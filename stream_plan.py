@@ -0,0 +1,152 @@
+# stream_plan.py
+import os
+from dataclasses import dataclass
+from media_probe import MediaProbe, StreamInfo
+
+# Plán po streamech místo "všechno copy / všechno překódovat":
+# HEVC video se jen kopíruje, AAC/Opus audio v rozumném bitrate taky, zbytek se překóduje.
+# Titulky a datové streamy se mapují nebo zahazují podle toho, co unese cílový kontejner.
+
+COPY_AUDIO_FORMATS = {"AAC", "Opus"}
+MAX_COPY_AUDIO_KBPS_PER_CH = 128   # dražší audio (např. 640k AAC 5.1 je ještě OK) se překóduje
+
+# co cílový kontejner unese bez překódování (remux zachovává kontejner → překóduje se jen nutné)
+MP4_AUDIO_FORMATS = {"AAC", "Opus", "AC-3", "E-AC-3", "MPEG Audio", "ALAC", "FLAC"}
+TEXT_SUB_FORMATS = {"UTF-8", "ASS", "SSA", "Timed Text", "WebVTT", "Text"}
+MP4_CONTAINERS = {".mp4", ".m4v", ".mov"}
+
+COPY, ENCODE, DROP = "copy", "encode", "drop"
+
+@dataclass(frozen=True)
+class StreamAction:
+    stream: StreamInfo
+    action: str                 # copy / encode / drop
+    reason: str = ""
+    codec: str | None = None    # cílový kodek u ENCODE (libx265, aac, mov_text)
+
+@dataclass(frozen=True)
+class StreamPlan:
+    path: str
+    container: str              # přípona výstupu (.mp4, .mkv, …)
+    actions: tuple[StreamAction, ...]
+
+    @property
+    def video_copy(self) -> bool:
+        return any(a.stream.kind == "v" and a.action == COPY for a in self.actions)
+
+    @property
+    def needs_encode(self) -> bool:
+        return any(a.action == ENCODE for a in self.actions)
+
+    def ffmpeg_args(self, video_args: list[str], audio_args: list[str], kinds: str = "vas",
+                    input_index: int = 0) -> list[str]:
+        """-map a per-stream -c:* pro jeden výstup. video_args/audio_args = volby enkodéru
+        (-c:v libx265 -preset …) – přepíšou se na konkrétní výstupní stream."""
+        args, out_idx = [], {}
+        for a in self.actions:
+            kind = a.stream.kind
+            if a.action == DROP or kind not in kinds:
+                continue
+            o = out_idx.get(kind, 0)
+            out_idx[kind] = o + 1
+            args += ["-map", f"{input_index}:{kind}:{a.stream.index}"]
+            if a.action == COPY:
+                args += [f"-c:{kind}:{o}", "copy"]
+                if kind == "v" and self.container in MP4_CONTAINERS and _is_hevc_stream(a.stream):
+                    args += [f"-tag:v:{o}", "hvc1"]   # hvc1 = přehrají i Apple zařízení
+            elif kind == "v":
+                args += _per_stream(video_args, kind, o)
+            elif kind == "a":
+                args += _per_stream(audio_args, kind, o)
+            else:
+                args += [f"-c:{kind}:{o}", a.codec]
+        if self.container == ".mkv" and "s" in kinds:
+            args += ["-map", f"{input_index}:t?", "-c:t", "copy"]   # přílohy (fonty k ASS titulkům)
+        return args
+
+    def settings(self) -> list:
+        """Otisk plánu pro hash nastavení v žurnálu."""
+        return [f"{a.stream.kind}{a.stream.index}:{a.action}:{a.codec or ''}" for a in self.actions]
+
+    def describe(self) -> list[str]:
+        """Řádky pro dry-run report."""
+        lines = []
+        for a in self.actions:
+            s = a.stream
+            info = s.format or "?"
+            if s.bit_rate:
+                info += f" {s.bit_rate // 1000}k"
+            if s.channels:
+                info += f" {s.channels}ch"
+            if s.language:
+                info += f" [{s.language}]"
+            target = f" → {a.codec}" if a.action == ENCODE else ""
+            lines.append(f"{s.kind}:{s.index} {info:<22} {a.action}{target}{'  (' + a.reason + ')' if a.reason else ''}")
+        return lines
+
+def _per_stream(opts: list[str], kind: str, o: int) -> list[str]:
+    """-c:v libx265 -crf 28 → -c:v:0 libx265 -crf:v:0 28 (platí jen pro výstupní stream o)."""
+    out = []
+    for x in opts:
+        if x.startswith("-") and len(x) > 1 and not x[1].isdigit():
+            x = f"{x}:{o}" if ":" in x else f"{x}:{kind}:{o}"
+        out.append(x)
+    return out
+
+def _is_hevc_stream(s: StreamInfo) -> bool:
+    fmt, cid = (s.format or "").lower(), (s.codec_id or "").lower()
+    return "hevc" in fmt or "h265" in fmt or "hvc1" in cid or "hev1" in cid or "hevc" in cid
+
+def _audio_ok_to_copy(s: StreamInfo) -> bool:
+    if s.format not in COPY_AUDIO_FORMATS:
+        return False
+    if not s.bit_rate:
+        return True   # VBR / neznámý bitrate (typicky Opus v MKV) – věříme zdroji
+    return s.bit_rate <= MAX_COPY_AUDIO_KBPS_PER_CH * 1000 * max(1, s.channels or 2)
+
+def _streams_of(probe: MediaProbe) -> tuple[StreamInfo, ...]:
+    """Stopy z probe; když MediaInfo selhal (raw HEVC), aspoň odhad ze souhrnných polí."""
+    if probe.streams:
+        return probe.streams
+    out = []
+    if probe.has_video or probe.is_raw_hevc:
+        out.append(StreamInfo("v", 0, "HEVC" if probe.is_raw_hevc else probe.codec, probe.codec_id))
+    if probe.has_audio:
+        out.append(StreamInfo("a", 0, probe.audio_codec, channels=probe.audio_channels))
+    return tuple(out)
+
+def plan_streams(probe: MediaProbe, output_path: str, remux: bool = False,
+                 audio_codec: str = "aac") -> StreamPlan:
+    """Rozhodni copy/encode/drop pro každý stream.
+    remux=True: zachovává se kontejner, překóduje se jen to, co do něj nejde."""
+    container = os.path.splitext(output_path)[1].lower()
+    mp4 = container in MP4_CONTAINERS
+    actions, video_seen = [], False
+    for s in _streams_of(probe):
+        if s.kind == "v":
+            if video_seen:
+                actions.append(StreamAction(s, DROP, "extra video stream"))
+            elif _is_hevc_stream(s) or (remux and probe.is_hevc):
+                actions.append(StreamAction(s, COPY, "already HEVC"))
+            else:
+                actions.append(StreamAction(s, ENCODE, "", "libx265"))
+            video_seen = True
+        elif s.kind == "a":
+            if _audio_ok_to_copy(s):
+                actions.append(StreamAction(s, COPY, "AAC/Opus in budget"))
+            elif remux and (not mp4 or s.format in MP4_AUDIO_FORMATS):
+                actions.append(StreamAction(s, COPY, "container accepts it"))
+            else:
+                actions.append(StreamAction(s, ENCODE, "incompatible or too big", audio_codec))
+        elif s.kind == "s":
+            if not mp4:
+                actions.append(StreamAction(s, COPY))
+            elif s.format == "Timed Text":
+                actions.append(StreamAction(s, COPY))
+            elif s.format in TEXT_SUB_FORMATS:
+                actions.append(StreamAction(s, ENCODE, "text subtitles", "mov_text"))
+            else:
+                actions.append(StreamAction(s, DROP, "bitmap subtitles not supported in MP4"))
+        else:
+            actions.append(StreamAction(s, DROP, "data stream"))
+    return StreamPlan(path=probe.path, container=container, actions=tuple(actions))
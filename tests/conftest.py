@@ -0,0 +1,4 @@
+import os, sys
+
+# moduly projektu leží v kořeni repozitáře (bez balíčku)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
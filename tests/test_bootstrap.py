@@ -0,0 +1,89 @@
+import io, os, hashlib, threading, zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from bootstrap import ToolSpec, fetch, ensure_tool, _download, _Progress
+
+def _zip(payload: bytes) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("tool/bin/tool.exe", payload)
+    return buf.getvalue()
+
+@pytest.fixture
+def server():
+    """Lokální HTTP server s podporou Range; files = {cesta: bajty}, ranges = přijaté Range hlavičky."""
+    files, ranges = {}, []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            data = files.get(self.path)
+            if data is None:
+                self.send_error(404)
+                return
+            rng = self.headers.get("Range")
+            ranges.append(rng)
+            start = int(rng.split("=")[1].rstrip("-")) if rng else 0
+            if start >= len(data) and rng:
+                self.send_error(416)
+                return
+            self.send_response(206 if rng else 200)
+            self.send_header("Content-Length", str(len(data) - start))
+            self.end_headers()
+            self.wfile.write(data[start:])
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    t = threading.Thread(target=httpd.serve_forever, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", files, ranges
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_fetch_resumes_with_range(server, tmp_path):
+    base, files, ranges = server
+    data = os.urandom(300_000)
+    files["/a.zip"] = data
+    part = tmp_path / "a.zip.part"
+    part.write_bytes(data[:100_000])
+    fetch(base + "/a.zip", str(part))
+    assert ranges == ["bytes=100000-"]
+    assert part.read_bytes() == data
+
+def test_corrupt_partial_is_downloaded_again(server, tmp_path):
+    base, files, ranges = server
+    data = _zip(b"tool")
+    files["/a.zip"] = data
+    zip_path = str(tmp_path / "a.zip")
+    with open(zip_path + ".part", "wb") as f:
+        f.write(b"x" * 10)   # navázání na smetí → hash nesedí → znovu od nuly
+    _download(base + "/a.zip", zip_path, hashlib.sha256(data).hexdigest(), _Progress(), "a")
+    assert ranges == ["bytes=10-", None]
+    with open(zip_path, "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(zip_path + ".part")
+
+def test_hash_mismatch_is_rejected(server, tmp_path):
+    base, files, _ = server
+    files["/a.zip"] = _zip(b"tool")
+    zip_path = str(tmp_path / "a.zip")
+    with pytest.raises(ValueError):
+        _download(base + "/a.zip", zip_path, "0" * 64, _Progress(), "a")
+    assert not os.path.exists(zip_path)
+    assert not os.path.exists(zip_path + ".part")
+
+def test_mirror_cannot_vouch_for_itself(server, tmp_path):
+    base, files, _ = server
+    good, bad = _zip(b"genuine"), _zip(b"tampered")
+    files["/tool.zip"] = good
+    files["/tool.zip.sha256"] = hashlib.sha256(good).hexdigest().encode()
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    (mirror / "tool.zip").write_bytes(bad)
+    (mirror / "tool.zip.sha256").write_text(hashlib.sha256(bad).hexdigest())
+    dest = tmp_path / "tool.exe"
+    spec = ToolSpec("tool.exe", base + "/tool.zip", "bin/tool.exe", str(dest),
+                    sha256_url=base + "/tool.zip.sha256")
+    ensure_tool(spec, str(tmp_path / "cache"), str(mirror))
+    assert dest.read_bytes() == b"genuine"
@@ -0,0 +1,71 @@
+import pytest
+from ffmpeg_progress import ProgressParser, ProgressRecord, with_progress
+
+def _feed(text: str) -> list[ProgressRecord]:
+    parser = ProgressParser()
+    return [r for line in text.strip().splitlines() if (r := parser.feed(line)) is not None]
+
+BLOCK = """
+frame=240
+fps=59.94
+stream_0_0_q=28.0
+bitrate= 812.3kbits/s
+total_size=1015808
+out_time_us=10010000
+out_time_ms=10010000
+out_time=00:00:10.010000
+dup_frames=0
+drop_frames=0
+speed=2.5x
+progress=continue
+"""
+
+def test_full_block():
+    (rec,) = _feed(BLOCK)
+    assert rec == ProgressRecord(out_time_us=10_010_000, frame=240, fps=59.94, speed=2.5,
+                                 bitrate_kbps=812.3, total_size=1_015_808, end=False)
+    assert rec.out_time == pytest.approx(10.01)
+
+@pytest.mark.parametrize("lines, field, expected", [
+    (["out_time_us=1500000"], "out_time_us", 1_500_000),
+    (["out_time_ms=1500000"], "out_time_us", 1_500_000),    # historicky taky µs
+    (["out_time_us=-23220"], "out_time_us", 0),             # záporný čas na začátku streamu
+    (["frame=12"], "frame", 12),
+    (["frame=abc"], "frame", 0),
+    (["fps=0.00"], "fps", 0.0),
+    (["speed= 1.03x"], "speed", 1.03),
+    (["bitrate=N/A"], "bitrate_kbps", 0.0),
+    (["total_size=N/A"], "total_size", 0),
+    (["garbage line without separator"], "frame", 0),
+])
+def test_single_key(lines, field, expected):
+    (rec,) = _feed("\n".join(lines + ["progress=continue"]))
+    assert getattr(rec, field) == expected
+
+@pytest.mark.parametrize("key, first, later", [
+    ("out_time_us", "5000000", "N/A"),
+    ("speed", "1.5x", "N/A"),
+    ("bitrate", "900.0kbits/s", "N/A"),
+])
+def test_na_keeps_last_known_value(key, first, later):
+    recs = _feed(f"{key}={first}\nprogress=continue\n{key}={later}\nprogress=continue")
+    assert len(recs) == 2
+    assert recs[0] == recs[1]
+
+def test_values_carry_over_between_blocks():
+    recs = _feed("frame=10\nfps=25\nprogress=continue\nframe=20\nprogress=continue")
+    assert [(r.frame, r.fps) for r in recs] == [(10, 25.0), (20, 25.0)]
+
+def test_progress_end():
+    recs = _feed("frame=10\nprogress=continue\nframe=11\nprogress=end")
+    assert [r.end for r in recs] == [False, True]
+    assert recs[-1].frame == 11
+
+def test_end_flag_does_not_leak_into_next_block():
+    parser = ProgressParser()
+    parser.feed("progress=end")
+    assert parser.feed("progress=continue").end is False
+
+def test_with_progress_inserts_global_options():
+    assert with_progress(["ffmpeg", "-i", "a.mp4", "b.mkv"]) == \
+        ["ffmpeg", "-progress", "pipe:1", "-nostats", "-i", "a.mp4", "b.mkv"]
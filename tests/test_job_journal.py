@@ -0,0 +1,136 @@
+import os
+from pathlib import Path
+import pytest
+import probe_cache
+import preset_tuner
+import AnyToH265Converter
+from BatchConverter import BatchConverter
+from job_journal import JobJournal, part_path, finalize_output, settings_hash, is_verify_error, VERIFY_PREFIX
+from media_probe import MediaProbe, StreamInfo
+from preset_tuner import SampleResult
+
+@pytest.fixture
+def journal(tmp_path):
+    return JobJournal(str(tmp_path / "journal.sqlite"))
+
+def _file(path, data=b"x" * 100):
+    path.write_bytes(data)
+    return str(path)
+
+def test_is_done_needs_same_input_settings_and_output(tmp_path, journal):
+    src, out = _file(tmp_path / "a.avi"), _file(tmp_path / "a.mp4")
+    s = settings_hash({"crf": 28})
+    journal.mark_done(src, s, out)
+    assert journal.is_done(src, s)
+    assert not journal.is_done(src, settings_hash({"crf": 30}))    # jiné nastavení = jiný job
+    assert not journal.is_done(_file(tmp_path / "b.avi"), s)
+
+def test_is_done_false_when_input_changes(tmp_path, journal):
+    src, out = _file(tmp_path / "a.avi"), _file(tmp_path / "a.mp4")
+    journal.mark_done(src, "s", out)
+    os.utime(src, ns=(0, 0))
+    assert not journal.is_done(src, "s")
+
+def test_is_done_false_when_output_gone_or_changed(tmp_path, journal):
+    src, out = _file(tmp_path / "a.avi"), _file(tmp_path / "a.mp4")
+    journal.mark_done(src, "s", out)
+    _file(tmp_path / "a.mp4", b"y" * 10)
+    assert not journal.is_done(src, "s")
+    os.remove(out)
+    assert not journal.is_done(src, "s")
+
+def test_settings_hash_is_order_independent():
+    assert settings_hash({"a": 1, "b": [1, 2]}) == settings_hash({"b": [1, 2], "a": 1})
+    assert settings_hash({"a": 1}) != settings_hash({"a": 2})
+
+def test_part_path():
+    assert part_path("/o/x.mp4") == "/o/x.part.mp4"
+    assert part_path("/o/x.mp4", "node1") == "/o/x.part-node1.mp4"
+
+def test_finalize_commits_verified_output(tmp_path):
+    out = str(tmp_path / "x.mp4")
+    tmp = _file(tmp_path / "x.part.mp4")
+    assert finalize_output(tmp, out, None, verify=lambda p: None) is None
+    assert not os.path.exists(tmp)
+    with open(out, "rb") as f:
+        assert f.read() == b"x" * 100
+
+@pytest.mark.parametrize("data, verify, message", [
+    (b"", None, "output is empty"),
+    (b"x", lambda p: "2 audio streams in output, expected 1", "2 audio streams in output, expected 1"),
+])
+def test_finalize_discards_bad_output(tmp_path, data, verify, message):
+    out = _file(tmp_path / "x.mp4", b"old")     # dřívější výstup se nesmí přepsat
+    tmp = _file(tmp_path / "x.part.mp4", data)
+    err = finalize_output(tmp, out, None, verify=verify)
+    assert err == VERIFY_PREFIX + message and is_verify_error(err)
+    assert not os.path.exists(tmp)
+    with open(out, "rb") as f:
+        assert f.read() == b"old"
+
+def test_finalize_missing_output(tmp_path):
+    err = finalize_output(str(tmp_path / "x.part.mp4"), str(tmp_path / "x.mp4"), None)
+    assert err == VERIFY_PREFIX + "output is missing"
+    assert not os.path.exists(tmp_path / "x.mp4")
+
+# --- žurnál × ladění presetu/CRF (user-012) ---
+
+FPS = {"veryfast": 400.0, "fast": 240.0, "medium": 160.0, "slow": 80.0, "slower": 40.0}
+
+@pytest.fixture
+def tuned_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(probe_cache, "_cache", probe_cache.ProbeCache(str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(AnyToH265Converter, "_base_dir", lambda: str(tmp_path))
+    sampled = []
+
+    def measure(ffmpeg, probe, preset, crf, thread_budget=None, **kw):
+        sampled.append(os.path.basename(probe.path))
+        return SampleResult(fps=FPS[preset], kbps=2000.0)
+    monkeypatch.setattr(preset_tuner, "measure", measure)
+
+    def make(names):
+        bc = BatchConverter(input_dir=str(tmp_path), resume=False, store=False, metrics=False,
+                            time_budget=60.0, reserve_cores=0)
+        bc.journal = JobJournal(str(tmp_path / "journal.sqlite"))
+        bc._output_path_for = lambda path, probe: os.path.splitext(path)[0] + ".out.mp4"
+        probes = {}
+        for name, seconds in names.items():
+            path = _file(tmp_path / name)
+            probes[path] = MediaProbe(path=path, has_video=True, codec="AVC", duration=seconds, fps=25.0,
+                                      width=1280, height=720, streams=(StreamInfo("v", 0, "AVC"),))
+        return bc, probes
+    return make, sampled
+
+def test_rerun_keeps_done_files_and_earlier_picks(tuned_batch):
+    make, sampled = tuned_batch
+    bc, probes = make({"a.avi": 120.0, "b.avi": 120.0})
+    a, b = sorted(probes)
+    assert bc._resume(list(probes), probes) == set()
+    first = dict(bc.tuned)
+    assert set(sampled) == {"a.avi", "b.avi"}
+    # a doběhl, b ne
+    out = bc._output_path_for(a, probes[a])
+    _file(Path(out))
+    bc.journal.mark_done(a, bc._settings_for(probes[a]), out)
+
+    # další běh s novým dlouhým souborem – dřív se přeplánovala celá dávka a a.avi se enkódoval znovu
+    sampled.clear()
+    bc, more = make({"c.avi": 3600.0})
+    probes.update(more)
+    done = bc._resume(list(probes), probes)
+    assert done == {a}
+    assert sampled and set(sampled) == {"c.avi"}         # vzorkuje se jen nový soubor
+    assert bc.tuned[a] == first[a] and bc.tuned[b] == first[b]
+    assert bc.journal.is_done(a, bc._settings_for(probes[a]))
+
+def test_changed_budget_replans(tuned_batch):
+    make, sampled = tuned_batch
+    bc, probes = make({"a.avi": 120.0})
+    bc._resume(list(probes), probes)
+    sampled.clear()
+    bc.tuned = {}
+    bc._resume(list(probes), probes)
+    assert not sampled                                  # stejné zadání → uložená volba
+    bc.tuned, bc.time_budget = {}, 5.0
+    bc._resume(list(probes), probes)
+    assert sampled                                      # jiné zadání → stará volba neplatí
@@ -0,0 +1,96 @@
+import pytest
+import scheduler
+from scheduler import ThreadBudget, plan_slots, split_budget, merge_budgets, take_slots
+
+def _threads(budgets):
+    return [b.threads for b in budgets]
+
+@pytest.mark.parametrize("n_cpus, n_jobs, reserve, min_threads, expected", [
+    (1, 1, 2, 4, [1]),                  # 1 CPU: rezerva ani minimum se nedají splnit → jeden úzký slot
+    (1, 8, 2, 4, [1]),
+    (1, 8, 0, 1, [1]),
+    (2, 4, 2, 1, [1]),                  # rezerva by sebrala všechno – aspoň jedno jádro zůstane
+    (16, 1, 2, 4, [14]),                # málo jobů → jeden široký
+    (16, 2, 2, 4, [7, 7]),
+    (16, 10, 2, 4, [5, 5, 4]),          # hodně jobů → nejvýš usable // min_threads slotů, zbytek prvním
+    (16, 10, 0, 4, [4, 4, 4, 4]),
+    (16, 10, 2, 1, [2, 2, 2, 2, 1, 1, 1, 1, 1, 1]),
+    (16, 0, 2, 4, [14]),                # prázdná dávka → pořád jeden slot
+    (8, 3, 2, 4, [6]),
+])
+def test_plan_slots(n_cpus, n_jobs, reserve, min_threads, expected):
+    slots = plan_slots(n_jobs, reserve_cores=reserve, min_threads=min_threads, cpus=list(range(n_cpus)))
+    assert _threads(slots) == expected
+    assert all(b.cpus is None for b in slots)
+
+def test_plan_slots_pins_disjoint_contiguous_sets():
+    slots = plan_slots(10, reserve_cores=2, min_threads=4, pin=True, cpus=list(range(16)))
+    assert [b.cpus for b in slots] == [(0, 1, 2, 3, 4), (5, 6, 7, 8, 9), (10, 11, 12, 13)]
+    assert all(b.threads == len(b.cpus) for b in slots)
+
+def test_plan_slots_pin_on_one_cpu():
+    (slot,) = plan_slots(4, reserve_cores=2, pin=True, cpus=[3])
+    assert slot == ThreadBudget(threads=1, cpus=(3,))
+
+def test_plan_slots_respects_affinity_mask():
+    slots = plan_slots(2, reserve_cores=1, min_threads=2, pin=True, cpus=[2, 3, 6, 7, 9])
+    assert [b.cpus for b in slots] == [(2, 3), (6, 7)]
+
+@pytest.mark.parametrize("threads, parts, expected", [
+    (14, 3, [5, 5, 4]),
+    (8, 2, [4, 4]),
+    (1, 1, [1]),
+    (1, 4, [1, 1, 1, 1]),               # 1 CPU: každá podúloha aspoň jedno vlákno
+    (3, 0, [3]),
+])
+def test_split_budget_even(threads, parts, expected):
+    assert _threads(split_budget(ThreadBudget(threads), parts)) == expected
+
+def test_split_budget_pinned_interleaves_cpus():
+    parts = split_budget(ThreadBudget(6, cpus=tuple(range(6))), 3)
+    assert [p.cpus for p in parts] == [(0, 3), (1, 4), (2, 5)]
+
+def test_split_budget_pinned_more_parts_than_cpus():
+    parts = split_budget(ThreadBudget(1, cpus=(0,)), 2)
+    assert [(p.threads, p.cpus) for p in parts] == [(1, (0,)), (1, None)]
+
+@pytest.mark.parametrize("threads, weights, expected", [
+    (8, [4.0, 1.0], [7, 1]),            # zbytek po zaokrouhlení dostane nejdražší
+    (12, [1.0, 1.0, 1.0], [4, 4, 4]),
+    (10, [9.0, 4.0, 1.0], [7, 2, 1]),
+    (1, [4.0, 1.0], [1, 1]),            # 1 CPU: minimum 1 vlákno na výstup
+])
+def test_split_budget_weighted(threads, weights, expected):
+    assert _threads(split_budget(ThreadBudget(threads), len(weights), weights)) == expected
+
+def test_split_budget_weighted_pins_consecutive_chunks():
+    parts = split_budget(ThreadBudget(8, cpus=tuple(range(8))), 2, [4.0, 1.0])
+    assert [p.cpus for p in parts] == [(0, 1, 2, 3, 4, 5, 6), (7,)]
+
+def test_split_budget_without_budget_uses_whole_machine(monkeypatch):
+    monkeypatch.setattr(scheduler, "available_cpus", lambda: [0])
+    assert split_budget(None, 2) == [ThreadBudget(1), ThreadBudget(1)]
+    monkeypatch.setattr(scheduler, "available_cpus", lambda: list(range(8)))
+    assert split_budget(None, 3) == [ThreadBudget(3), ThreadBudget(3), ThreadBudget(2)]
+
+def test_merge_and_take_slots():
+    free = plan_slots(10, reserve_cores=0, min_threads=4, pin=True, cpus=list(range(16)))
+    taken = take_slots(free, jobs_left=1)          # poslední job dostane všechny volné sloty
+    assert len(taken) == 4 and free == []
+    assert merge_budgets(taken) == ThreadBudget(16, cpus=tuple(range(16)))
+    free = plan_slots(10, reserve_cores=0, min_threads=4, cpus=list(range(16)))
+    assert len(take_slots(free, jobs_left=10)) == 1
+    assert len(take_slots(free, jobs_left=10, want=2)) == 2
+    assert merge_budgets([ThreadBudget(2, cpus=(0, 1)), ThreadBudget(2)]).cpus is None
+
+@pytest.mark.parametrize("threads, frame_threads", [(1, 1), (4, 2), (8, 3), (16, 5), (32, 6)])
+def test_frame_threads(threads, frame_threads):
+    b = ThreadBudget(threads)
+    assert b.frame_threads == frame_threads
+    assert b.x265_params() == f"pools={threads}:frame-threads={frame_threads}"
+
+def test_plan_slots_on_this_host():
+    # výchozí cpus = affinity mask procesu; na jakémkoliv stroji aspoň jeden slot, nikdy víc vláken než CPU
+    slots = plan_slots(8)
+    assert slots and all(b.threads >= 1 for b in slots)
+    assert sum(b.threads for b in slots) <= max(1, len(scheduler.available_cpus()))
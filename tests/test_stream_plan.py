@@ -0,0 +1,102 @@
+import pytest
+from media_probe import MediaProbe, StreamInfo
+from stream_plan import plan_streams, COPY, ENCODE, DROP
+
+X265 = ["-c:v", "libx265", "-crf", "28"]
+AAC = ["-c:a", "aac", "-b:a", "128k"]
+
+def _probe(path, *streams, codec="AVC"):
+    return MediaProbe(path=path, has_video=any(s.kind == "v" for s in streams), codec=codec,
+                      has_audio=any(s.kind == "a" for s in streams), streams=tuple(streams))
+
+def _actions(plan):
+    return [(a.stream.kind, a.stream.index, a.action, a.codec) for a in plan.actions]
+
+@pytest.mark.parametrize("stream, remux, out, action, codec", [
+    # video: HEVC se kopíruje, cokoliv jiného → libx265
+    (StreamInfo("v", 0, "HEVC", "hvc1"), False, "o.mp4", COPY, None),
+    (StreamInfo("v", 0, "AVC", "avc1"), False, "o.mp4", ENCODE, "libx265"),
+    # audio: AAC/Opus v rozpočtu copy, drahé nebo jiné → aac
+    (StreamInfo("a", 0, "AAC", bit_rate=192_000, channels=2), False, "o.mp4", COPY, None),
+    (StreamInfo("a", 0, "Opus"), False, "o.mkv", COPY, None),                       # bez bitrate = VBR
+    (StreamInfo("a", 0, "AAC", bit_rate=640_000, channels=2), False, "o.mp4", ENCODE, "aac"),
+    (StreamInfo("a", 0, "AAC", bit_rate=640_000, channels=6), False, "o.mp4", COPY, None),
+    (StreamInfo("a", 0, "DTS", bit_rate=1_500_000, channels=6), False, "o.mp4", ENCODE, "aac"),
+    # remux zachovává kontejner: překóduje se jen to, co do něj nejde
+    (StreamInfo("a", 0, "AC-3", bit_rate=640_000, channels=6), True, "o.mp4", COPY, None),
+    (StreamInfo("a", 0, "DTS", bit_rate=1_500_000, channels=6), True, "o.mkv", COPY, None),
+    (StreamInfo("a", 0, "DTS", bit_rate=1_500_000, channels=6), True, "o.mp4", ENCODE, "aac"),
+    # titulky: MKV vezme cokoliv, MP4 jen text (mov_text), bitmapové se zahodí
+    (StreamInfo("s", 0, "PGS"), False, "o.mkv", COPY, None),
+    (StreamInfo("s", 0, "UTF-8"), False, "o.mp4", ENCODE, "mov_text"),
+    (StreamInfo("s", 0, "Timed Text"), False, "o.mp4", COPY, None),
+    (StreamInfo("s", 0, "PGS"), False, "o.mp4", DROP, None),
+    (StreamInfo("d", 0, "GoPro Telemetry"), False, "o.mp4", DROP, None),
+])
+def test_stream_decision(stream, remux, out, action, codec):
+    video = [] if stream.kind == "v" else [StreamInfo("v", 0, "AVC")]
+    plan = plan_streams(_probe("in.mkv", *video, stream), out, remux=remux)
+    a = plan.actions[-1]
+    assert (a.action, a.codec) == (action, codec)
+
+def test_remux_copies_hevc_video_even_without_stream_format():
+    probe = MediaProbe(path="in.hevc")      # MediaInfo selhal – raw HEVC bez stop
+    plan = plan_streams(probe, "o.mkv", remux=True)
+    assert _actions(plan) == [("v", 0, COPY, None)]
+    assert not plan.needs_encode and plan.video_copy
+
+def test_extra_video_streams_dropped():
+    plan = plan_streams(_probe("in.mkv", StreamInfo("v", 0, "AVC"), StreamInfo("v", 1, "MJPEG")), "o.mp4")
+    assert [a.action for a in plan.actions] == [ENCODE, DROP]
+
+def test_ffmpeg_args_map_per_type_indices():
+    plan = plan_streams(_probe(
+        "in.mkv",
+        StreamInfo("v", 0, "AVC"),
+        StreamInfo("a", 0, "DTS", bit_rate=1_500_000, channels=6),   # encode → výstup a:0
+        StreamInfo("a", 1, "AAC", bit_rate=128_000, channels=2),     # copy → výstup a:1
+        StreamInfo("s", 0, "PGS"),                                   # MP4: drop
+        StreamInfo("s", 1, "UTF-8"),                                 # → výstup s:0
+    ), "o.mp4")
+    assert plan.ffmpeg_args(X265, AAC, kinds="va") + ["|"] + plan.ffmpeg_args(X265, AAC, kinds="s") == [
+        "-map", "0:v:0", "-c:v:0", "libx265", "-crf:v:0", "28",
+        "-map", "0:a:0", "-c:a:0", "aac", "-b:a:0", "128k",
+        "-map", "0:a:1", "-c:a:1", "copy",
+        "|",
+        "-map", "0:s:1", "-c:s:0", "mov_text",
+    ]
+
+def test_ffmpeg_args_hevc_copy_to_mp4_gets_hvc1_tag():
+    plan = plan_streams(_probe("in.mkv", StreamInfo("v", 0, "HEVC", "V_MPEGH/ISO/HEVC"), codec="HEVC"),
+                        "o.mp4", remux=True)
+    assert plan.ffmpeg_args(X265, AAC, input_index=1) == ["-map", "1:v:0", "-c:v:0", "copy", "-tag:v:0", "hvc1"]
+
+def test_mkv_keeps_attachments_with_subtitles():
+    plan = plan_streams(_probe("in.mkv", StreamInfo("v", 0, "HEVC"), StreamInfo("s", 0, "ASS")),
+                        "o.mkv", remux=True)
+    args = plan.ffmpeg_args(X265, AAC)
+    assert args[-4:] == ["-map", "0:t?", "-c:t", "copy"]
+    assert "0:t?" not in plan.ffmpeg_args(X265, AAC, kinds="va")   # přílohy jdou se stopou titulků
+
+def test_mp4_has_no_attachment_map():
+    plan = plan_streams(_probe("in.mkv", StreamInfo("v", 0, "AVC"), StreamInfo("s", 0, "UTF-8")), "o.mp4")
+    assert "0:t?" not in plan.ffmpeg_args(X265, AAC)
+
+def test_dry_run_report_lines():
+    plan = plan_streams(_probe(
+        "in.mkv",
+        StreamInfo("v", 0, "AVC"),
+        StreamInfo("a", 0, "AC-3", bit_rate=640_000, channels=6, language="cs"),
+        StreamInfo("s", 0, "PGS"),
+    ), "o.mp4")
+    lines = plan.describe()
+    assert len(lines) == 3
+    assert lines[0].startswith("v:0 AVC") and lines[0].rstrip().endswith("encode → libx265")
+    assert lines[1].startswith("a:0 AC-3 640k 6ch [cs]")
+    assert "encode → aac  (incompatible or too big)" in lines[1]
+    assert lines[2].endswith("drop  (bitmap subtitles not supported in MP4)")
+
+def test_settings_fingerprint_changes_with_plan():
+    a = plan_streams(_probe("in.mkv", StreamInfo("v", 0, "AVC"), StreamInfo("s", 0, "PGS")), "o.mkv")
+    b = plan_streams(_probe("in.mkv", StreamInfo("v", 0, "AVC"), StreamInfo("s", 0, "PGS")), "o.mp4")
+    assert a.settings() != b.settings()
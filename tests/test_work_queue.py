@@ -0,0 +1,63 @@
+import os, time
+import pytest
+from work_queue import WorkQueue, DONE, FREE, LEASED
+
+@pytest.fixture
+def nodes(tmp_path):
+    # heartbeat se v testu nespustí – stáří lease se nastavuje ručně
+    a = WorkQueue(str(tmp_path), node="a", ttl=5.0, heartbeat=3600.0)
+    b = WorkQueue(str(tmp_path), node="b", ttl=5.0, heartbeat=3600.0)
+    yield a, b
+    a.close()
+    b.close()
+
+def _expire(q: WorkQueue, key: str):
+    old = time.time() - 10 * q.ttl
+    os.utime(os.path.join(q.queue_dir, "leases", key + ".lease"), (old, old))
+
+def test_claim_is_exclusive(nodes):
+    a, b = nodes
+    assert a.claim("k1")
+    assert not b.claim("k1")
+    assert b.state("k1") == LEASED
+    assert a.claim("k1")            # vlastní lease (opakování jobu)
+    a.finish("k1", True)
+    assert b.state("k1") == DONE
+    assert not b.claim("k1")
+
+def test_release_frees_job(nodes):
+    a, b = nodes
+    assert a.claim("k1")
+    a.release("k1")
+    assert b.state("k1") == FREE
+    assert b.claim("k1")
+
+def test_reclaim_after_ttl(nodes):
+    a, b = nodes
+    assert a.claim("k1")
+    assert not b.claim("k1")        # lease je čerstvý
+    _expire(a, "k1")
+    assert b.claim("k1")            # uzel a je "mrtvý" → převzetí
+    assert b.holds("k1")
+    assert not a.holds("k1")
+
+def test_stale_holder_after_takeover(nodes):
+    a, b = nodes
+    assert a.claim("k1")
+    _expire(a, "k1")
+    assert b.claim("k1")
+    b.finish("k1", True)
+    assert not a.claim("k1")        # a pořád "drží" k1, ale hotovo je jinde
+    assert not a.holds("k1")
+
+def test_stale_holder_cannot_touch_new_lease(nodes):
+    a, b = nodes
+    assert a.claim("k1")
+    assert a.claim("k2")
+    _expire(a, "k1")
+    _expire(a, "k2")
+    assert b.claim("k1") and b.claim("k2")
+    a.release("k1")                 # starý držitel nesmí smazat cizí lease
+    a.finish("k2", False, "stale")  # ani zapsat neúspěšný pokus za nového držitele
+    assert b.holds("k1") and b.holds("k2")
+    assert not os.path.exists(os.path.join(a.queue_dir, "failed", "k2.json"))
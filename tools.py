@@ -0,0 +1,92 @@
+# tools.py
+import os, sys, json, threading
+
+# Hledání ffmpeg.exe / MediaInfo.dll na jednom místě (dřív kopie v každém modulu).
+# Výsledek se drží v procesu a v cache/tools.json – klíčem je spustitelný soubor (+ mtime),
+# takže nový build / jiný Python hledá znovu. Workery dostanou hotové cesty od rodiče (seed)
+# a nesahají ani na disk.
+
+def _base_dir():
+    """Složka vedle EXE (onefile/onedir build) nebo vedle skriptů – jediná definice pro všechny moduly."""
+    return os.path.dirname(sys.executable) if getattr(sys, "frozen", False) \
+           else os.path.dirname(os.path.abspath(__file__))
+
+TOOLS_CACHE = os.path.join(_base_dir(), "cache", "tools.json")
+FFMPEG = "ffmpeg.exe"
+MEDIAINFO_DLL = "MediaInfo.dll"
+
+_resolved: dict[str, str | None] = {}
+_lock = threading.Lock()
+
+def _candidates(name: str) -> list[str]:
+    """Vedle EXE/skriptu, v _internal a v _MEIPASS (onefile)."""
+    b = _base_dir()
+    meipass = getattr(sys, "_MEIPASS", None)
+    return [p for p in (
+        os.path.join(b, name),
+        os.path.join(b, "_internal", name),
+        os.path.join(meipass, name) if meipass else "",
+        os.path.join(meipass, "_internal", name) if meipass else "",
+    ) if p]
+
+def _stamp() -> str:
+    """Klíč disk cache: exe (onefile: i jeho rozbalená složka) + mtime."""
+    try:
+        mtime = os.stat(sys.executable).st_mtime_ns
+    except OSError:
+        mtime = 0
+    return f"{sys.executable}|{mtime}|{_base_dir()}|{getattr(sys, '_MEIPASS', '')}"
+
+def _load_disk() -> dict:
+    try:
+        with open(TOOLS_CACHE, encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("tools", {}) if data.get("stamp") == _stamp() else {}
+    except (OSError, ValueError):
+        return {}
+
+def _store_disk(name: str, path: str | None):
+    try:
+        tools = _load_disk()
+        tools[name] = path
+        os.makedirs(os.path.dirname(TOOLS_CACHE), exist_ok=True)
+        tmp = f"{TOOLS_CACHE}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"stamp": _stamp(), "tools": tools}, f)
+        os.replace(tmp, TOOLS_CACHE)
+    except OSError:
+        pass   # cache je jen zrychlení
+
+def _resolve(name: str, search_path: bool) -> str | None:
+    with _lock:
+        if name in _resolved:
+            return _resolved[name]
+        cached = _load_disk().get(name)
+        if cached and os.path.isfile(cached):
+            _resolved[name] = cached
+            return cached
+        path = next((p for p in _candidates(name) if os.path.isfile(p)), None)
+        if path is None and search_path:
+            from shutil import which
+            path = which(name)
+        if path:
+            # nenalezený nástroj se necachuje – po stažení ho další volání musí najít
+            _resolved[name] = path
+            _store_disk(name, path)
+        return path
+
+def find_tool(name: str) -> str | None:
+    """Cesta k nástroji (vedle EXE, _internal, _MEIPASS, nakonec PATH)."""
+    return _resolve(name, search_path=True)
+
+def mediainfo_dll() -> str | None:
+    return _resolve(MEDIAINFO_DLL, search_path=False)
+
+def resolved() -> dict[str, str | None]:
+    """Hotové cesty pro předání workerům (seed)."""
+    return {FFMPEG: find_tool(FFMPEG), MEDIAINFO_DLL: mediainfo_dll()}
+
+def seed(paths: dict[str, str | None]):
+    """Worker převezme cesty od rodiče – žádné hledání ani čtení cache."""
+    with _lock:
+        _resolved.update({k: v for k, v in paths.items() if v})
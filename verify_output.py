@@ -0,0 +1,84 @@
+# verify_output.py
+import random
+from concurrent.futures import ThreadPoolExecutor
+from ffmpeg_progress import run_ffmpeg
+from media_probe import MediaProbe, probe_media
+from stream_plan import StreamPlan, DROP
+from tools import find_tool as _find_tool, mediainfo_dll as _mediainfo_dll
+
+# Ověření výstupu místo důvěry v návratový kód ffmpeg (useknutý / poškozený soubor po výpadku úložiště).
+# Celý dekód (-f null) by stál tolik CPU co enkód, proto: rozložení streamů proti plánu + dekód pár
+# krátkých náhodných oken (jedno vždy na konci – useknutí) paralelně a kontrola počtu snímků a času.
+
+WINDOWS = 3
+WINDOW_SECONDS = 2.0
+FRAME_TOLERANCE = 0.05     # podíl snímků okna (zaokrouhlení na hranách), aspoň 2 snímky
+TIME_TOLERANCE = 0.25      # s
+
+def check_layout(out: MediaProbe, plan: StreamPlan | None) -> str | None:
+    """Výstup má video a tolik audio stop, kolik plán nechal (copy/encode)."""
+    if not out.has_video:
+        return "no video stream in output"
+    if plan is None:
+        return None
+    want = sum(1 for a in plan.actions if a.stream.kind == "a" and a.action != DROP)
+    have = sum(1 for s in out.streams if s.kind == "a")
+    if have != want:
+        return f"{have} audio streams in output, expected {want}"
+    return None
+
+def pick_windows(duration: float, n: int, length: float, rng: random.Random) -> list[tuple[float, float]]:
+    """Okna (začátek, délka): jedno vždy končí na konci souboru (useknutí), zbytek náhodně.
+    Krátký soubor (do n oken) se dekóduje celý."""
+    if duration <= length * max(1, n):
+        return [(0.0, duration)]
+    last = duration - length
+    return sorted([(last, length)] + [(rng.uniform(0.0, last), length) for _ in range(max(0, n - 1))])
+
+def decode_window(ff: str, path: str, start: float, length: float, fps: float | None,
+                  vfr: bool = False) -> str | None:
+    """Dekóduje okno videa (1 vlákno, přesný seek). Dekód musí dojít na konec okna; u CFR se navíc
+    porovná počet snímků s fps (VFR má fps jen průměrné – tam rozhodují časy)."""
+    recs = []
+    rc, errors = run_ffmpeg([
+        ff, "-hide_banner", "-v", "error", "-nostdin",
+        "-threads", "1",
+        "-ss", f"{start:.3f}",
+        "-i", path,
+        "-t", f"{length:.3f}",
+        "-map", "0:v:0",
+        "-f", "null", "-",
+    ], recs.append)
+    # hlášky null muxeru (cíl dekódu) o pořadí DTS nejsou chyby dekódu – raw HEVC remux je mívá na konci
+    errors = [e for e in errors if not e.startswith("[null @")]
+    if rc != 0 or errors:
+        return f"decode error at {start:.1f} s: {errors[0] if errors else f'exit code {rc}'}"
+    last = recs[-1] if recs else None
+    if last is None or not last.frame:
+        return f"no frames decoded at {start:.1f} s"
+    slack = TIME_TOLERANCE + (1.0 / fps if fps else 0.0)
+    if abs(last.out_time - length) > slack:
+        return f"timestamps at {start:.1f} s cover {last.out_time:.2f} s of {length:.2f} s"
+    if fps and not vfr:
+        expected = length * fps
+        if abs(last.frame - expected) > max(2.0, expected * FRAME_TOLERANCE):
+            return f"{last.frame} frames at {start:.1f} s, expected ~{expected:.0f}"
+    return None
+
+def verify_output(path: str, input_probe: MediaProbe, plan: StreamPlan | None = None, windows: int = WINDOWS,
+                  window_seconds: float = WINDOW_SECONDS, rng: random.Random | None = None) -> str | None:
+    """Chyba (text), nebo None. Délku kontejneru hlídá už quick_verify; tady streamy a vzorky dekódu."""
+    out = probe_media(path, _mediainfo_dll(), use_cache=False)   # dočasný .part – mimo cache
+    err = check_layout(out, plan)
+    if err:
+        return err
+    ff = _find_tool("ffmpeg.exe")
+    duration = out.duration or input_probe.duration
+    if not ff or not duration:
+        return None
+    fps = out.fps or input_probe.fps
+    vfr = out.is_vfr or input_probe.is_vfr
+    spans = pick_windows(duration, windows, window_seconds, rng or random.Random())
+    with ThreadPoolExecutor(max_workers=len(spans)) as ex:
+        results = list(ex.map(lambda w: decode_window(ff, path, w[0], w[1], fps, vfr), spans))
+    return next((r for r in results if r), None)
@@ -1,22 +1,20 @@
 import os
 import sys
-from pymediainfo import MediaInfo
+import csv
+import glob
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from media_probe import MediaProbe, probe_media, RAW_HEVC_EXT
+from folder_watch import iter_video_files
+from tools import _base_dir, mediainfo_dll as _mediainfo_dll
 
-# přípony "raw" HEVC bez kontejneru
-RAW_HEVC_EXT = {".hevc", ".h265", ".265"}
+VIDEO_EXT = (".mp4", ".mkv", ".avi", ".mov", ".flv", ".wmv", ".mpeg", ".mpg", ".hevc", ".h265", ".265")
 
-def _base_dir() -> str:
-    return os.path.dirname(sys.executable) if getattr(sys, "frozen", False) \
-           else os.path.dirname(os.path.abspath(__file__))
-
-def _mediainfo_dll() -> str | None:
-    for p in (
-        os.path.join(_base_dir(), "MediaInfo.dll"),
-        os.path.join(_base_dir(), "_internal", "MediaInfo.dll"),
-    ):
-        if os.path.isfile(p):
-            return p
-    return None
+# Hromadná inventura (--bulk): MediaInfo jen z hlaviček (ParseSpeed=0) stačí na kodek, délku
+# a rozlišení a je zhruba 2× rychlejší; --full vrátí plný parse (i fps u MKV).
+FAST_PARSE_SPEED = 0
+DEFAULT_BULK_WORKERS = 8
 
 def select_video_file() -> str:
     """Otevře dialog a vrátí vybraný soubor (nebo '')."""
@@ -46,7 +44,7 @@ def _get_input_path() -> str:
     return select_video_file()
 
 class VideoAnalyzer:
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, probe: MediaProbe | None = None):
         if not file_path:
             raise ValueError("No file provided.")
         if not os.path.exists(file_path):
@@ -63,28 +61,30 @@ class VideoAnalyzer:
         if self._mi_dll:
             os.environ.setdefault("MEDIAINFO_PATH", self._mi_dll)
 
+        self.probe = probe
         self._analyze()
 
     def _analyze(self):
         try:
-            mi = MediaInfo.parse(self.file_path, library_file=self._mi_dll) if self._mi_dll else MediaInfo.parse(self.file_path)
-            for t in mi.tracks:
-                if t.track_type == "Video" and self.video_format is None:
-                    self.video_format = {
-                        "codec": getattr(t, "codec", None),
-                        "format": getattr(t, "format", None),
-                        "width": getattr(t, "width", None),
-                        "height": getattr(t, "height", None),
-                        "frame_rate": getattr(t, "frame_rate", None),
-                        "codec_id": getattr(t, "codec_id", None),
-                    }
-                elif t.track_type == "Audio" and self.audio_format is None:
-                    self.audio_format = {
-                        "codec": getattr(t, "codec", None),
-                        "format": getattr(t, "format", None),
-                        "channels": getattr(t, "channel_s", None),
-                        "sampling_rate": getattr(t, "sampling_rate", None),
-                    }
+            p = self.probe or probe_media(self.file_path, self._mi_dll)
+            self.probe = p
+            if p.has_video:
+                self.video_format = {
+                    "codec": p.codec_name,
+                    "format": p.codec,
+                    "codec_id": p.codec_id,
+                    "width": p.width,
+                    "height": p.height,
+                    "frame_rate": p.fps,
+                    "duration": p.duration,
+                }
+            if p.has_audio:
+                self.audio_format = {
+                    "codec": p.audio_codec_name,
+                    "format": p.audio_codec,
+                    "channels": p.audio_channels,
+                    "sampling_rate": p.audio_sampling_rate,
+                }
         except Exception:
             # necháme prázdno; volající si poradí
             pass
@@ -104,18 +104,181 @@ class VideoAnalyzer:
 
     def is_hevc(self) -> bool:
         """True, když je video HEVC/H.265 (včetně raw .hevc/.h265/.265)."""
+        if self.probe is not None:
+            return self.probe.is_hevc
         ext = os.path.splitext(self.file_path)[1].lower()
-        if ext in RAW_HEVC_EXT:
-            return True
-        if not self.video_format:
-            return False
-        fmt = (self.video_format.get("format") or "").lower()
-        cid = (self.video_format.get("codec_id") or "").lower()
-        return ("hevc" in fmt or "h265" in fmt or
-                "hvc1" in cid or "hev1" in cid or "hevc" in cid)
+        return ext in RAW_HEVC_EXT
+
+# --- hromadný režim -------------------------------------------------------------
+
+ROW_FIELDS = [
+    ("path", str), ("size", int), ("container", str),
+    ("codec", str), ("codec_id", str), ("width", int), ("height", int), ("fps", float), ("duration", float),
+    ("audio_codec", str), ("audio_channels", int), ("audio_sampling_rate", int), ("audio_streams", int),
+    ("subtitle_streams", int), ("is_hevc", bool), ("error", str),
+]
+
+def iter_inputs(specs: list[str], exts: tuple = VIDEO_EXT, recursive: bool = True):
+    """Složky (rekurzivně), globy (i **) a jednotlivé soubory → cesty, postupně a bez duplicit."""
+    seen = set()
+    for spec in specs:
+        if os.path.isdir(spec):
+            paths = iter_video_files(spec, exts, recursive)
+        elif glob.has_magic(spec):
+            paths = (p for p in glob.iglob(spec, recursive=True)
+                     if p.lower().endswith(exts) and os.path.isfile(p))
+        else:
+            paths = iter((spec,))   # explicitní soubor bereme i s jinou příponou
+        for p in paths:
+            if p not in seen:
+                seen.add(p)
+                yield p
+
+def probe_row(path: str, library_file: str | None = None, parse_speed: float | None = FAST_PARSE_SPEED) -> dict:
+    """Jeden řádek inventury (sloupce dle ROW_FIELDS)."""
+    row = dict.fromkeys(name for name, _ in ROW_FIELDS)
+    row["path"] = path
+    try:
+        row["size"] = os.path.getsize(path)
+        p = probe_media(path, library_file, parse_speed)
+    except Exception as e:
+        row["error"] = str(e)
+        return row
+    kinds = [s.kind for s in p.streams]
+    row.update(
+        container=p.container, codec=p.codec, codec_id=p.codec_id, width=p.width, height=p.height,
+        fps=p.fps, duration=p.duration, audio_codec=p.audio_codec, audio_channels=p.audio_channels,
+        audio_sampling_rate=p.audio_sampling_rate, audio_streams=kinds.count("a"),
+        subtitle_streams=kinds.count("s"), is_hevc=p.is_hevc,
+    )
+    if not (p.has_video or p.has_audio or p.is_raw_hevc):
+        row["error"] = "no video or audio tracks"
+    return row
+
+def analyze_many(paths, workers: int = DEFAULT_BULK_WORKERS, parse_speed: float | None = FAST_PARSE_SPEED):
+    """Generátor řádků v pořadí dokončení. Vstup se čte líně – rozpracovaných je nejvýš 4× workers,
+    takže i 50k souborů nezabere paměť dopředu."""
+    dll = _mediainfo_dll()
+    if dll:
+        os.environ.setdefault("MEDIAINFO_PATH", dll)
+    it = iter(paths)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        pending = set()
+        for path in it:
+            pending.add(ex.submit(probe_row, path, dll, parse_speed))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    yield f.result()
+        for f in pending:
+            yield f.result()
+
+class _JsonlWriter:
+    def __init__(self, path: str | None):
+        self.f = open(path, "w", encoding="utf-8") if path else sys.stdout
+
+    def write(self, row: dict):
+        self.f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self.f is not sys.stdout:
+            self.f.close()
+        else:
+            self.f.flush()
+
+class _CsvWriter:
+    def __init__(self, path: str):
+        self.f = open(path, "w", encoding="utf-8", newline="")
+        self.w = csv.DictWriter(self.f, fieldnames=[name for name, _ in ROW_FIELDS])
+        self.w.writeheader()
+
+    def write(self, row: dict):
+        self.w.writerow(row)
+
+    def close(self):
+        self.f.close()
+
+class _ParquetWriter:
+    """Parquet po dávkách (row groups) – potřebuje pyarrow, jinak srozumitelná chyba."""
+    BATCH = 5000
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow) – use .jsonl or .csv instead.")
+        types = {str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+        self.pa = pa
+        self.schema = pa.schema([(name, types[t]) for name, t in ROW_FIELDS])
+        self.w = pq.ParquetWriter(path, self.schema)
+        self.rows: list[dict] = []
+
+    def write(self, row: dict):
+        self.rows.append(row)
+        if len(self.rows) >= self.BATCH:
+            self._flush()
+
+    def _flush(self):
+        if self.rows:
+            self.w.write_table(self.pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self._flush()
+        self.w.close()
+
+def open_writer(out: str | None):
+    """Výstup podle přípony: .csv, .parquet, jinak JSON lines (bez cesty na stdout)."""
+    ext = os.path.splitext(out or "")[1].lower()
+    if ext == ".csv":
+        return _CsvWriter(out)
+    if ext in (".parquet", ".pq"):
+        return _ParquetWriter(out)
+    return _JsonlWriter(out)
+
+def bulk_analyze(specs: list[str], out: str | None = None, workers: int = DEFAULT_BULK_WORKERS,
+                 parse_speed: float | None = FAST_PARSE_SPEED, report_every: float = 5.0) -> tuple[int, int, float]:
+    """Inventura složek/globů do souboru (nebo stdout). Průběh a files/s jdou na stderr.
+    Vrací (souborů, chyb, sekund)."""
+    writer = open_writer(out)
+    count = errors = 0
+    t0 = last = time.perf_counter()
+    try:
+        for row in analyze_many(iter_inputs(specs), workers, parse_speed):
+            writer.write(row)
+            count += 1
+            errors += bool(row["error"])
+            now = time.perf_counter()
+            if now - last >= report_every:
+                last = now
+                print(f"📊 {count} files · {count / (now - t0):.1f} files/s", file=sys.stderr, flush=True)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - t0
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"✅ {count} files in {elapsed:.1f} s ({rate:.1f} files/s, {errors} errors)", file=sys.stderr)
+    return count, errors, elapsed
+
+def _bulk_main(argv: list[str]) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description="Bulk MediaInfo inventory (JSON lines / CSV / Parquet).")
+    ap.add_argument("--bulk", nargs="+", required=True, metavar="PATH", help="folders, globs (quote them) or files")
+    ap.add_argument("--out", help="output file (.jsonl, .csv, .parquet); default JSON lines to stdout")
+    ap.add_argument("--workers", type=int, default=DEFAULT_BULK_WORKERS)
+    ap.add_argument("--full", action="store_true", help="full MediaInfo parse (slower, adds fps for MKV etc.)")
+    args = ap.parse_args(argv)
+    try:
+        bulk_analyze(args.bulk, args.out, max(1, args.workers), None if args.full else FAST_PARSE_SPEED)
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0
 
 # interaktivní/CLI režim
 if __name__ == "__main__":
+    if "--bulk" in sys.argv[1:]:
+        sys.exit(_bulk_main(sys.argv[1:]))
     path = _get_input_path()
     if not path:
         print("❌ No file selected.")
@@ -0,0 +1,249 @@
+# work_queue.py
+import os, json, time, uuid, socket, hashlib, threading
+from tools import _base_dir
+
+# Fronta jobů pro víc strojů nad sdíleným input/ + output/ (NFS/SMB). Žádný server ani SQLite na share
+# (zamykání SQLite přes síťové FS není spolehlivé) – jen soubory:
+#   leases/<klíč>.lease   zámek jobu, vzniká přes O_CREAT|O_EXCL (atomické i na NFSv3+)
+#   done/<klíč>.json      hotovo – zapíše se dřív, než se lease uvolní
+#   failed/<klíč>.json    počet neúspěšných pokusů (po MAX_ATTEMPTS se job už nebere)
+#   nodes/<uzel>          živé uzly (jen pro výpis)
+# Držitel lease obnovuje jeho mtime (heartbeat). Lease starší než TTL patří mrtvému uzlu a převezme se
+# přejmenováním – rename uspěje jen jednomu. Čas se bere z hodin share (mtime), ne z lokálních hodin.
+
+DEFAULT_QUEUE_DIR = os.path.join(_base_dir(), "output", ".queue")
+HEARTBEAT_INTERVAL = 10.0
+LEASE_TTL = 60.0            # 6 heartbeatů – přežije krátký výpadek share
+MAX_ATTEMPTS = 2
+
+FREE, LEASED, DONE, FAILED = "free", "leased", "done", "failed"
+
+def node_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def job_key(rel_path: str, input_path: str, settings: str) -> str:
+    """Stejný na všech uzlech: relativní cesta (mounty se můžou lišit) + velikost + mtime + nastavení."""
+    st = os.stat(input_path)
+    raw = f"{rel_path.replace(os.sep, '/')}|{st.st_size}|{st.st_mtime_ns}|{settings}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+def _read_json(path: str) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path: str, data: dict):
+    """Atomicky (tmp + os.replace) – ostatní uzly nikdy nevidí půlku souboru."""
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+class WorkQueue:
+    """Kooperativní rozdělování jobů mezi uzly. claim() → True = job je náš, finish() ho uzavře."""
+
+    def __init__(self, queue_dir: str | None = None, node: str | None = None, ttl: float = LEASE_TTL,
+                 heartbeat: float = HEARTBEAT_INTERVAL, max_attempts: int = MAX_ATTEMPTS):
+        self.queue_dir = os.path.abspath(queue_dir or DEFAULT_QUEUE_DIR)
+        self.node = node or node_name()
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.max_attempts = max(1, max_attempts)
+        for sub in ("leases", "done", "failed", "nodes"):
+            os.makedirs(os.path.join(self.queue_dir, sub), exist_ok=True)
+        self.lost: set[str] = set()          # lease, který nám mezitím převzal jiný uzel
+        self._held: dict[str, str] = {}      # klíč -> token v našem lease
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._node_file = os.path.join(self.queue_dir, "nodes", self.node)
+        self._touch_node()
+
+    def _path(self, sub: str, key: str, ext: str) -> str:
+        return os.path.join(self.queue_dir, sub, key + ext)
+
+    def _touch_node(self):
+        try:
+            with open(self._node_file, "a"):
+                pass
+            os.utime(self._node_file)
+        except OSError:
+            pass
+
+    def _share_now(self) -> float:
+        """Aktuální čas podle hodin share (mtime právě obnoveného souboru uzlu)."""
+        self._touch_node()
+        try:
+            return os.stat(self._node_file).st_mtime
+        except OSError:
+            return time.time()
+
+    def state(self, key: str) -> str:
+        if os.path.exists(self._path("done", key, ".json")):
+            return DONE
+        failed = _read_json(self._path("failed", key, ".json"))
+        if failed and failed.get("attempts", 0) >= self.max_attempts:
+            return FAILED
+        try:
+            age = self._share_now() - os.stat(self._path("leases", key, ".lease")).st_mtime
+        except FileNotFoundError:
+            return FREE
+        except OSError:
+            return LEASED   # share zlobí – radši nesahat
+        return LEASED if age <= self.ttl else FREE
+
+    def _reclaim(self, lease: str) -> bool:
+        """Prošlý lease mrtvého uzlu pryč. True = místo je volné (zkus znovu O_EXCL)."""
+        try:
+            if self._share_now() - os.stat(lease).st_mtime <= self.ttl:
+                return False
+        except FileNotFoundError:
+            return True
+        grave = f"{lease}.{self.node}.stale"
+        try:
+            os.rename(lease, grave)
+        except OSError:
+            return False   # předběhl nás jiný uzel
+        try:
+            # mezi stat a rename mohl lease převzít a obnovit někdo jiný → vrátit na místo
+            if self._share_now() - os.stat(grave).st_mtime <= self.ttl:
+                try:
+                    os.link(grave, lease)
+                except OSError:
+                    pass
+                return False
+            return True
+        finally:
+            try:
+                os.remove(grave)
+            except OSError:
+                pass
+
+    def claim(self, key: str, label: str = "") -> bool:
+        """Zamkne job pro tento uzel. False = hotový, vzdaný, nebo ho drží jiný živý uzel."""
+        if self.holds(key):
+            return True   # už je náš (opakování jobu po neúspěšném ověření výstupu)
+        if self.state(key) in (DONE, FAILED):
+            return False
+        lease = self._path("leases", key, ".lease")
+        token = uuid.uuid4().hex
+        for _ in range(2):
+            try:
+                fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self._reclaim(lease):
+                    return False
+                continue
+            except OSError:
+                return False
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"node": self.node, "token": token, "job": label, "claimed": time.time()}, f)
+            if self.state(key) in (DONE, FAILED):
+                # hotový mezi kontrolou a zámkem (done se píše před uvolněním lease)
+                self._remove_lease(key, token)
+                return False
+            with self._lock:
+                self._held[key] = token
+            self._start_heartbeat()
+            return True
+        return False
+
+    def _owns(self, key: str, token: str) -> bool:
+        info = _read_json(self._path("leases", key, ".lease"))
+        return bool(info) and info.get("token") == token
+
+    def holds(self, key: str) -> bool:
+        """Job je pořád náš: lease na share nese náš token a job není hotový jinde.
+        Jinak se zapomene (převzal ho jiný uzel, zatímco share nebo tento uzel stál)."""
+        with self._lock:
+            token = self._held.get(key)
+        if token is None:
+            return False
+        if key not in self.lost and self._owns(key, token) and \
+                not os.path.exists(self._path("done", key, ".json")):
+            return True
+        with self._lock:
+            self._held.pop(key, None)
+        self.lost.discard(key)
+        return False
+
+    def _remove_lease(self, key: str, token: str):
+        if self._owns(key, token):
+            try:
+                os.remove(self._path("leases", key, ".lease"))
+            except OSError:
+                pass
+
+    def finish(self, key: str, ok: bool, error: str | None = None):
+        """Uzavře náš job: done marker (úspěch) nebo další neúspěšný pokus, pak uvolní lease.
+        Job, který mezitím převzal jiný uzel, se nechá být – výsledek hlásí nový držitel."""
+        with self._lock:
+            token = self._held.pop(key, None)
+        self.lost.discard(key)
+        if not token or not self._owns(key, token):
+            return
+        try:
+            if ok:
+                _write_json(self._path("done", key, ".json"), {"node": self.node, "finished": time.time()})
+            else:
+                path = self._path("failed", key, ".json")
+                attempts = (_read_json(path) or {}).get("attempts", 0) + 1
+                _write_json(path, {"attempts": attempts, "node": self.node, "error": (error or "")[:500]})
+        except OSError:
+            pass
+        self._remove_lease(key, token)
+
+    def release(self, key: str):
+        """Vrátí job bez výsledku (Ctrl+C) – hned ho může vzít jiný uzel."""
+        with self._lock:
+            token = self._held.pop(key, None)
+        self.lost.discard(key)
+        if token:
+            self._remove_lease(key, token)
+
+    def _start_heartbeat(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._beat, args=(self._stop,), name="lease-heartbeat",
+                                            daemon=True)
+            self._thread.start()
+
+    def _beat(self, stop: threading.Event):
+        while not stop.wait(self.heartbeat):
+            self._touch_node()
+            with self._lock:
+                held = dict(self._held)
+            for key, token in held.items():
+                if not self._owns(key, token):
+                    self.lost.add(key)   # převzal ho jiný uzel (share byl nedostupný déle než TTL)
+                    continue
+                try:
+                    os.utime(self._path("leases", key, ".lease"))
+                except OSError:
+                    pass
+
+    def nodes(self) -> int:
+        """Počet živých uzlů (soubor uzlu obnovený do TTL)."""
+        now, alive = self._share_now(), 0
+        d = os.path.join(self.queue_dir, "nodes")
+        try:
+            for name in os.listdir(d):
+                try:
+                    alive += now - os.stat(os.path.join(d, name)).st_mtime <= self.ttl
+                except OSError:
+                    pass
+        except OSError:
+            return 1
+        return max(1, alive)
+
+    def close(self):
+        """Konec běhu: uvolní zbylé lease a odhlásí se (další claim() heartbeat zase spustí)."""
+        self._stop.set()
+        self._stop, self._thread = threading.Event(), None
+        for key in list(self._held):
+            self.release(key)
+        try:
+            os.remove(self._node_file)
+        except OSError:
+            pass